@@ -0,0 +1,109 @@
+"""
+Request Deadlines
+Every HTTP request gets a total time budget that upstream calls read
+through `request_deadline`. The handler is cancelled (with all the
+upstream work it awaits) when the budget runs out before a response
+starts, or as soon as the client disconnects.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+
+from ..providers.scheduler import request_deadline
+
+
+# Counters reported by /providers
+deadline_stats: Dict[str, int] = {"timed_out": 0, "client_disconnected": 0}
+
+
+class DeadlineMiddleware:
+    """Pure ASGI, so cancelling the handler also cancels what it awaits"""
+
+    def __init__(self, app, default_seconds: float, overrides: Optional[Dict[str, float]] = None):
+        self.app = app
+        self.default_seconds = default_seconds
+        # Longest prefix wins
+        self.overrides = sorted((overrides or {}).items(), key=lambda kv: len(kv[0]), reverse=True)
+
+    def budget(self, path: str) -> float:
+        for prefix, seconds in self.overrides:
+            if path.startswith(prefix):
+                return seconds
+        return self.default_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self.budget(scope["path"])
+        token = request_deadline.set(time.monotonic() + seconds)
+        try:
+            await self._run(scope, receive, send, seconds)
+        finally:
+            request_deadline.reset(token)
+
+    async def _run(self, scope, receive, send, seconds: float):
+        # Read the body up front so a watcher can own `receive` afterwards
+        body: List[dict] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                deadline_stats["client_disconnected"] += 1
+                return
+            body.append(message)
+            if not message.get("more_body"):
+                break
+
+        disconnected = asyncio.Event()
+        started = False
+
+        async def replay_receive():
+            if body:
+                return body.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def tracking_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        async def watch():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        handler = asyncio.create_task(self.app(scope, replay_receive, tracking_send))
+        watcher = asyncio.create_task(watch())
+        try:
+            done, _ = await asyncio.wait(
+                {handler, watcher}, timeout=seconds, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done and started:
+                # Streaming responses run on past the deadline, until the client leaves
+                done, _ = await asyncio.wait({handler, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if handler in done:
+                handler.result()
+                return
+
+            handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            if watcher in done:
+                deadline_stats["client_disconnected"] += 1
+                return
+
+            deadline_stats["timed_out"] += 1
+            if not started:
+                payload = json.dumps({"detail": f"Request exceeded its {seconds:g}s deadline"}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 504,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+                })
+                await send({"type": "http.response.body", "body": payload})
+        finally:
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
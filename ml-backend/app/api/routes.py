@@ -1,79 +1,142 @@
 """
 API Routes for CryptoManiac AI Trading Guardian
 """
-from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
-from pydantic import BaseModel
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Tuple
+from pydantic import BaseModel, Field
 
-from ..providers import BinanceProvider, CoinCapProvider
+from ..providers import CoinCapProvider
+from ..providers.replay import market_provider
+from ..providers.base import PriceData
+from ..providers.symbols import symbol_resolver, ResolvedSymbol
+from ..providers.scheduler import scheduler, deadline_share
 from ..models import PricePredictor, SignalGenerator
+from ..models.strategy import StrategySpec, StrategyPlan, compile_strategy
+from ..models.portfolio import value_holdings, portfolio_risk
 from ..config import get_settings
+from ..cache import memory_budget
+from ..services.candles import candle_aggregator, INTERVAL_MS
+from ..services.export import open_export, MEDIA_TYPES, PYARROW_AVAILABLE
+from ..services.anomalies import anomaly_monitor
+from ..services.scanner import market_scanner
+from ..services.orderbook import order_books
+from ..services.trades import trade_streams
+from ..services.correlations import correlation_engine
+from ..services.prices import price_book
+from ..services.rules import rules_engine, CONDITIONS
+from .middleware import deadline_stats
 
 router = APIRouter()
 
 # Initialize components
-binance = BinanceProvider()
+binance = market_provider()
 coincap = CoinCapProvider()
 predictor = PricePredictor()
 signal_gen = SignalGenerator()
+SIGNAL_DAYS = max(30, signal_gen.strategy.min_periods)  # Daily closes fed to the strategy
 
 
-# Common CoinGecko ID to Binance Symbol mapping
-COIN_ID_TO_SYMBOL = {
-    "bitcoin": "BTC",
-    "ethereum": "ETH",
-    "binancecoin": "BNB",
-    "ripple": "XRP",
-    "cardano": "ADA",
-    "solana": "SOL",
-    "dogecoin": "DOGE",
-    "polkadot": "DOT",
-    "shiba-inu": "SHIB",
-    "litecoin": "LTC",
-    "avalanche-2": "AVAX",
-    "chainlink": "LINK",
-    "polygon": "MATIC",
-    "uniswap": "UNI",
-    "stellar": "XLM",
-    "tron": "TRX",
-    "monero": "XMR",
-    "bitcoin-cash": "BCH",
-    "fantom": "FTM",
-    "near-protocol": "NEAR",
-    "cosmos": "ATOM",
-    "algorand": "ALGO",
-    "vechain": "VET",
-    "internet-computer": "ICP",
-    "filecoin": "FIL",
-    "theta-token": "THETA",
-    "sand": "SAND",
-    "mana": "MANA",
-    "axie-infinity": "AXS",
-    "the-graph": "GRT",
-    "aave": "AAVE",
-    "eos": "EOS",
-    "tezos": "XTZ",
-    "elrond-erd-2": "EGLD",
-    "quant-network": "QNT",
-}
-
-
-
-def normalize_symbol(input_symbol: str) -> str:
-    """Convert CoinGecko ID or symbol to Binance symbol format"""
-    lower = input_symbol.lower()
-    # Check if it's a known ID
-    if lower in COIN_ID_TO_SYMBOL:
-        return COIN_ID_TO_SYMBOL[lower]
-    # Already a symbol or unknown - return uppercase
-    return input_symbol.upper()
+def _on_candle_close(symbol_pair: str, interval: str, bar: PriceData):
+    """A new daily candle makes the cached forecast stale"""
+    if interval == "1d" and symbol_pair.endswith("USDT"):
+        predictor.invalidate(symbol_pair[:-len("USDT")])
+
+
+candle_aggregator.add_listener(_on_candle_close)
+
+
+async def resolve_symbol(symbol: str) -> ResolvedSymbol:
+    """Resolve a CoinGecko ID or ticker (404 for unknown symbols)"""
+    resolved = await symbol_resolver.resolve(symbol)
+    if resolved is None:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+    return resolved
+
+
+async def get_history(
+    resolved: ResolvedSymbol,
+    days: int,
+    interval: str = "1d"
+) -> Tuple[List[PriceData], str]:
+    """
+    Get candles from Binance rollups, falling back to CoinCap.
+    With a fallback available, Binance only gets part of the request's
+    remaining time so a slow Binance doesn't leave CoinCap none.
+    """
+    if resolved.binance:
+        try:
+            with deadline_share(0.6 if resolved.coincap else 1.0):
+                prices = await candle_aggregator.get_historical_prices(
+                    resolved.binance,
+                    days=days,
+                    interval=interval
+                )
+            return prices, "binance"
+        except Exception:
+            if not resolved.coincap:
+                raise
+    
+    if not resolved.coincap:
+        raise HTTPException(status_code=404, detail=f"No provider lists {resolved.symbol}")
+    
+    prices = await coincap.get_historical_prices(resolved.coincap, days=days, interval=interval)
+    return prices, "coincap"
 
 
 # Request/Response Models
 class TradeValidationRequest(BaseModel):
     action: str  # BUY or SELL
     symbol: str
-    amount: Optional[float] = None
+    amount: Optional[float] = None  # Order size in USD
+
+
+class BatchTradeValidationRequest(BaseModel):
+    orders: List[TradeValidationRequest] = Field(min_length=1, max_length=500)
+
+
+class StrategyEvaluationRequest(BaseModel):
+    strategy: StrategySpec
+    symbols: List[str] = Field(min_length=1, max_length=100)
+    days: int = Field(default=60, ge=30, le=365)
+
+
+class HoldingRequest(BaseModel):
+    symbol: str
+    amount: float = Field(gt=0)  # Units of the coin held
+
+
+class PortfolioRequest(BaseModel):
+    holdings: List[HoldingRequest] = Field(min_length=1, max_length=200)
+    confidence: float = Field(default=0.95, ge=0.8, le=0.999)  # VaR confidence
+    horizon_days: int = Field(default=1, ge=1, le=30)  # VaR horizon
+
+
+OWNER_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
+
+
+class AlertRuleRequest(BaseModel):
+    symbol: str
+    condition: str = Field(pattern=f"^({'|'.join(CONDITIONS)})$")
+    value: float = Field(gt=0)  # Price level, or percent for rises/drops
+    window_seconds: int = Field(default=3600, ge=60, le=86_400)  # rises/drops only
+    repeat: bool = False  # Fire on every crossing instead of once
+    note: Optional[str] = Field(default=None, max_length=200)
+
+
+class AlertRulesRequest(BaseModel):
+    owner: str = Field(pattern=OWNER_PATTERN)
+    rules: List[AlertRuleRequest] = Field(min_length=1, max_length=1000)
+
+
+@lru_cache(maxsize=64)
+def _compiled_strategy(spec_json: str) -> StrategyPlan:
+    """Compile each distinct spec once"""
+    return compile_strategy(StrategySpec.model_validate_json(spec_json))
 
 
 # ============= ENDPOINTS =============
@@ -93,45 +156,50 @@ async def get_coins(limit: int = Query(default=50, le=100)):
 @router.get("/price/{symbol}")
 async def get_price(symbol: str):
     """Get current price for a symbol"""
+    resolved = await resolve_symbol(symbol)
+    
     try:
         # Try Binance first (BTCUSDT format)
-        price = await binance.get_current_price(f"{symbol.upper()}USDT")
+        if not resolved.binance:
+            raise ValueError(f"{resolved.symbol} is not listed on Binance")
+        # Live streams or the shared price board first: no upstream call per worker
+        base = resolved.binance[:-len("USDT")] if resolved.binance.endswith("USDT") else None
+        price = price_book.get(base) if base else None
+        if price is None:
+            price = await binance.get_current_price(resolved.binance)
+            if base:
+                price_book.update(base, price)
         return {"symbol": symbol, "price": price, "provider": "binance"}
     except Exception:
+        if not resolved.coincap:
+            raise HTTPException(status_code=502, detail="No provider available")
         # Fallback to CoinCap (bitcoin format)
-        price = await coincap.get_current_price(symbol.lower())
+        price = await coincap.get_current_price(resolved.coincap)
         return {"symbol": symbol, "price": price, "provider": "coincap"}
 
 
 @router.get("/predict/{symbol}")
 async def get_prediction(
     symbol: str,
-    days: int = Query(default=7, ge=1, le=30)
+    days: int = Query(default=7, ge=1, le=get_settings().PREDICTION_DAYS_MAX)
 ):
     """
     Get AI-powered price prediction.
     Accepts both CoinGecko IDs (bitcoin) and symbols (btc).
     """
     # Normalize to Binance symbol format
-    normalized = normalize_symbol(symbol)
+    resolved = await resolve_symbol(symbol)
+    normalized = resolved.symbol
     
     try:
         # Get historical data
-        try:
-            prices = await binance.get_historical_prices(
-                f"{normalized}USDT", 
-                days=365
-            )
-            provider = "binance"
-        except Exception:
-            prices = await coincap.get_historical_prices(symbol.lower(), days=365)
-            provider = "coincap"
+        prices, provider = await get_history(resolved, days=365)
         
         if not prices:
             raise HTTPException(status_code=404, detail="No price data found")
         
         # Generate prediction
-        prediction = await predictor.predict(prices, days_ahead=days)
+        prediction = await predictor.predict(prices, days_ahead=days, cache_key=normalized)
         prediction["symbol"] = normalized
         prediction["provider"] = provider
         
@@ -149,22 +217,22 @@ async def get_signals(symbol: str):
     Get real-time trading signals from multiple strategies.
     Accepts both CoinGecko IDs and symbols.
     """
-    normalized = normalize_symbol(symbol)
+    resolved = await resolve_symbol(symbol)
+    normalized = resolved.symbol
     
     try:
-        try:
-            prices = await binance.get_historical_prices(
-                f"{normalized}USDT",
-                days=30
-            )
-        except Exception:
-            prices = await coincap.get_historical_prices(symbol.lower(), days=30)
+        prices, _ = await get_history(resolved, days=SIGNAL_DAYS)
         
-        signals = signal_gen.generate_signals(prices)
+        trade_flow = await trade_streams.flow(resolved.binance, wait=False) if resolved.binance else None
+        signals = signal_gen.generate_signals(prices, trade_flow=trade_flow)
         signals["symbol"] = normalized
+        if trade_flow:
+            signals["trade_flow"] = trade_flow
         
         return signals
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -175,60 +243,423 @@ async def validate_trade(request: TradeValidationRequest):
     Validate if a planned trade is a good idea.
     WARNS users before they make mistakes!
     """
-    normalized = normalize_symbol(request.symbol)
+    resolved = await resolve_symbol(request.symbol)
+    normalized = resolved.symbol
     
     try:
-        try:
-            prices = await binance.get_historical_prices(
-                f"{normalized}USDT",
-                days=30
-            )
-        except Exception:
-            prices = await coincap.get_historical_prices(
-                request.symbol.lower(), 
-                days=30
+        action = request.action.upper()
+        liquidity = None
+        if request.amount and resolved.binance:
+            # Order book and history load together
+            (prices, _), liquidity = await asyncio.gather(
+                get_history(resolved, days=SIGNAL_DAYS),
+                order_books.liquidity(resolved.binance, action, request.amount)
             )
+        else:
+            prices, _ = await get_history(resolved, days=SIGNAL_DAYS)
         
         validation = signal_gen.validate_trade(
-            action=request.action.upper(),
+            action=action,
             prices=prices,
-            amount=request.amount
+            amount=request.amount,
+            liquidity=liquidity
         )
         
         return {
             "symbol": normalized,
-            "action": request.action.upper(),
-            **validation.model_dump()
+            "action": action,
+            **validation.model_dump(),
+            "liquidity": liquidity
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/validate-trades")
+async def validate_trades(request: BatchTradeValidationRequest):
+    """
+    Validate a whole basket of orders in one call.
+    Each symbol's history is fetched once and scored in one vectorized pass;
+    orders with an `amount` are checked against their symbol's order book.
+    """
+    orders = request.orders
+    
+    # Resolve each distinct spelling, then fetch each distinct symbol once
+    # ("btc", "bitcoin" and "xbt" share one history and one score)
+    spellings = list(dict.fromkeys(o.symbol.lower() for o in orders))
+    resolved_by_spelling = dict(zip(
+        spellings, await asyncio.gather(*(symbol_resolver.resolve(k) for k in spellings))
+    ))
+    order_resolved = [resolved_by_spelling[o.symbol.lower()] for o in orders]
+    distinct = list({r.symbol: r for r in order_resolved if r is not None}.values())
+    
+    async def fetch(r: ResolvedSymbol):
+        try:
+            prices, _ = await get_history(r, days=SIGNAL_DAYS)
+            return prices
+        except Exception:
+            return []
+    
+    async def fetch_book(r: ResolvedSymbol):
+        try:
+            return await order_books.track(r.binance)
+        except Exception as e:
+            print(f"Order book error for {r.binance}: {e}")
+            return None
+    
+    # Histories and the order books of sized orders load together, one per symbol
+    sized = list({r.symbol: r for o, r in zip(orders, order_resolved) if o.amount and r and r.binance}.values())
+    loaded = await asyncio.gather(*(fetch(r) for r in distinct), *(fetch_book(r) for r in sized))
+    histories = loaded[:len(distinct)]
+    book_by_key = {r.symbol: book for r, book in zip(sized, loaded[len(distinct):])}
+    
+    # Score every symbol with enough history together
+    signal_by_key: dict = {}
+    risk_by_key: dict = {}
+    periods = signal_gen.strategy.min_periods
+    scored = [(r.symbol, h) for r, h in zip(distinct, histories) if len(h) >= periods]
+    if scored:
+        closes = np.array([[p.close for p in h[-periods:]] for _, h in scored])
+        batch = signal_gen.generate_signals_batch(closes)
+        for i, (key, _) in enumerate(scored):
+            signal_by_key[key] = str(batch["signal"][i])
+            risk_by_key[key] = str(batch["risk_level"][i])
+    
+    actions = [o.action.upper() for o in orders]
+    symbols = [r.symbol if r else o.symbol.upper() for o, r in zip(orders, order_resolved)]
+    validations = signal_gen.validate_trades_batch(
+        actions,
+        [signal_by_key.get(s) for s in symbols],
+        [risk_by_key.get(s) for s in symbols]
+    )
+    
+    results = []
+    for i, (order, r, symbol, action) in enumerate(zip(orders, order_resolved, symbols, actions)):
+        # Each order's slippage against its symbol's one book
+        book = book_by_key.get(symbol) if order.amount else None
+        liquidity = book.liquidity(action, order.amount, order_books.depth_bps) if book else None
+        if liquidity:
+            validations[i] = signal_gen.check_liquidity(validations[i], liquidity)
+        result = {
+            "symbol": symbol,
+            "action": action,
+            "amount": order.amount,
+            "signal": signal_by_key.get(symbol),
+            **validations[i].model_dump(),
+            "liquidity": liquidity
+        }
+        if r is None:
+            result["warning"] = f"Unknown symbol: {order.symbol}"
+        results.append(result)
+    
+    return {
+        "results": results,
+        "summary": signal_gen.summarize_basket(
+            symbols, actions, validations, [o.amount for o in orders]
+        )
+    }
+
+
+@router.post("/strategy/evaluate")
+async def evaluate_strategy(request: StrategyEvaluationRequest):
+    """
+    Score symbols with a caller-supplied strategy spec, all in one
+    vectorized pass. The default spec is what /signals uses.
+    """
+    spec = request.strategy
+    try:
+        plan = _compiled_strategy(spec.model_dump_json())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    keys = list(dict.fromkeys(s.lower() for s in request.symbols))
+    resolved = await asyncio.gather(*(symbol_resolver.resolve(k) for k in keys))
+    
+    async def fetch(r: Optional[ResolvedSymbol]):
+        if r is None:
+            return []
+        try:
+            prices, _ = await get_history(r, days=request.days)
+            return prices
+        except Exception:
+            return []
+    
+    histories = await asyncio.gather(*(fetch(r) for r in resolved))
+    
+    # Every symbol is scored over the same number of periods
+    usable = [(r, h) for r, h in zip(resolved, histories) if len(h) >= spec.min_periods]
+    skipped = [
+        r.symbol if r else k.upper()
+        for k, r, h in zip(keys, resolved, histories) if len(h) < spec.min_periods
+    ]
+    if not usable:
+        raise HTTPException(status_code=404, detail="No symbol has enough history for this strategy")
+    
+    try:
+        periods = min(len(h) for _, h in usable)
+        closes = np.array([[p.close for p in h[-periods:]] for _, h in usable])
+        evaluated = plan.evaluate(closes)
+        
+        results = [
+            {
+                "symbol": r.symbol,
+                "signal": str(evaluated["signal"][i]),
+                "strength": str(evaluated["strength"][i]),
+                "score": round(float(evaluated["score"][i]), 2),
+                "indicators": {
+                    name: round(float(evaluated[name][i]), 2) for name in plan.outputs
+                },
+                "risk_level": str(evaluated["risk_level"][i])
+            }
+            for i, (r, _) in enumerate(usable)
+        ]
+        results.sort(key=lambda r: r["score"], reverse=True)
+        
+        return {
+            "strategy": spec.name,
+            "periods": periods,
+            "results": results,
+            "skipped": skipped
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/portfolio")
+async def get_portfolio(request: PortfolioRequest):
+    """
+    Value a set of holdings with 24h PnL, a signal per asset and the
+    portfolio's volatility and VaR, in one vectorized pass.
+    Prices come from one cached full-market ticker call and history from
+    the daily candles of coins already tracked in memory, so there are no
+    per-coin upstream calls; other coins are valued but listed as uncovered.
+    """
+    settings = get_settings()
+    
+    # Merge repeated coins, keeping the caller's order
+    amounts: dict = {}
+    for holding in request.holdings:
+        key = holding.symbol.lower()
+        amounts[key] = amounts.get(key, 0.0) + holding.amount
+    keys = list(amounts)
+    resolved = await asyncio.gather(*(symbol_resolver.resolve(k) for k in keys))
+    
+    try:
+        tickers = {t["symbol"]: t for t in await binance.get_24h_tickers()}
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"No market data: {e}")
+    
+    priced = [
+        (k, r, tickers[r.binance]) for k, r in zip(keys, resolved)
+        if r is not None and r.binance in tickers and float(tickers[r.binance]["lastPrice"]) > 0
+    ]
+    priced_keys = {k for k, _, _ in priced}
+    unpriced = [r.symbol if r else k.upper() for k, r in zip(keys, resolved) if k not in priced_keys]
+    if not priced:
+        raise HTTPException(status_code=404, detail="None of the holdings has a Binance price")
+    
+    history_days = settings.PORTFOLIO_HISTORY_DAYS
+    
+    def closed_daily(pair: str) -> np.ndarray:
+        # Never seeds: tracking a cold coin costs 3 kline calls and a poller
+        state = candle_aggregator.peek(pair)
+        if state is None:
+            return np.empty(0)
+        return state.closed_rows("1d", history_days + 1)[:, 4]
+    
+    histories = [closed_daily(r.binance) for _, r, _ in priced]
+    
+    try:
+        amount = np.array([amounts[k] for k, _, _ in priced])
+        price = np.array([float(t["lastPrice"]) for _, _, t in priced])
+        change = np.array([float(t["priceChangePercent"]) for _, _, t in priced])
+        valued = value_holdings(amount, price, change)
+        total = float(valued["value"].sum())
+        pnl = float(valued["pnl_24h"].sum())
+        open_total = float(valued["open_value"].sum())
+        
+        # Signals and risk need history; coins without enough are valued but not scored.
+        # Closed bars line up on UTC days, so aligning on the most recent ones is enough.
+        periods = signal_gen.strategy.min_periods
+        scored = [i for i, h in enumerate(histories) if len(h) >= periods - 1]
+        signals: dict = {}
+        risk = None
+        asset_risk: dict = {}
+        if scored:
+            length = min(len(histories[i]) for i in scored)
+            closes = np.array([histories[i][-length:] for i in scored])
+            
+            # Today's price stands in for the live daily candle, as in /signals
+            batch = signal_gen.generate_signals_batch(
+                np.column_stack([closes[:, -(periods - 1):], price[scored]])
+            )
+            for j, i in enumerate(scored):
+                signals[i] = {
+                    "signal": str(batch["signal"][j]),
+                    "strength": str(batch["strength"][j]),
+                    "score": round(float(batch["score"][j]), 2),
+                    "risk_level": str(batch["risk_level"][j])
+                }
+            
+            risk = portfolio_risk(valued["value"][scored], closes, request.confidence, request.horizon_days)
+            if risk is not None:
+                asset_risk = {
+                    i: (risk["risk_contribution"][j], risk["asset_volatility_annual"][j])
+                    for j, i in enumerate(scored)
+                }
+        
+        holdings = []
+        for i, (_, r, _) in enumerate(priced):
+            contribution, volatility = asset_risk.get(i, (None, None))
+            holdings.append({
+                "symbol": r.symbol,
+                "amount": float(amount[i]),
+                "price": float(price[i]),
+                "value": round(float(valued["value"][i]), 2),
+                "weight": round(float(valued["value"][i]) / total, 4) if total else 0.0,
+                "price_change_24h": float(change[i]),
+                "pnl_24h": round(float(valued["pnl_24h"][i]), 2),
+                **(signals.get(i) or {"signal": None}),
+                "volatility_annual_pct": round(float(volatility) * 100, 2) if volatility is not None else None,
+                "risk_contribution": round(float(contribution), 4) if contribution is not None else None
+            })
+        holdings.sort(key=lambda h: h["value"], reverse=True)
+        
+        covered = float(valued["value"][scored].sum()) if scored else 0.0
+        scored_set = set(scored)
+        return {
+            "total_value": round(total, 2),
+            "pnl_24h": round(pnl, 2),
+            "pnl_24h_percent": round(pnl / open_total * 100, 2) if open_total else None,
+            "holdings": holdings,
+            "risk": {
+                "confidence": request.confidence,
+                "horizon_days": request.horizon_days,
+                "days": risk["days"],
+                "volatility_daily_pct": round(risk["volatility_daily"] * 100, 2),
+                "volatility_annual_pct": round(risk["volatility_annual"] * 100, 2),
+                "var": round(risk["var"], 2),
+                "var_percent": round(risk["var"] / covered * 100, 2),
+                "historical_var": round(risk["historical_var"], 2),
+                "diversification_ratio": round(risk["diversification_ratio"], 2) if risk["diversification_ratio"] else None,
+                "coverage": round(covered / total, 4)  # Share of the value the risk figures cover
+            } if risk is not None else None,
+            "unpriced": unpriced,
+            "uncovered": [r.symbol for i, (_, r, _) in enumerate(priced) if i not in scored_set]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/history/{symbol}/export")
+async def export_history(
+    request: Request,
+    symbol: str,
+    interval: str = Query(default="1d", pattern=f"^({'|'.join(INTERVAL_MS)})$"),
+    start: Optional[datetime] = None,  # Default: 30 days before end (UTC when no offset given)
+    end: Optional[datetime] = None,  # Default: now
+    fmt: str = Query(default="csv", alias="format", pattern=f"^({'|'.join(MEDIA_TYPES)})$")
+):
+    """
+    Download candle history as CSV, NDJSON or Arrow IPC.
+    Streamed batch by batch (gzip when the client accepts it), so any
+    range is served in constant memory.
+    """
+    resolved = await resolve_symbol(symbol)
+    if not resolved.binance:
+        raise HTTPException(status_code=404, detail=f"No candle history for {resolved.symbol}")
+    if fmt == "arrow" and not PYARROW_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Arrow export needs pyarrow installed")
+    
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    start_ms, end_ms = (
+        int((t if t.tzinfo else t.replace(tzinfo=timezone.utc)).timestamp() * 1000) for t in (start, end)
+    )
+    if start_ms > end_ms:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    max_bars = get_settings().EXPORT_MAX_BARS
+    if (end_ms - start_ms) // INTERVAL_MS[interval] > max_bars:
+        raise HTTPException(status_code=400, detail=f"At most {max_bars} bars per export; narrow the range")
+    
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    try:
+        body = await open_export(resolved.binance, interval, start_ms, end_ms, fmt, compress)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"History unavailable: {e}")
+    
+    filename = f"{resolved.binance}-{interval}-{start.strftime('%Y%m%d')}-{end.strftime('%Y%m%d')}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+@router.get("/orderbook/{symbol}")
+async def get_order_book(
+    symbol: str,
+    amount: float = Query(default=10_000, gt=0),
+    action: str = Query(default="BUY", pattern="(?i)^(buy|sell)$")
+):
+    """
+    Spread, depth near the mid price and estimated slippage
+    for an order of `amount` USD.
+    """
+    resolved = await resolve_symbol(symbol)
+    if not resolved.binance:
+        raise HTTPException(status_code=404, detail=f"No order book for {resolved.symbol}")
+    
+    liquidity = await order_books.liquidity(resolved.binance, action.upper(), amount)
+    if liquidity is None:
+        raise HTTPException(status_code=503, detail="Order book unavailable")
+    return liquidity
+
+
+@router.get("/trade-flow/{symbol}")
+async def get_trade_flow(symbol: str):
+    """
+    Rolling VWAP, buy/sell imbalance, trade counts and recent
+    large trades from the live trade stream.
+    """
+    resolved = await resolve_symbol(symbol)
+    if not resolved.binance:
+        raise HTTPException(status_code=404, detail=f"No trade stream for {resolved.symbol}")
+    
+    trade_flow = await trade_streams.flow(resolved.binance)
+    if trade_flow is None:
+        raise HTTPException(status_code=503, detail="Trade stream unavailable")
+    return {"symbol": resolved.symbol, **trade_flow}
+
+
 @router.get("/alerts/{symbol}")
 async def get_market_alerts(symbol: str):
     """
     Get market anomaly alerts.
     Tells users when to PAUSE trading!
     """
-    normalized = normalize_symbol(symbol)
+    resolved = await resolve_symbol(symbol)
+    normalized = resolved.symbol
     
     try:
-        try:
-            prices = await binance.get_historical_prices(
-                f"{normalized}USDT",
-                days=7,
-                interval="1h"
-            )
-        except Exception:
-            prices = await coincap.get_historical_prices(
-                symbol.lower(),
-                days=7,
-                interval="h1"
-            )
+        prices, _ = await get_history(resolved, days=7, interval="1h")
         
         alerts = signal_gen.detect_anomalies(prices)
         
+        # Keep watching the live feed so future alerts get pushed
+        try:
+            await anomaly_monitor.watch(normalized)
+        except Exception as e:
+            print(f"Anomaly watch error for {normalized}: {e}")
+        
         # Check if any alerts require pausing
         should_pause = any(a.should_pause for a in alerts)
         
@@ -236,25 +667,143 @@ async def get_market_alerts(symbol: str):
             "symbol": normalized,
             "alerts": [a.model_dump() for a in alerts],
             "should_pause_trading": should_pause,
-            "alert_count": len(alerts)
+            "alert_count": len(alerts),
+            "recent_alerts": anomaly_monitor.recent(normalized)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/rules")
+async def add_alert_rules(request: AlertRulesRequest):
+    """
+    Register price rules, e.g. BTC crosses_above 70000 or ETH drops 5
+    (percent) within 3600s. Triggers are pushed to ws://.../ws/rules/{owner}.
+    """
+    try:
+        rules = await rules_engine.add(request.owner, [r.model_dump() for r in request.rules])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"owner": request.owner, "rules": [r.to_dict() for r in rules]}
+
+
+@router.get("/rules")
+async def get_alert_rules(owner: str = Query(pattern=OWNER_PATTERN)):
+    """An owner's active rules and their most recent triggers"""
+    return {
+        "owner": owner,
+        "rules": rules_engine.rules(owner),
+        "recent_triggers": await rules_engine.recent(owner)
+    }
+
+
+@router.delete("/rules/{rule_id}")
+async def delete_alert_rule(rule_id: int, owner: str = Query(pattern=OWNER_PATTERN)):
+    """Remove one of an owner's rules"""
+    if not await rules_engine.remove(rule_id, owner):
+        raise HTTPException(status_code=404, detail=f"No rule {rule_id} for {owner}")
+    return {"deleted": rule_id}
+
+
+@router.get("/scanner")
+async def get_scanner(
+    signal: Optional[str] = Query(default=None, pattern="(?i)^(buy|sell|hold)$"),
+    risk_level: Optional[str] = Query(default=None, pattern="(?i)^(low|medium|high)$"),
+    min_volume_usd: float = Query(default=0, ge=0),
+    anomalies_only: bool = False,
+    sort: str = Query(default="score", pattern="^(score|score_asc|volatility|volume)$"),
+    limit: int = Query(default=20, ge=1, le=200)
+):
+    """
+    Strongest BUY/SELL signals across the whole market right now.
+    Served from the background scanner - no upstream calls.
+    """
+    settings = get_settings()
+    if settings.SCANNER_ENABLED:
+        market_scanner.start()
+    
+    return {
+        "results": market_scanner.query(
+            signal=signal,
+            risk_level=risk_level,
+            min_volume_usd=min_volume_usd,
+            anomalies_only=anomalies_only,
+            sort=sort,
+            limit=limit
+        ),
+        "leaderboards": market_scanner.leaderboards(),
+        "scan": market_scanner.stats
+    }
+
+
+def _correlations_ready():
+    """Start the engine if needed; 503 until it has seeded"""
+    if get_settings().CORRELATION_ENABLED:
+        correlation_engine.start()
+    if not correlation_engine.ready:
+        raise HTTPException(status_code=503, detail="Correlations are still warming up")
+
+
+@router.get("/correlations")
+async def get_correlations(symbols: Optional[str] = None):
+    """
+    Rolling correlation matrix of returns across the most liquid coins.
+    `symbols` (comma-separated) narrows it down; default is every tracked coin.
+    Served from memory - no upstream calls.
+    """
+    _correlations_ready()
+    
+    selected = None
+    if symbols:
+        selected = []
+        for symbol in symbols.split(","):
+            resolved = await resolve_symbol(symbol.strip())
+            if resolved.symbol not in correlation_engine.window.index:
+                raise HTTPException(status_code=404, detail=f"{resolved.symbol} is not tracked for correlations")
+            selected.append(resolved.symbol)
+    
+    return correlation_engine.matrix(selected)
+
+
+@router.get("/correlations/{symbol}")
+async def get_correlated(
+    symbol: str,
+    k: int = Query(default=10, ge=1, le=100),
+    order: str = Query(default="most", pattern="^(most|least)$")
+):
+    """Coins that currently move most (or least) with a symbol, with beta"""
+    _correlations_ready()
+    
+    resolved = await resolve_symbol(symbol)
+    if resolved.symbol not in correlation_engine.window.index:
+        raise HTTPException(status_code=404, detail=f"{resolved.symbol} is not tracked for correlations")
+    
+    return {
+        "symbol": resolved.symbol,
+        **correlation_engine.info(),
+        "order": order,
+        "results": correlation_engine.top_correlated(resolved.symbol, k=k, least=order == "least")
+    }
+
+
 @router.get("/providers")
 async def get_providers():
     """Check which data providers are available"""
     settings = get_settings()
     
-    binance_ok = await binance.health_check()
-    coincap_ok = await coincap.health_check()
+    binance_ok, coincap_ok = await asyncio.gather(binance.health_check(), coincap.health_check())
     
     return {
         "providers": [
             {"name": "Binance", "status": "online" if binance_ok else "offline"},
             {"name": "CoinCap", "status": "online" if coincap_ok else "offline"}
         ],
+        "budgets": scheduler.stats(),
+        "candles": candle_aggregator.stats(),
+        "caches": memory_budget.stats(),
+        "requests": deadline_stats,
         "binance_affiliate_id": settings.BINANCE_AFFILIATE_ID or None
     }
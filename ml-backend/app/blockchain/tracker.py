@@ -2,11 +2,18 @@
 Blockchain Integration - Whale Detection & On-chain Data
 Uses free blockchain explorer APIs
 """
+import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import List, Dict, Any, Optional, Deque
 from datetime import datetime, timedelta
 from pydantic import BaseModel
-from cachetools import TTLCache
+
+from ..config import get_settings
+from ..cache import BudgetedCache
+from ..providers.scheduler import hop_timeout
+from ..services.prices import price_book
 
 
 class WhaleTransaction(BaseModel):
@@ -21,6 +28,181 @@ class WhaleTransaction(BaseModel):
     is_exchange: bool  # True if to/from known exchange
 
 
+class ChainAdapter(ABC):
+    """
+    Base whale scanner for one chain.
+    Keeps a block cursor so each scan only processes NEW blocks.
+    """
+    
+    chain: str = ""
+    symbol: str = ""
+    
+    def __init__(self, history_size: int = 50):
+        self.cursor: Optional[int] = None  # Last processed block height
+        self.recent: Deque[WhaleTransaction] = deque(maxlen=history_size)
+    
+    @abstractmethod
+    async def latest_height(self, client: httpx.AsyncClient) -> int:
+        """Get the current chain tip"""
+        pass
+    
+    @abstractmethod
+    async def fetch_transfers(
+        self, 
+        client: httpx.AsyncClient, 
+        height: int
+    ) -> List[Dict[str, Any]]:
+        """Get transfers in a block as dicts (hash, from, to, amount, timestamp)"""
+        pass
+    
+    async def scan(
+        self,
+        client: httpx.AsyncClient,
+        price: float,
+        min_usd: float,
+        max_blocks: int,
+        exchange_addresses: set
+    ) -> Dict[str, Any]:
+        """
+        Process blocks added since the last scan, keeping every transfer
+        worth at least min_usd. The cursor moves past these blocks for
+        good, so min_usd must be the lowest threshold any reader uses.
+        """
+        latest = await self.latest_height(client)
+        start = latest - max_blocks + 1
+        if self.cursor is not None:
+            start = max(start, self.cursor + 1)
+        heights = list(range(start, latest + 1))
+        
+        blocks = await asyncio.gather(
+            *(self.fetch_transfers(client, h) for h in heights)
+        )
+        self.cursor = latest
+        
+        found = []
+        for transfers in blocks:
+            for t in transfers:
+                usd_value = t["amount"] * price
+                if usd_value < min_usd:
+                    continue
+                found.append(WhaleTransaction(
+                    tx_hash=t["hash"],
+                    from_address=t["from"],
+                    to_address=t["to"],
+                    amount=t["amount"],
+                    symbol=self.symbol,
+                    usd_value=usd_value,
+                    timestamp=t["timestamp"],
+                    is_exchange=(
+                        t["from"].lower() in exchange_addresses or
+                        t["to"].lower() in exchange_addresses
+                    )
+                ))
+        
+        found.sort(key=lambda w: w.usd_value, reverse=True)
+        self.recent.extendleft(reversed(found))
+        
+        return {
+            "chain": self.chain,
+            "cursor": self.cursor,
+            "new_blocks": len(heights),
+            "new_whales": len(found)
+        }
+
+
+class BitcoinAdapter(ChainAdapter):
+    """Bitcoin blocks from blockchain.info"""
+    
+    chain = "bitcoin"
+    symbol = "BTC"
+    
+    def __init__(self, base_url: str, history_size: int = 50):
+        super().__init__(history_size)
+        self.base_url = base_url
+    
+    async def latest_height(self, client: httpx.AsyncClient) -> int:
+        response = await client.get(f"{self.base_url}/latestblock", timeout=hop_timeout(10))
+        response.raise_for_status()
+        return int(response.json()["height"])
+    
+    async def fetch_transfers(
+        self, 
+        client: httpx.AsyncClient, 
+        height: int
+    ) -> List[Dict[str, Any]]:
+        response = await client.get(
+            f"{self.base_url}/block-height/{height}",
+            params={"format": "json"},
+            timeout=hop_timeout(30)
+        )
+        response.raise_for_status()
+        
+        transfers = []
+        for block in response.json().get("blocks", []):
+            timestamp = datetime.fromtimestamp(block.get("time", 0))
+            for tx in block.get("tx", []):
+                outputs = tx.get("out", [])
+                inputs = tx.get("inputs", [])
+                total_output = sum(out.get("value", 0) for out in outputs)
+                transfers.append({
+                    "hash": tx.get("hash", ""),
+                    "from": (inputs[0].get("prev_out") or {}).get("addr", "coinbase") if inputs else "coinbase",
+                    "to": outputs[0].get("addr", "unknown") if outputs else "unknown",
+                    "amount": total_output / 100_000_000,  # Satoshis to BTC
+                    "timestamp": timestamp
+                })
+        return transfers
+
+
+class EvmRpcAdapter(ChainAdapter):
+    """EVM chains (Ethereum, BNB Smart Chain) via a JSON-RPC node"""
+    
+    def __init__(self, chain: str, symbol: str, rpc_url: str, history_size: int = 50):
+        super().__init__(history_size)
+        self.chain = chain
+        self.symbol = symbol
+        self.rpc_url = rpc_url
+        self._request_id = 0
+    
+    async def _rpc(self, client: httpx.AsyncClient, method: str, params: list) -> Any:
+        """Make a JSON-RPC call"""
+        self._request_id += 1
+        response = await client.post(
+            self.rpc_url,
+            json={"jsonrpc": "2.0", "id": self._request_id, "method": method, "params": params},
+            timeout=hop_timeout(15)
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("error"):
+            raise RuntimeError(f"{self.chain} RPC error: {data['error']}")
+        return data["result"]
+    
+    async def latest_height(self, client: httpx.AsyncClient) -> int:
+        return int(await self._rpc(client, "eth_blockNumber", []), 16)
+    
+    async def fetch_transfers(
+        self, 
+        client: httpx.AsyncClient, 
+        height: int
+    ) -> List[Dict[str, Any]]:
+        block = await self._rpc(client, "eth_getBlockByNumber", [hex(height), True])
+        if not block:
+            return []
+        
+        timestamp = datetime.fromtimestamp(int(block.get("timestamp", "0x0"), 16))
+        return [
+            {
+                "hash": tx.get("hash", ""),
+                "from": tx.get("from") or "unknown",
+                "to": tx.get("to") or "contract-creation",
+                "amount": int(tx.get("value", "0x0"), 16) / 10**18,  # Wei to coin
+                "timestamp": timestamp
+            }
+            for tx in block.get("transactions", [])
+        ]
+
+
 class BlockchainTracker:
     """
     Tracks whale movements using free blockchain APIs.
@@ -28,13 +210,87 @@ class BlockchainTracker:
     """
     
     def __init__(self):
-        self._cache = TTLCache(maxsize=100, ttl=60)
+        settings = get_settings()
+        self._cache = BudgetedCache("whales", ttl=60, cost=5)  # A scan reads several blocks
+        self.blockchain_info_url = settings.BLOCKCHAIN_INFO_URL
+        self.max_blocks_per_scan = settings.WHALE_MAX_BLOCKS_PER_SCAN
+        self.min_usd = settings.WHALE_MIN_USD  # Floor for what scans keep; callers filter above it
         
         # Known exchange addresses (simplified)
         self.exchange_addresses = {
             "binance": ["bc1qm34lsc65zpw79lxes69zkqmk6ee3ewf0j77s3h"],
             "coinbase": ["bc1q7cyrfmck2ffu2ud3rn5l5a8yv6f0chkp0zpemf"],
         }
+        self._exchange_set = {
+            addr.lower() for addrs in self.exchange_addresses.values() for addr in addrs
+        }
+        
+        # One adapter per chain, keyed by ticker
+        history = settings.WHALE_HISTORY_SIZE
+        self.adapters: Dict[str, ChainAdapter] = {
+            "BTC": BitcoinAdapter(self.blockchain_info_url, history),
+            "ETH": EvmRpcAdapter("ethereum", "ETH", settings.ETH_RPC_URL, history),
+            "BNB": EvmRpcAdapter("bsc", "BNB", settings.BSC_RPC_URL, history),
+        }
+        self._scan_lock = asyncio.Lock()
+    
+    async def scan_whales(
+        self,
+        chains: Optional[List[str]] = None,
+        min_usd: float = 1_000_000
+    ) -> Dict[str, Any]:
+        """
+        Scan several chains concurrently.
+        Each adapter only processes blocks added since its last scan and
+        keeps everything above self.min_usd; min_usd filters the report.
+        """
+        symbols = [c.upper() for c in (chains or self.adapters.keys())]
+        symbols = [s for s in symbols if s in self.adapters]
+        
+        # Scans move block cursors, so never run two at once
+        async with self._scan_lock:
+            async with httpx.AsyncClient() as client:
+                prices = await price_book.get_many(symbols, client)
+                results = await asyncio.gather(
+                    *(self._scan_chain(client, s, prices.get(s)) for s in symbols)
+                )
+        
+        chains_out = {}
+        for symbol, result in zip(symbols, results):
+            whales = [w for w in self.adapters[symbol].recent if w.usd_value >= min_usd]
+            chains_out[symbol] = {
+                **result,
+                "price_usd": prices.get(symbol),
+                "whale_count": len(whales),
+                "total_volume_usd": sum(w.usd_value for w in whales),
+                "transactions": [w.model_dump() for w in whales[:10]]
+            }
+        
+        return {
+            "chains": chains_out,
+            "whale_count": sum(c["whale_count"] for c in chains_out.values()),
+            "total_volume_usd": sum(c["total_volume_usd"] for c in chains_out.values()),
+            "timestamp": datetime.now().isoformat()
+        }
+    
+    async def _scan_chain(
+        self,
+        client: httpx.AsyncClient,
+        symbol: str,
+        price: Optional[float]
+    ) -> Dict[str, Any]:
+        """Run one adapter, reporting errors instead of failing the whole scan"""
+        adapter = self.adapters[symbol]
+        if price is None:
+            return {"chain": adapter.chain, "cursor": adapter.cursor, "error": "No price available"}
+        
+        try:
+            return await adapter.scan(
+                client, price, self.min_usd, self.max_blocks_per_scan, self._exchange_set
+            )
+        except Exception as e:
+            print(f"{adapter.chain} whale scan error: {e}")
+            return {"chain": adapter.chain, "cursor": adapter.cursor, "error": str(e)}
     
     async def get_whale_alerts(
         self, 
@@ -55,7 +311,9 @@ class BlockchainTracker:
             if symbol.upper() in ["BTC", "BITCOIN"]:
                 transactions = await self._get_btc_whales(min_usd)
             elif symbol.upper() in ["ETH", "ETHEREUM"]:
-                transactions = await self._get_eth_whales(min_usd)
+                transactions = await self._get_chain_whales("ETH", min_usd)
+            elif symbol.upper() in ["BNB", "BINANCECOIN"]:
+                transactions = await self._get_chain_whales("BNB", min_usd)
             else:
                 # Generic approach for other coins
                 transactions = await self._get_generic_whales(symbol, min_usd)
@@ -71,14 +329,17 @@ class BlockchainTracker:
         
         try:
             async with httpx.AsyncClient() as client:
-                # Get recent unconfirmed transactions
-                response = await client.get(
-                    "https://blockchain.info/unconfirmed-transactions?format=json",
-                    timeout=10
+                # Get recent unconfirmed transactions and the price together
+                response, prices = await asyncio.gather(
+                    client.get(
+                        f"{self.blockchain_info_url}/unconfirmed-transactions?format=json",
+                        timeout=hop_timeout(10)
+                    ),
+                    price_book.get_many(["BTC"], client)
                 )
                 data = response.json()
                 
-                btc_price = await self._get_btc_price()
+                btc_price = prices.get("BTC", 40000)  # Fallback
                 
                 for tx in data.get("txs", [])[:50]:
                     total_output = sum(out.get("value", 0) for out in tx.get("out", []))
@@ -86,42 +347,32 @@ class BlockchainTracker:
                     usd_value = btc_amount * btc_price
                     
                     if usd_value >= min_usd:
+                        to_address = tx.get("out", [{}])[0].get("addr", "unknown")
                         transactions.append(WhaleTransaction(
                             tx_hash=tx.get("hash", ""),
                             from_address="multiple",
-                            to_address=tx.get("out", [{}])[0].get("addr", "unknown"),
+                            to_address=to_address,
                             amount=btc_amount,
                             symbol="BTC",
                             usd_value=usd_value,
                             timestamp=datetime.now(),
-                            is_exchange=False
+                            is_exchange=to_address.lower() in self._exchange_set
                         ))
         except Exception as e:
             print(f"BTC whale error: {e}")
         
         return transactions[:10]  # Return top 10
     
-    async def _get_eth_whales(self, min_usd: float) -> List[WhaleTransaction]:
-        """Get large ETH transactions - using public API"""
-        # Note: For production, use Etherscan API with free key
-        return []
+    async def _get_chain_whales(self, symbol: str, min_usd: float) -> List[WhaleTransaction]:
+        """Get large transactions from a chain adapter's recent blocks"""
+        await self.scan_whales([symbol], min_usd)
+        adapter = self.adapters[symbol]
+        return [w for w in adapter.recent if w.usd_value >= min_usd][:10]
     
     async def _get_generic_whales(self, symbol: str, min_usd: float) -> List[WhaleTransaction]:
         """Fallback for other coins"""
         return []
     
-    async def _get_btc_price(self) -> float:
-        """Get current BTC price"""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api.binance.com/api/v3/ticker/price",
-                    params={"symbol": "BTCUSDT"}
-                )
-                return float(response.json()["price"])
-        except:
-            return 40000  # Fallback
-    
     async def get_whale_summary(self, symbol: str) -> Dict[str, Any]:
         """Get summary of whale activity"""
         whales = await self.get_whale_alerts(symbol)
@@ -0,0 +1,301 @@
+"""
+Memory-budgeted Caches
+Every cache estimates the bytes of what it holds and draws on ONE shared
+budget (CACHE_MEMORY_BUDGET_MB). When the budget is full, expired entries
+go first, then the entry with the least value per byte across all caches
+(GreedyDual-Size-Frequency): a 1,000-candle list nobody reads is evicted
+long before a hot price.
+"""
+import heapq
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+
+from .config import get_settings
+
+
+_SAMPLE = 16  # Items sized per container; the rest are extrapolated
+_MISSING = object()
+
+
+def estimate_size(value: Any, _seen: Optional[set] = None) -> int:
+    """
+    Approximate deep size in bytes. Large lists and dicts are sized from a
+    sample of their items, so estimating a 1,000-candle list stays cheap.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, (str, bytes, bytearray, int, float, bool)) or value is None:
+        return sys.getsizeof(value)
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (0 if value.base is None else value.nbytes)
+    if hasattr(value, "memory_usage") and hasattr(value, "dtypes"):
+        # pandas objects know their own size
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        items = [(k, v) for k, v in itertools.islice(value.items(), _SAMPLE)]
+        sampled = sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in items)
+        return size + (sampled * len(value) // len(items) if items else 0)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = list(itertools.islice(value, _SAMPLE))
+        sampled = sum(estimate_size(v, seen) for v in items)
+        return size + (sampled * len(value) // len(items) if items else 0)
+
+    # Objects: pydantic models, dataclasses, plain classes
+    if hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), seen)
+    for name in getattr(type(value), "__slots__", ()):
+        if hasattr(value, name):
+            size += estimate_size(getattr(value, name), seen)
+    return size
+
+
+class _Entry:
+    __slots__ = ("key", "value", "size", "cost", "hits", "priority", "expires_at")
+
+    def __init__(self, key: Hashable, value: Any, size: int, cost: float, expires_at: Optional[float]):
+        self.key = key
+        self.value = value
+        self.size = size
+        self.cost = cost
+        self.hits = 0
+        self.priority = 0.0
+        self.expires_at = expires_at
+
+    def expired(self, now: float) -> bool:
+        return self.expires_at is not None and now >= self.expires_at
+
+
+class MemoryBudget:
+    """
+    One byte budget shared by every BudgetedCache.
+    Eviction priority is clock + hits * cost / size (GDSF): small, often
+    read and costly to rebuild stays; the clock ages out old favourites.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.evictions = 0
+        self._caches: List["BudgetedCache"] = []
+        self._heap: List[tuple] = []  # (priority, seq, cache, entry); stale items skipped
+        self._seq = itertools.count()
+        self._clock = 0.0
+        self._lock = threading.RLock()
+
+    def register(self, cache: "BudgetedCache"):
+        self._caches.append(cache)
+
+    def _prioritize(self, cache: "BudgetedCache", entry: _Entry):
+        entry.priority = self._clock + (entry.hits + 1) * entry.cost / max(entry.size, 1)
+        heapq.heappush(self._heap, (entry.priority, next(self._seq), cache, entry))
+        # Every hit pushes a new item; rebuild before the stale ones pile up
+        if len(self._heap) > 4 * sum(len(c) for c in self._caches) + 1024:
+            self._heap = [item for item in self._heap if self._live(item)]
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _live(item: tuple) -> bool:
+        priority, _, cache, entry = item
+        return cache._data.get(entry.key) is entry and entry.priority == priority
+
+    def _make_room(self):
+        if self.used <= self.max_bytes:
+            return
+        now = time.monotonic()
+        for cache in self._caches:
+            cache._purge_expired(now)
+
+        while self.used > self.max_bytes and self._heap:
+            item = heapq.heappop(self._heap)
+            if not self._live(item):
+                continue
+            priority, _, cache, entry = item
+            self._clock = priority
+            cache._evict(entry.key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget use overall and per cache (caches sharing a name are summed)"""
+        with self._lock:
+            caches: Dict[str, Dict[str, int]] = {}
+            for cache in self._caches:
+                totals = caches.setdefault(cache.name, {})
+                for key, value in cache.stats().items():
+                    totals[key] = totals.get(key, 0) + value
+            return {
+                "budget_bytes": self.max_bytes,
+                "used_bytes": self.used,
+                "used_percent": round(self.used / self.max_bytes * 100, 1) if self.max_bytes else None,
+                "entries": sum(c["entries"] for c in caches.values()),
+                "evictions": self.evictions,
+                "caches": caches
+            }
+
+
+class BudgetedCache:
+    """
+    TTL cache whose entries are sized in bytes and count against a shared
+    MemoryBudget. With keep_stale, expired entries stay readable through
+    get_stale() (fallbacks when the upstream budget is exhausted) until the
+    memory budget needs the room.
+    `cost` is how expensive an entry is to rebuild, relative to one
+    upstream request. `max_entries` caps the entry count on top of the
+    bytes (oldest write goes first), for caches of many tiny entries that
+    would otherwise outrank large hot ones.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: Optional[float] = None,
+        cost: float = 1.0,
+        keep_stale: bool = False,
+        max_entries: Optional[int] = None,
+        budget: Optional[MemoryBudget] = None
+    ):
+        self.name = name
+        self.ttl = ttl
+        self.cost = cost
+        self.keep_stale = keep_stale
+        self.max_entries = max_entries
+        self.budget = budget or memory_budget
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()  # Oldest write first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.rejected = 0
+        self.budget.register(self)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _fresh(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is not None and entry.expired(time.monotonic()):
+            if not self.keep_stale:
+                self._remove(key)
+            return None
+        return entry
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Counts as the read (`if key in cache: return cache[key]`)"""
+        with self.budget._lock:
+            entry = self._fresh(key)
+            if entry is None:
+                self.misses += 1
+                return False
+            self._hit(entry)
+            return True
+
+    def __getitem__(self, key: Hashable) -> Any:
+        with self.budget._lock:
+            entry = self._fresh(key)
+            if entry is None:
+                raise KeyError(key)
+            return entry.value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.set(key, value)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.budget._lock:
+            entry = self._fresh(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._hit(entry)
+            return entry.value
+
+    def get_stale(self, key: Hashable, default: Any = None) -> Any:
+        """Latest value for a key even if it has expired (until evicted)"""
+        with self.budget._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self.stale_hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, cost: Optional[float] = None):
+        size = estimate_size(value) + estimate_size(key)
+        with self.budget._lock:
+            self._remove(key)
+            if size > self.budget.max_bytes // 4:
+                self.rejected += 1  # Would flush most of everything else
+                return
+
+            expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+            entry = _Entry(key, value, size, self.cost if cost is None else cost, expires_at)
+            self._data[key] = entry
+            self.bytes += size
+            self.budget.used += size
+            self.budget._prioritize(self, entry)
+            if self.max_entries is not None and len(self._data) > self.max_entries:
+                self._evict(next(iter(self._data)))
+            self.budget._make_room()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self.budget._lock:
+            value = self._remove(key)
+            return default if value is _MISSING else value
+
+    def clear(self):
+        with self.budget._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def _hit(self, entry: _Entry):
+        self.hits += 1
+        entry.hits += 1
+        self.budget._prioritize(self, entry)
+
+    def _remove(self, key: Hashable) -> Any:
+        """Drop an entry and return its value (_MISSING if there was none)"""
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return _MISSING
+        self.bytes -= entry.size
+        self.budget.used -= entry.size
+        # Outdated heap items still point at the entry; don't let them pin the value
+        value, entry.value = entry.value, None
+        return value
+
+    def _purge_expired(self, now: float):
+        # One TTL per cache, so expired entries are the oldest writes
+        while self._data:
+            entry = next(iter(self._data.values()))
+            if not entry.expired(now):
+                break
+            self._evict(entry.key)
+
+    def _evict(self, key: Hashable):
+        self._remove(key)
+        self.evictions += 1
+        self.budget.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "evictions": self.evictions,
+            "rejected": self.rejected
+        }
+
+
+# Global instance
+memory_budget = MemoryBudget(get_settings().CACHE_MEMORY_BUDGET_MB * 1024 * 1024)
@@ -22,14 +22,115 @@ class Settings(BaseSettings):
     COINCAP_BASE_URL: str = "https://api.coincap.io/v2"
     COINGECKO_BASE_URL: str = "https://api.coingecko.com/api/v3"
     
+    # Upstream rate-limit budgets
+    BINANCE_WEIGHT_PER_MINUTE: int = 6000
+    COINCAP_REQUESTS_PER_MINUTE: int = 200
+    UPSTREAM_BUDGET_RESERVE: float = 0.2  # Fraction kept for interactive requests
+    UPSTREAM_MAX_WAIT_SECONDS: float = 5.0
+    UPSTREAM_TIMEOUT_SECONDS: float = 10.0  # Per upstream call, further capped by the request deadline
+    
+    # Request deadlines (total time to answer, across every upstream hop)
+    REQUEST_DEADLINE_SECONDS: float = 15.0
+    REQUEST_DEADLINE_OVERRIDES: dict = {"/api/v1/whales": 45.0, "/api/v1/strategy/evaluate": 30.0}  # Path prefix -> seconds
+    
+    # Symbol resolver (exchange metadata)
+    SYMBOLS_SNAPSHOT_PATH: str = ".cache/symbols.json"
+    SYMBOLS_REFRESH_SECONDS: int = 3600
+    SYMBOLS_NEGATIVE_TTL_SECONDS: int = 600
+    
+    # Record & replay (offline runs from a local archive)
+    REPLAY_ARCHIVE: str = ""  # .npz to replay instead of calling Binance
+    REPLAY_SPEED: float = 1.0  # 1 = real time, N = N x faster, 0 = as fast as possible
+    REPLAY_RECORD_PATH: str = ""  # Capture live Binance data to this .npz
+    
+    # Startup warm-up (gates /ready)
+    WARMUP_ENABLED: bool = True
+    WARMUP_STEPS: list = ["symbols", "coins", "prices", "histories", "forecasts", "scanner", "correlations"]
+    WARMUP_SYMBOLS: int = 20  # Top coins by volume to prefetch
+    WARMUP_TIMEOUT_SECONDS: float = 90
+    
+    # WebSocket fan-out ("" = in-process; redis://host:6379/0 spans workers)
+    PUBSUB_URL: str = ""
+    WS_PUSH_SECONDS: float = 2.0
+    WS_LEASE_SECONDS: float = 10.0  # A crashed producer is replaced within this
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # Slower clients are dropped
+    
     # Cache settings
     CACHE_TTL_SECONDS: int = 60
     CACHE_MAX_SIZE: int = 1000
+    CACHE_MEMORY_BUDGET_MB: int = 256  # Shared by every provider, forecast and whale cache
+    
+    # Shared-memory price board (multi-worker deployments)
+    PRICE_BOARD_ENABLED: bool = False
+    PRICE_BOARD_NAME: str = "cryptomaniac_prices"
+    PRICE_BOARD_CAPACITY: int = 2048
+    PRICE_BOARD_MAX_AGE_SECONDS: float = 10.0
+    PRICE_BOARD_POLL_SECONDS: float = 2.0
+    
+    # Candle aggregation (1m base stream rolled up in memory)
+    CANDLE_POLL_SECONDS: float = 2.0
+    CANDLE_MAX_BARS: int = 1000  # Bars fetched per tier when a symbol is seeded
+    CANDLE_RETAIN_BARS: int = 43_200  # Bars kept per tier (30 days of 1m)
+    CANDLE_CHUNK_SIZE: int = 256  # Bars per compressed block
+    CANDLE_IDLE_SECONDS: int = 900
+    
+    # Order books (L2 depth) and liquidity checks
+    ORDER_BOOK_SNAPSHOT_LIMIT: int = 1000
+    ORDER_BOOK_MAX_LEVELS: int = 5000
+    ORDER_BOOK_POLL_SECONDS: float = 5.0  # Snapshot interval when the stream is down
+    ORDER_BOOK_IDLE_SECONDS: int = 300
+    ORDER_BOOK_MAX_SYMBOLS: int = 100  # Books kept at once; the least recently used is dropped
+    LIQUIDITY_DEPTH_BPS: float = 50  # "Depth" = USD within this distance of mid
+    
+    # Trade stream aggregation
+    TRADE_WINDOWS_SECONDS: list = [60, 300, 900, 3600]
+    TRADE_LARGE_USD: float = 100_000
+    TRADE_POLL_SECONDS: float = 2.0  # aggTrades polling when the stream is down
+    TRADE_IDLE_SECONDS: int = 300
+    TRADE_MAX_SYMBOLS: int = 200  # Streams kept at once; the least recently used is dropped
+    
+    # Live anomaly alerts and price rules
+    ANOMALY_INTERVAL: str = "1h"
+    ALERT_HISTORY_SIZE: int = 50
+    RULES_MAX_PER_OWNER: int = 1000
+    RULES_FEED_SECONDS: int = 60  # Keeps live trade feeds up for symbols with rules
+    
+    # Background market scanner
+    SCANNER_ENABLED: bool = True
+    SCANNER_INTERVAL_SECONDS: int = 300
+    SCANNER_MAX_SYMBOLS: int = 200
+    SCANNER_CONCURRENCY: int = 10
+    
+    # Rolling correlations across the most liquid pairs
+    CORRELATION_ENABLED: bool = True
+    CORRELATION_INTERVAL: str = "1h"
+    CORRELATION_WINDOW: int = 168  # Bars (one week of hourly returns)
+    CORRELATION_MAX_SYMBOLS: int = 50
+    CORRELATION_CONCURRENCY: int = 5
+    CORRELATION_REFRESH_SECONDS: int = 60  # How often to check for a newly closed bar
+    
+    # Portfolio valuation and risk
+    PORTFOLIO_HISTORY_DAYS: int = 90  # Daily returns behind volatility and VaR
+    
+    # History export (/history/{symbol}/export)
+    EXPORT_MAX_BARS: int = 200_000  # Per request (~4.5 months of 1m bars)
+    EXPORT_GZIP_LEVEL: int = 6
     
     # ML settings
     PREDICTION_DAYS_DEFAULT: int = 7
     PREDICTION_DAYS_MAX: int = 30
+    FORECASTER_MODEL_DIR: str = ".cache/forecaster"  # Written by `python -m app.models.forecaster train`
+    STRATEGY_SPEC_PATH: str = ""  # JSON StrategySpec for signals (default blend when empty)
     
+    # Blockchain / whale tracking
+    BLOCKCHAIN_INFO_URL: str = "https://blockchain.info"
+    ETH_RPC_URL: str = "https://cloudflare-eth.com"
+    BSC_RPC_URL: str = "https://bsc-dataseed.binance.org"
+    WHALE_MIN_USD: float = 1_000_000
+    WHALE_MAX_BLOCKS_PER_SCAN: int = 3
+    WHALE_HISTORY_SIZE: int = 50
+    PRICE_SOURCE_TTL_SECONDS: int = 30
+
     # Binance Affiliate (user configures this)
     BINANCE_AFFILIATE_ID: str = ""
     
@@ -2,16 +2,100 @@
 CryptoManiac AI Trading Guardian - FastAPI Main Server
 Real-time ML signals, predictions, and trade validation
 """
-from fastapi import FastAPI, WebSocket
+import asyncio
+
+from fastapi import FastAPI, WebSocket, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 
 from .config import get_settings
 from .api import router
+from .api.middleware import DeadlineMiddleware
+from .api.routes import binance, predictor, get_history
 from .services.websocket import streamer
+from .services.candles import candle_aggregator
+from .services.scanner import market_scanner
+from .services.orderbook import order_books
+from .services.trades import trade_streams
+from .services.correlations import correlation_engine
+from .services.prices import price_book
+from .services.warmup import warmup
+from .services.rules import rules_engine
+from .providers.symbols import symbol_resolver
+from .providers.replay import active_replay, active_recorder
 from .blockchain import blockchain_tracker
 
 
+def register_warmup_steps():
+    """Prefetch what the first requests will need"""
+    settings = get_settings()
+    top_symbols = []
+    
+    async def symbols():
+        if not symbol_resolver.loaded:
+            await symbol_resolver.refresh()
+        return "loaded" if symbol_resolver.loaded else "unavailable"
+    
+    async def coins():
+        coins = await binance.get_supported_coins()
+        top_symbols[:] = [c.symbol for c in coins[:settings.WARMUP_SYMBOLS]]
+        return f"{len(coins)} coins"
+    
+    async def prices():
+        found = await price_book.get_many(top_symbols)
+        return f"{len(found)} prices"
+    
+    async def for_top_symbols(fetch):
+        semaphore = asyncio.Semaphore(settings.SCANNER_CONCURRENCY)
+        
+        async def one(symbol: str) -> bool:
+            async with semaphore:
+                resolved = symbol_resolver.lookup(symbol)
+                if resolved is None:
+                    return False
+                try:
+                    await fetch(resolved)
+                    return True
+                except Exception as e:
+                    print(f"Warm-up error for {symbol}: {e}")
+                    return False
+        
+        results = await asyncio.gather(*(one(s) for s in top_symbols))
+        return f"{sum(results)}/{len(results)} symbols"
+    
+    async def histories():
+        # Same history /predict and /signals ask for (served by the candle aggregator)
+        return await for_top_symbols(lambda resolved: get_history(resolved, days=365))
+    
+    async def forecasts():
+        async def forecast(resolved):
+            prices, _ = await get_history(resolved, days=365)
+            await predictor.predict(prices, cache_key=resolved.symbol)
+        return await for_top_symbols(forecast)
+    
+    async def wait_for(check, what: str):
+        while not check():
+            await asyncio.sleep(0.5)
+        return what
+    
+    steps = {
+        "symbols": (symbols, ()),
+        "coins": (coins, ()),
+        "prices": (prices, ("coins",)),
+        "histories": (histories, ("symbols", "coins")),
+        "forecasts": (forecasts, ("histories",)),
+    }
+    if settings.SCANNER_ENABLED:
+        steps["scanner"] = (lambda: wait_for(lambda: market_scanner.stats.get("scans", 0) > 0, "first scan done"), ())
+    if settings.CORRELATION_ENABLED:
+        steps["correlations"] = (lambda: wait_for(lambda: correlation_engine.ready, "matrix seeded"), ())
+    
+    for name, (run, after) in steps.items():
+        if name in settings.WARMUP_STEPS:
+            warmup.add_step(name, run, after=[a for a in after if a in settings.WARMUP_STEPS])
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events"""
@@ -21,8 +105,37 @@ async def lifespan(app: FastAPI):
     print("🤖 ML Models: Prophet, Multi-Strategy Signals")
     print("⚡ WebSocket: Real-time streaming enabled")
     print("🐋 Blockchain: Whale tracking active")
+    symbol_resolver.start()
+    replay = active_replay()
+    if replay is not None:
+        streamer.start_replay(replay)
+        print(f"⏯️  Replay: {settings.REPLAY_ARCHIVE} (speed {settings.REPLAY_SPEED:g})")
+    if settings.SCANNER_ENABLED:
+        market_scanner.start()
+        print("🔎 Scanner: Market-wide signals enabled")
+    if settings.CORRELATION_ENABLED:
+        correlation_engine.start()
+    rules_engine.start()
+    if settings.WARMUP_ENABLED:
+        register_warmup_steps()
+        warmup.start()
+        print(f"🔥 Warm-up: {', '.join(warmup.steps)}")
     yield
     print("👋 Shutting down...")
+    await warmup.stop()
+    await rules_engine.stop()  # Releases its lease before the streamer closes the broker
+    await streamer.stop()
+    await market_scanner.stop()
+    await correlation_engine.stop()
+    await symbol_resolver.stop()
+    await candle_aggregator.stop()
+    await order_books.stop()
+    await trade_streams.stop()
+    if replay is not None:
+        await replay.stop()
+    recorder = active_recorder()
+    if recorder is not None:
+        recorder.save()
 
 
 # Create FastAPI app
@@ -52,6 +165,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Total time budget per request (inside CORS, so 504s still carry CORS headers)
+app.add_middleware(
+    DeadlineMiddleware,
+    default_seconds=settings.REQUEST_DEADLINE_SECONDS,
+    overrides=settings.REQUEST_DEADLINE_OVERRIDES,
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +194,16 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness for load balancers: 503 until the startup warm-up has
+    finished (or timed out), 200 after. /health only says the process is up.
+    """
+    status = warmup.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 # WebSocket endpoint for real-time streaming
 @app.websocket("/ws/{symbol}")
 async def websocket_endpoint(websocket: WebSocket, symbol: str):
@@ -84,7 +214,28 @@ async def websocket_endpoint(websocket: WebSocket, symbol: str):
     await streamer.stream_prices(websocket, symbol)
 
 
+@app.websocket("/ws/rules/{owner}")
+async def rules_websocket(websocket: WebSocket, owner: str):
+    """
+    Triggered price rules for one owner (see POST /api/v1/rules).
+    Connect to: ws://localhost:8000/ws/rules/alice
+    """
+    await streamer.stream_rule_alerts(websocket, owner)
+
+
 # Blockchain whale tracking
+@app.get("/api/v1/whales")
+async def scan_whales(
+    chains: str = Query(default="btc,eth,bnb"),
+    min_usd: float = Query(default=settings.WHALE_MIN_USD, ge=settings.WHALE_MIN_USD)
+):
+    """Scan several chains at once for new whale transactions"""
+    return await blockchain_tracker.scan_whales(
+        [c.strip() for c in chains.split(",") if c.strip()],
+        min_usd=min_usd
+    )
+
+
 @app.get("/api/v1/whales/{symbol}")
 async def get_whales(symbol: str):
     """Get whale activity for a coin"""
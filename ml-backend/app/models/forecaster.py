@@ -0,0 +1,307 @@
+"""
+Batch-trained Linear Forecaster
+One ridge model over lag, momentum and volatility features, trained
+across many symbols at once and persisted as .npy arrays that load
+memory-mapped, so inference is a single matrix product.
+
+Train with:  python -m app.models.forecaster train --symbols 100
+"""
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# scikit-learn is only needed to train, not to serve
+try:
+    from sklearn.linear_model import Ridge
+    from sklearn.preprocessing import StandardScaler
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+
+from ..config import get_settings
+
+
+FEATURES = (
+    "return_1d", "return_lag_1", "return_lag_2", "return_lag_3", "return_lag_4",
+    "momentum_7d", "momentum_14d", "momentum_30d",
+    "volatility_7d", "volatility_30d",
+    "distance_sma_30",
+)
+MIN_HISTORY = 31  # Closes needed for one feature row
+
+
+def _shift(x: np.ndarray, k: int) -> np.ndarray:
+    """Shift right along time, padding with NaN"""
+    out = np.full_like(x, np.nan)
+    out[:, k:] = x[:, :-k]
+    return out
+
+
+def _rolling_mean(x: np.ndarray, k: int) -> np.ndarray:
+    """Trailing k-sample mean along time (NaN until k samples exist)"""
+    csum = np.cumsum(np.nan_to_num(x), axis=1)
+    out = np.full_like(x, np.nan)
+    out[:, k - 1:] = csum[:, k - 1:] - np.concatenate((np.zeros((x.shape[0], 1)), csum[:, :-k]), axis=1)
+    return out / k
+
+
+def build_features(closes: np.ndarray) -> np.ndarray:
+    """
+    (symbols x days) closes -> (symbols x days x features).
+    Rows without enough history are NaN.
+    """
+    closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+    log_close = np.log(closes)
+    returns = np.full_like(log_close, np.nan)
+    returns[:, 1:] = np.diff(log_close, axis=1)
+
+    def volatility(k: int) -> np.ndarray:
+        mean = _rolling_mean(returns, k)
+        var = _rolling_mean(returns ** 2, k) - mean ** 2
+        vol = np.sqrt(np.clip(var, 0, None))
+        vol[:, :k] = np.nan  # First return is undefined
+        return vol
+
+    columns = [
+        returns,
+        _shift(returns, 1), _shift(returns, 2), _shift(returns, 3), _shift(returns, 4),
+        log_close - _shift(log_close, 7),
+        log_close - _shift(log_close, 14),
+        log_close - _shift(log_close, 30),
+        volatility(7),
+        volatility(30),
+        log_close - np.log(_rolling_mean(closes, 30)),
+    ]
+    return np.stack(columns, axis=-1)
+
+
+class Forecaster:
+    """
+    Serves a persisted model. Weights are memory-mapped, and a newer
+    model written by the training job is picked up on the next call.
+    """
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self.weights: Optional[np.ndarray] = None  # (1 + features) x horizons, bias first
+        self.residual_std: Optional[np.ndarray] = None  # per horizon
+        self.meta: Dict[str, Any] = {}
+        self._loaded_mtime: Optional[float] = None
+
+    @property
+    def meta_path(self) -> str:
+        return os.path.join(self.model_dir, "meta.json")
+
+    @property
+    def loaded(self) -> bool:
+        return self.weights is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.meta.get("trained_at")
+
+    @property
+    def horizon(self) -> int:
+        return int(self.meta.get("horizon", 0))
+
+    def refresh(self) -> bool:
+        """(Re)load the model if its files changed; True when one is loaded"""
+        try:
+            mtime = os.stat(self.meta_path).st_mtime
+        except OSError:
+            return self.loaded
+        if mtime == self._loaded_mtime:
+            return self.loaded
+
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            weights = np.load(os.path.join(self.model_dir, meta["weights"]), mmap_mode="r")
+            residual_std = np.load(os.path.join(self.model_dir, meta["residual_std"]), mmap_mode="r")
+        except Exception as e:
+            print(f"⚠️ Could not load forecaster from {self.model_dir}: {e}")
+            return self.loaded
+
+        self.weights, self.residual_std, self.meta = weights, residual_std, meta
+        self._loaded_mtime = mtime
+        print(f"🤖 Forecaster loaded: {meta['symbols']} symbols, trained {meta['trained_at']}")
+        return True
+
+    def predict_batch(self, closes: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Forecast every symbol in one call.
+        closes: (symbols x days), days >= MIN_HISTORY, oldest first.
+        Returns expected log returns and their std per horizon, (symbols x horizons).
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))[:, -MIN_HISTORY:]
+        x = build_features(closes)[:, -1]
+        mean = self.weights[0] + x @ self.weights[1:]
+
+        # Wider bands for symbols that are currently more volatile than usual
+        vol_ratio = x[:, FEATURES.index("volatility_30d")] / self.meta["median_volatility"]
+        sigma = self.residual_std[None, :] * np.clip(vol_ratio, 0.5, 3.0)[:, None]
+        return {"mean": mean, "sigma": sigma}
+
+
+def _training_set(histories: List[np.ndarray], horizon: int):
+    """Stack (features, forward log returns) samples from every symbol"""
+    xs, ys = [], []
+    for closes in histories:
+        if len(closes) < MIN_HISTORY + horizon:
+            continue
+        x = build_features(closes)[0]
+        log_close = np.log(closes)
+        t = np.arange(MIN_HISTORY - 1, len(closes) - horizon)
+        y = log_close[t[:, None] + np.arange(1, horizon + 1)] - log_close[t][:, None]
+        xs.append(x[t])
+        ys.append(y)
+    if not xs:
+        raise ValueError("Not enough history to train")
+    x, y = np.concatenate(xs), np.concatenate(ys)
+    keep = np.isfinite(x).all(axis=1) & np.isfinite(y).all(axis=1)
+    return x[keep], y[keep]
+
+
+def train(histories: Dict[str, np.ndarray], horizon: int, alpha: float = 10.0) -> Dict[str, Any]:
+    """
+    Fit one multi-output ridge model (a column per horizon) on all
+    symbols, validated on the most recent 20% of each symbol's days.
+    """
+    if not SKLEARN_AVAILABLE:
+        raise RuntimeError("scikit-learn is required to train the forecaster")
+
+    series = [np.asarray(c, dtype=np.float64) for c in histories.values()]
+    split = [int(len(c) * 0.8) for c in series]
+    x_train, y_train = _training_set([c[:s] for c, s in zip(series, split)], horizon)
+    x_test, y_test = _training_set([c[s - MIN_HISTORY:] for c, s in zip(series, split)], horizon)
+
+    def fit(x, y):
+        scaler = StandardScaler().fit(x)
+        model = Ridge(alpha=alpha).fit(scaler.transform(x), y)
+        # Fold the scaling into the weights: serving is x @ w + b
+        coef = model.coef_.T / scaler.scale_[:, None]
+        bias = model.intercept_ - scaler.mean_ @ coef
+        return np.vstack([bias, coef])
+
+    weights = fit(x_train, y_train)
+    predicted = weights[0] + x_test @ weights[1:]
+    week = min(7, horizon) - 1
+    metrics = {
+        "test_samples": int(len(x_test)),
+        "rmse": np.sqrt(((predicted - y_test) ** 2).mean(axis=0)).round(5).tolist(),
+        "rmse_zero_baseline": np.sqrt((y_test ** 2).mean(axis=0)).round(5).tolist(),
+        "direction_accuracy_7d": round(float((np.sign(predicted[:, week]) == np.sign(y_test[:, week])).mean()), 4),
+    }
+
+    # Final model on everything
+    x_all, y_all = _training_set(series, horizon)
+    weights = fit(x_all, y_all)
+    residuals = y_all - (weights[0] + x_all @ weights[1:])
+    return {
+        "weights": weights,
+        "residual_std": residuals.std(axis=0),
+        "meta": {
+            "features": list(FEATURES),
+            "horizon": horizon,
+            "alpha": alpha,
+            "symbols": len(histories),
+            "train_samples": int(len(x_all)),
+            "median_volatility": float(np.median(x_all[:, FEATURES.index("volatility_30d")])),
+            "metrics": metrics,
+            "trained_at": datetime.now().isoformat(),
+        }
+    }
+
+
+def save(model: Dict[str, Any], model_dir: str):
+    """Write arrays first and meta.json last, so readers never see a half-written model"""
+    os.makedirs(model_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    meta = dict(model["meta"], weights=f"weights-{stamp}.npy", residual_std=f"residual_std-{stamp}.npy")
+    np.save(os.path.join(model_dir, meta["weights"]), model["weights"])
+    np.save(os.path.join(model_dir, meta["residual_std"]), model["residual_std"])
+
+    meta_path = os.path.join(model_dir, "meta.json")
+    previous = None
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            previous = json.load(f)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    # Old arrays can go once nothing points at them (open mmaps keep working)
+    if previous:
+        for key in ("weights", "residual_std"):
+            if previous.get(key) and previous[key] != meta[key]:
+                try:
+                    os.remove(os.path.join(model_dir, previous[key]))
+                except OSError:
+                    pass
+
+
+async def fetch_histories(max_symbols: int, days: int) -> Dict[str, np.ndarray]:
+    """Daily closes for the most liquid USDT pairs"""
+    from ..providers.replay import market_provider
+
+    provider = market_provider()
+    tickers = [
+        t for t in await provider.get_24h_tickers()
+        if t["symbol"].endswith("USDT") and float(t["lastPrice"]) > 0
+    ]
+    tickers.sort(key=lambda t: float(t["quoteVolume"]), reverse=True)
+    pairs = [t["symbol"] for t in tickers[:max_symbols]]
+
+    semaphore = asyncio.Semaphore(get_settings().SCANNER_CONCURRENCY)
+
+    async def fetch(pair: str):
+        async with semaphore:
+            try:
+                return await provider.get_klines(pair, interval="1d", limit=days)
+            except Exception as e:
+                print(f"History error for {pair}: {e}")
+                return []
+
+    candles = await asyncio.gather(*(fetch(p) for p in pairs))
+    return {
+        pair[:-len("USDT")]: np.array([c.close for c in history])
+        for pair, history in zip(pairs, candles) if len(history) >= MIN_HISTORY
+    }
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.models.forecaster")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fit = commands.add_parser("train", help="Train on the most liquid pairs and save the model")
+    fit.add_argument("--symbols", type=int, default=100)
+    fit.add_argument("--days", type=int, default=1000)
+    fit.add_argument("--alpha", type=float, default=10.0)
+    fit.add_argument("--out", default=settings.FORECASTER_MODEL_DIR)
+
+    info = commands.add_parser("info", help="Describe the saved model")
+    info.add_argument("--dir", default=settings.FORECASTER_MODEL_DIR)
+
+    args = parser.parse_args()
+    if args.command == "train":
+        histories = asyncio.run(fetch_histories(args.symbols, args.days))
+        print(f"📥 {len(histories)} symbols, {sum(len(h) for h in histories.values())} daily closes")
+        model = train(histories, settings.PREDICTION_DAYS_MAX, alpha=args.alpha)
+        save(model, args.out)
+        print(json.dumps(model["meta"], indent=2))
+    else:
+        forecaster = Forecaster(args.dir)
+        if not forecaster.refresh():
+            print(f"No model in {args.dir}")
+            return
+        print(json.dumps(forecaster.meta, indent=2))
+
+
+if __name__ == "__main__":
+    main()
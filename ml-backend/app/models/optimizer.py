@@ -0,0 +1,237 @@
+"""
+Strategy Parameter Optimizer
+Grid or random search over the signal strategy's windows and weights,
+backtested on daily closes. Candidates are spread over a process pool;
+the closes live in shared memory so workers map them instead of
+unpickling a copy per task, and each worker caches indicator
+intermediates across the candidates it evaluates.
+
+Run with:  python -m app.models.optimizer --symbols 50 --search random --samples 500
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .strategy import DEFAULT_STRATEGY, StrategySpec, compile_strategy
+
+
+# Candidate values per parameter: "<indicator>.<param>" or "weight.<indicator>"
+DEFAULT_SPACE: Dict[str, List[float]] = {
+    "trend.short": [5, 7, 10, 14],
+    "trend.long": [20, 30],  # /signals looks at 30 days
+    "rsi.period": [7, 14, 21],
+    "momentum.lookback": [5, 10, 20],
+    "weight.trend": [0.2, 0.4, 0.6],
+    "weight.rsi": [0.1, 0.3, 0.5],
+    "weight.momentum": [0.1, 0.3, 0.5],
+}
+PERIODS_PER_YEAR = 365  # Daily bars, crypto trades every day
+
+
+def build_spec(params: Dict[str, float], window: int, base: StrategySpec = DEFAULT_STRATEGY) -> Optional[StrategySpec]:
+    """Apply a candidate to the base spec (weights normalized); None if it's invalid"""
+    spec = base.model_copy(deep=True)
+    spec.min_periods = window
+    by_key = {i.key: i for i in spec.indicators}
+    for name, value in params.items():
+        scope, field = name.split(".", 1)
+        if scope == "weight":
+            by_key[field].weight = float(value)
+        else:
+            by_key[scope].params[field] = float(value)
+
+    trend = by_key.get("trend")
+    if trend and trend.params.get("short", 7) >= trend.params.get("long", 20):
+        return None
+    total = sum(i.weight for i in spec.indicators)
+    if total <= 0:
+        return None
+    for indicator in spec.indicators:
+        indicator.weight = round(indicator.weight / total, 4)
+    try:
+        # Edits skip validation; windows must still fit in the window
+        return StrategySpec.model_validate(spec.model_dump())
+    except ValueError:
+        return None
+
+
+def candidates(space: Dict[str, List[float]], search: str, samples: int, seed: int) -> List[Dict[str, float]]:
+    """Every grid point, or `samples` random draws from the grid"""
+    names = list(space)
+    if search == "grid":
+        combos = itertools.product(*(space[n] for n in names))
+    else:
+        rng = np.random.default_rng(seed)
+        combos = ([rng.choice(space[n]).item() for n in names] for _ in range(samples))
+    return [dict(zip(names, values)) for values in combos]
+
+
+def backtest(score: np.ndarray, buy: float, sell: float, forward: np.ndarray, fee_bps: float) -> Dict[str, float]:
+    """
+    Long on BUY, short on SELL, flat otherwise, held for one bar.
+    score, forward: (symbols x bars), forward = next bar's log return.
+    """
+    position = np.select([score > buy, score < sell], [1.0, -1.0], default=0.0)
+    turnover = np.abs(np.diff(position, axis=1, prepend=0.0))
+    pnl = position * forward - turnover * fee_bps / 10_000
+    std = pnl.std()
+    active = position != 0
+    return {
+        "sharpe": round(float(pnl.mean() / std * np.sqrt(PERIODS_PER_YEAR)) if std > 0 else 0.0, 3),
+        "annual_return_pct": round(float(pnl.mean() * PERIODS_PER_YEAR * 100), 2),
+        "hit_rate": round(float((pnl[active] > 0).mean()), 4) if active.any() else None,
+        "exposure": round(float(active.mean()), 4),
+        "trades": int((turnover > 0).sum()),
+    }
+
+
+# --- Worker side ----------------------------------------------------------
+
+_worker: Dict[str, Any] = {}
+
+
+def _attach(shm_name: str, shape: Tuple[int, int], window: int, split: int, fee_bps: float):
+    """Pool initializer: map the shared closes and build the window views once"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    closes = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    windows = sliding_window_view(closes, window, axis=1)[:, :-1]  # Last window has no next bar
+    forward = np.diff(np.log(closes), axis=1)[:, window - 1:]
+    _worker.update(
+        shm=shm,  # Keeps the mapping alive
+        window=window,
+        fee_bps=fee_bps,
+        segments={
+            "train": (windows[:, :split], forward[:, :split], {}),
+            "test": (windows[:, split:], forward[:, split:], {}),
+        }
+    )
+
+
+def _evaluate(batch: List[Dict[str, float]]) -> List[Dict[str, Any]]:
+    results = []
+    for params in batch:
+        spec = build_spec(params, _worker["window"])
+        if spec is None:
+            continue
+        plan = compile_strategy(spec)
+        row = {"params": params, "weights": {i.key: i.weight for i in spec.indicators if i.weight}}
+        for name, (windows, forward, cache) in _worker["segments"].items():
+            score = plan.evaluate(windows, cache=cache)["score"]
+            row[name] = backtest(score, spec.thresholds.buy, spec.thresholds.sell, forward, _worker["fee_bps"])
+        results.append(row)
+    return results
+
+
+# --- Driver ---------------------------------------------------------------
+
+def align(histories: Dict[str, np.ndarray], min_length: int) -> Tuple[List[str], np.ndarray]:
+    """Keep series with at least `min_length` closes, trimmed to a common length"""
+    kept = {s: c for s, c in histories.items() if len(c) >= min_length}
+    if not kept:
+        raise ValueError(f"No symbol has {min_length} closes")
+    length = min(len(c) for c in kept.values())
+    return list(kept), np.array([c[-length:] for c in kept.values()], dtype=np.float64)
+
+
+def optimize(
+    closes: np.ndarray,
+    params: List[Dict[str, float]],
+    window: int = 30,
+    test_fraction: float = 0.3,
+    fee_bps: float = 10.0,
+    workers: Optional[int] = None,
+    chunk_size: int = 16
+) -> List[Dict[str, Any]]:
+    """
+    Backtest every candidate on the earlier bars (train) and the later,
+    unseen ones (test). Ranked by train Sharpe, so the test columns are
+    an honest out-of-sample check of the ranking.
+    """
+    closes = np.ascontiguousarray(closes, dtype=np.float64)
+    bars = closes.shape[1] - window
+    split = int(bars * (1 - test_fraction))
+    if split < 30 or bars - split < 30:
+        raise ValueError(f"{closes.shape[1]} closes is too short for a {window}-bar window")
+
+    # The default strategy is always scored, as the baseline
+    baseline = {f"weight.{i.key}": i.weight for i in DEFAULT_STRATEGY.indicators if i.weight}
+    params = [baseline] + params
+
+    # Neighbouring candidates share windows, so chunks in grid order hit each worker's cache
+    batches = [params[i:i + chunk_size] for i in range(0, len(params), chunk_size)]
+
+    shm = shared_memory.SharedMemory(create=True, size=closes.nbytes)
+    try:
+        np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)[:] = closes
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_attach,
+            initargs=(shm.name, closes.shape, window, split, fee_bps)
+        ) as pool:
+            results = [row for rows in pool.map(_evaluate, batches) for row in rows]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results[0]["baseline"] = True
+    results.sort(key=lambda r: r["train"]["sharpe"], reverse=True)
+    return results
+
+
+def main():
+    from .forecaster import fetch_histories
+
+    parser = argparse.ArgumentParser(prog="python -m app.models.optimizer")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--days", type=int, default=1000)
+    parser.add_argument("--search", choices=("grid", "random"), default="grid")
+    parser.add_argument("--samples", type=int, default=500, help="Candidates for random search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--window", type=int, default=30, help="Closes each signal looks at")
+    parser.add_argument("--test-fraction", type=float, default=0.3)
+    parser.add_argument("--fee-bps", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--save-best", default="", help="Write the best spec here (for STRATEGY_SPEC_PATH)")
+    args = parser.parse_args()
+
+    largest = max(max(v) + (n == "rsi.period") for n, v in DEFAULT_SPACE.items() if not n.startswith("weight."))
+    if args.window < largest:
+        parser.error(f"--window must cover the largest window searched ({largest:g})")
+
+    histories = asyncio.run(fetch_histories(args.symbols, args.days))
+    symbols, closes = align(histories, min_length=args.window + 200)
+    params = candidates(DEFAULT_SPACE, args.search, args.samples, args.seed)
+    print(f"📥 {len(symbols)} symbols x {closes.shape[1]} days, {len(params)} candidates")
+
+    started = time.perf_counter()
+    results = optimize(
+        closes, params, window=args.window, test_fraction=args.test_fraction,
+        fee_bps=args.fee_bps, workers=args.workers
+    )
+    print(f"⏱️ {len(results)} candidates in {time.perf_counter() - started:.1f}s")
+
+    ranked = results[:args.top] + [r for r in results[args.top:] if r.get("baseline")]
+    for row in ranked:
+        row["rank"] = results.index(row) + 1
+    print(json.dumps(ranked, indent=2))
+
+    if args.save_best:
+        best = build_spec(results[0]["params"], args.window)
+        best.name = "optimized"
+        with open(args.save_best, "w") as f:
+            f.write(best.model_dump_json(indent=2))
+        print(f"💾 Best spec written to {args.save_best}")
+
+
+if __name__ == "__main__":
+    main()
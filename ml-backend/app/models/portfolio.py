@@ -0,0 +1,81 @@
+"""
+Portfolio Valuation & Risk
+Values holdings and measures their risk for every asset at once:
+24h PnL from the tickers, volatility and Value at Risk from the
+covariance of daily log returns.
+"""
+from statistics import NormalDist
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+TRADING_DAYS = 365  # Crypto trades every day
+
+
+def value_holdings(
+    amounts: np.ndarray,
+    prices: np.ndarray,
+    change_24h: np.ndarray
+) -> Dict[str, np.ndarray]:
+    """
+    Value and 24h PnL per holding.
+    change_24h: percent price change over 24h, as Binance reports it.
+    """
+    values = amounts * prices
+    opens = prices / (1 + change_24h / 100)
+    return {
+        "value": values,
+        "pnl_24h": amounts * (prices - opens),
+        "open_value": amounts * opens,
+    }
+
+
+def portfolio_risk(
+    values: np.ndarray,
+    closes: np.ndarray,
+    confidence: float = 0.95,
+    horizon_days: int = 1
+) -> Optional[Dict[str, Any]]:
+    """
+    Volatility, parametric and historical VaR of holdings worth `values`.
+    closes: (assets x days) daily closes, oldest first, aligned in time.
+    VaR is a positive USD loss not exceeded with `confidence` over the horizon.
+    """
+    total = values.sum()
+    if total <= 0 or closes.shape[1] < 3:
+        return None
+
+    weights = values / total
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(closes), axis=1)
+    returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+
+    cov = np.atleast_2d(np.cov(returns))
+    marginal = cov @ weights
+    variance = float(weights @ marginal)
+    daily_vol = np.sqrt(max(variance, 0.0))
+    scale = np.sqrt(horizon_days)
+
+    # Parametric (normal) VaR; the daily drift is negligible next to the volatility
+    z = NormalDist().inv_cdf(confidence)
+    var = z * daily_vol * scale * total
+
+    # Historical VaR: today's weights replayed over past daily returns
+    history = np.expm1(returns.T @ weights)
+    historical_var = -np.quantile(history, 1 - confidence) * scale * total
+
+    # Share of the portfolio variance each asset is responsible for (sums to 1)
+    contribution = weights * marginal / variance if variance > 0 else np.zeros_like(weights)
+    asset_vol = np.sqrt(np.clip(np.diag(cov), 0, None))
+
+    return {
+        "days": int(returns.shape[1]),
+        "volatility_daily": daily_vol,
+        "volatility_annual": daily_vol * np.sqrt(TRADING_DAYS),
+        "var": var,
+        "historical_var": max(float(historical_var), 0.0),
+        "diversification_ratio": float(weights @ asset_vol / daily_vol) if daily_vol > 0 else None,
+        "asset_volatility_annual": asset_vol * np.sqrt(TRADING_DAYS),
+        "risk_contribution": contribution,
+    }
@@ -5,9 +5,8 @@ Fast, reliable, and works great for cryptocurrency time series
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
-from cachetools import TTLCache
 
 # Prophet import with fallback
 try:
@@ -16,7 +15,10 @@ try:
 except ImportError:
     PROPHET_AVAILABLE = False
 
+from ..config import get_settings
+from ..cache import BudgetedCache
 from ..providers.base import PriceData
+from .forecaster import Forecaster, MIN_HISTORY
 
 
 class PredictionResult(BaseModel):
@@ -35,16 +37,23 @@ class PricePredictor:
     """
     
     def __init__(self):
-        self._cache = TTLCache(maxsize=50, ttl=300)  # 5 min cache
-        self._model_cache = TTLCache(maxsize=10, ttl=3600)  # 1 hour model cache
+        settings = get_settings()
+        self.max_days = settings.PREDICTION_DAYS_MAX
+        self.forecaster = Forecaster(settings.FORECASTER_MODEL_DIR)
+        # symbol -> (data version, forecast at max_days); replaced when a new candle arrives.
+        # A forecast costs far more to rebuild than one upstream call.
+        self._cache = BudgetedCache("forecasts", cost=10)
     
     async def predict(
         self,
         historical_prices: List[PriceData],
-        days_ahead: int = 7
+        days_ahead: int = 7,
+        cache_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Generate price predictions.
+        With a cache_key, the forecast is computed once per data version
+        at the maximum horizon and sliced to `days_ahead`.
         
         Returns:
             - predictions: List of predicted prices
@@ -52,9 +61,54 @@ class PricePredictor:
             - confidence: 0-100 score
             - explanation: Human-readable explanation
         """
-        # Always use fallback for now (Prophet has dependency issues)
-        # TODO: Fix Prophet setup with cmdstanpy
-        return self._fallback_prediction(historical_prices, days_ahead)
+        # Batch-trained model when one has been saved, else the moving-average fallback
+        # (Prophet has dependency issues - TODO: fix Prophet setup with cmdstanpy)
+        use_model = (
+            self.forecaster.refresh()
+            and self.forecaster.horizon >= days_ahead
+            and len(historical_prices) >= MIN_HISTORY
+        )
+        if cache_key is None:
+            if use_model:
+                return self._model_prediction(historical_prices, days_ahead)
+            return self._fallback_prediction(historical_prices, days_ahead)
+        
+        cache_key = cache_key.upper()
+        version = (self._data_version(historical_prices), self.forecaster.version if use_model else None)
+        cached = self._cache.get(cache_key)
+        if cached is not None and cached[0] == version:
+            forecast = cached[1]
+        else:
+            if use_model:
+                forecast = self._model_prediction(historical_prices, min(self.max_days, self.forecaster.horizon))
+            else:
+                forecast = self._fallback_prediction(historical_prices, self.max_days)
+            if "error" in forecast:
+                return forecast
+            self._cache[cache_key] = (version, forecast)
+        
+        return self._slice(forecast, days_ahead)
+    
+    def invalidate(self, symbol: str):
+        """Drop a symbol's cached forecast (e.g. a new candle closed)"""
+        self._cache.pop(symbol.upper(), None)
+    
+    @staticmethod
+    def _data_version(historical_prices: List[PriceData]) -> Tuple[int, Optional[datetime]]:
+        """Changes whenever a candle is added, not when the live candle ticks"""
+        if not historical_prices:
+            return (0, None)
+        return (len(historical_prices), historical_prices[-1].timestamp)
+    
+    @staticmethod
+    def _slice(forecast: Dict[str, Any], days_ahead: int) -> Dict[str, Any]:
+        """Cut a max-horizon forecast down to `days_ahead` days"""
+        predictions = forecast["predictions"][:days_ahead]
+        return {
+            **forecast,
+            "predictions": predictions,
+            "predicted_price": round(predictions[-1]["predicted_price"], 2)
+        }
     
     def _calculate_confidence(self, forecast_row) -> float:
         """Calculate confidence score based on prediction interval width"""
@@ -117,6 +171,57 @@ class PricePredictor:
         else:
             return "LOW"
     
+    def _model_prediction(
+        self,
+        historical_prices: List[PriceData],
+        days_ahead: int
+    ) -> Dict[str, Any]:
+        """Forecast from the batch-trained model (no fitting per request)"""
+        closes = np.array([p.close for p in historical_prices[-MIN_HISTORY:]])
+        forecast = self.forecaster.predict_batch(closes)
+        mean = forecast["mean"][0, :days_ahead]
+        sigma = forecast["sigma"][0, :days_ahead]
+        current_price = historical_prices[-1].close
+        
+        predictions = []
+        for i in range(days_ahead):
+            pred_price = current_price * np.exp(mean[i])
+            lower = current_price * np.exp(mean[i] - 1.96 * sigma[i])
+            upper = current_price * np.exp(mean[i] + 1.96 * sigma[i])
+            predictions.append(PredictionResult(
+                timestamp=datetime.now() + timedelta(days=i + 1),
+                predicted_price=float(pred_price),
+                lower_bound=float(lower),
+                upper_bound=float(upper),
+                confidence=round(self._calculate_confidence(
+                    {"yhat": pred_price, "yhat_lower": lower, "yhat_upper": upper}
+                ), 1)
+            ))
+        
+        # Signal and confidence from the one-week outlook (or the whole horizon if shorter)
+        week = predictions[:7]
+        change = (week[-1].predicted_price - current_price) / current_price * 100
+        signal, explanation = self._generate_signal(change, week, current_price)
+        confidence = week[-1].confidence
+        
+        return {
+            "predictions": [p.model_dump() for p in predictions],
+            "signal": signal,
+            "signal_strength": abs(round(change, 2)),
+            "confidence": confidence,
+            "confidence_stars": max(1, min(5, round(confidence / 20))),
+            "price_change_percent": round(change, 2),
+            "explanation": explanation,
+            "current_price": current_price,
+            "predicted_price": round(predictions[-1].predicted_price, 2),
+            "risk_level": self._calculate_risk(week),
+            "model": {
+                "name": "ridge",
+                "trained_at": self.forecaster.version,
+                "symbols": self.forecaster.meta.get("symbols")
+            }
+        }
+    
     def _fallback_prediction(
         self, 
         historical_prices: List[PriceData],
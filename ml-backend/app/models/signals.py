@@ -4,10 +4,12 @@ User-friendly signals with warnings and risk assessment
 """
 import numpy as np
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 
+from ..config import get_settings
 from ..providers.base import PriceData
+from .strategy import StrategySpec, DEFAULT_STRATEGY, compile_strategy, load_strategy
 
 
 class TradeValidation(BaseModel):
@@ -31,7 +33,7 @@ class SignalGenerator:
     Multi-strategy signal generator.
     Combines technical indicators with anomaly detection.
     
-    Strategies:
+    Strategies (the default StrategySpec; see models/strategy.py):
     1. Trend Following (Moving Averages)
     2. Mean Reversion (RSI)
     3. Momentum (MACD-like)
@@ -39,109 +41,264 @@ class SignalGenerator:
     5. Anomaly Detection (unusual price movements)
     """
     
-    def __init__(self):
-        pass
+    MAX_SLIPPAGE_BPS = 50  # Above this, warn; above twice this, reject
+    ORDER_FLOW_WEIGHT = 0.2  # Share of the score from live trade flow, when available
+    
+    def __init__(self, strategy: Optional[StrategySpec] = None):
+        if strategy is None:
+            path = get_settings().STRATEGY_SPEC_PATH
+            strategy = load_strategy(path) if path else DEFAULT_STRATEGY
+        self.strategy = strategy
+        self.plan = compile_strategy(strategy)
     
     def generate_signals(
         self, 
-        prices: List[PriceData]
+        prices: List[PriceData],
+        trade_flow: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        """Generate comprehensive trading signals"""
-        if len(prices) < 30:
-            return {"error": "Need at least 30 data points"}
-        
-        closes = [p.close for p in prices]
-        
-        # Calculate indicators
-        trend_signal = self._trend_signal(closes)
-        rsi_signal = self._rsi_signal(closes)
-        momentum_signal = self._momentum_signal(closes)
-        volatility = self._calculate_volatility(closes)
+        """
+        Generate comprehensive trading signals.
+        `trade_flow` (live trade-stream stats) adds an order-flow strategy.
+        """
+        if len(prices) < self.strategy.min_periods:
+            return {"error": f"Need at least {self.strategy.min_periods} data points"}
         
-        # Combine signals (weighted average)
-        weights = {"trend": 0.4, "rsi": 0.3, "momentum": 0.3}
-        combined_score = (
-            trend_signal * weights["trend"] +
-            rsi_signal * weights["rsi"] +
-            momentum_signal * weights["momentum"]
-        )
+        closes = np.array([[p.close for p in prices]])
+        evaluated = self.plan.evaluate(closes)
+        indicators = {
+            name: round(float(evaluated[name][0]), 2) for name in self.plan.outputs
+        }
+        combined_score = float(evaluated["score"][0])
+        signal = str(evaluated["signal"][0])
+        strength = str(evaluated["strength"][0])
         
-        # Generate final signal
-        if combined_score > 0.5:
-            signal = "BUY"
-            strength = "STRONG" if combined_score > 0.7 else "MODERATE"
-        elif combined_score < -0.5:
-            signal = "SELL"
-            strength = "STRONG" if combined_score < -0.7 else "MODERATE"
-        else:
-            signal = "HOLD"
-            strength = "NEUTRAL"
+        flow_signal = self._order_flow_signal(trade_flow) if trade_flow else None
+        if flow_signal is not None:
+            combined_score = combined_score * (1 - self.ORDER_FLOW_WEIGHT) + flow_signal * self.ORDER_FLOW_WEIGHT
+            indicators["order_flow"] = round(flow_signal, 2)
+            signal, strength = self._classify(combined_score)
         
         return {
             "signal": signal,
             "strength": strength,
             "score": round(combined_score, 2),
-            "indicators": {
-                "trend": round(trend_signal, 2),
-                "rsi": round(rsi_signal, 2),
-                "momentum": round(momentum_signal, 2),
-                "volatility": round(volatility, 2)
-            },
-            "risk_level": self._risk_from_volatility(volatility)
+            "indicators": indicators,
+            "risk_level": str(evaluated["risk_level"][0])
         }
     
+    def _classify(self, score: float) -> Tuple[str, str]:
+        """Signal and strength for a score, per the strategy's thresholds"""
+        t = self.strategy.thresholds
+        if score > t.buy:
+            return "BUY", "STRONG" if score > t.strong_buy else "MODERATE"
+        if score < t.sell:
+            return "SELL", "STRONG" if score < t.strong_sell else "MODERATE"
+        return "HOLD", "NEUTRAL"
+    
+    def _order_flow_signal(self, trade_flow: Dict[str, Any]) -> Optional[float]:
+        """
+        Order flow over the last 5 minutes: aggressive buying (+)
+        or selling (-), confirmed by price sitting above/below VWAP.
+        """
+        window = trade_flow.get("windows", {}).get("300s")
+        if not window or window["trades"] < 20 or not window["vwap"]:
+            return None  # Too few trades to mean anything
+        
+        imbalance = window["imbalance"]
+        vs_vwap = (trade_flow["last_price"] - window["vwap"]) / window["vwap"] * 100
+        confirmed = (imbalance > 0) == (vs_vwap > 0)
+        return float(np.clip(imbalance * (2 if confirmed else 1), -1, 1))
+    
+    def generate_signals_batch(
+        self,
+        closes: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized generate_signals over many symbols at once.
+        closes: (symbols x periods) matrix, oldest first, >= min_periods.
+        Returns every indicator plus signal, strength, score and risk_level.
+        """
+        return self.plan.evaluate(closes)
+    
     def validate_trade(
         self,
         action: str,  # BUY or SELL
         prices: List[PriceData],
-        amount: Optional[float] = None
+        amount: Optional[float] = None,
+        liquidity: Optional[Dict[str, Any]] = None
     ) -> TradeValidation:
         """
         Validate if a planned trade is a good idea.
         WARNS users before they make mistakes!
+        `liquidity` is the order book's view of this order (see OrderBook.liquidity).
         """
         signals = self.generate_signals(prices)
         
         if "error" in signals:
-            return TradeValidation(
-                is_good_trade=False,
-                warning="Insufficient data to validate trade",
-                recommendation="Wait for more market data",
-                risk_level="UNKNOWN"
-            )
-        
-        current_signal = signals["signal"]
-        risk = signals["risk_level"]
+            return self.validate_trades_batch([action], [None], [None])[0]
         
-        # Check if trade aligns with signals
-        if action == "BUY" and current_signal == "SELL":
+        validation = self.validate_trades_batch(
+            [action], [signals["signal"]], [signals["risk_level"]]
+        )[0]
+        if amount and liquidity:
+            validation = self.check_liquidity(validation, liquidity)
+        return validation
+    
+    def check_liquidity(
+        self,
+        validation: TradeValidation,
+        liquidity: Dict[str, Any]
+    ) -> TradeValidation:
+        """Flag orders too large for the liquidity currently in the book"""
+        if not liquidity["fillable"]:
             return TradeValidation(
                 is_good_trade=False,
-                warning="⚠️ BAD TIMING! Market shows bearish signals.",
-                recommendation="Consider waiting or reducing position size",
-                risk_level=risk
+                warning=f"⚠️ ORDER TOO LARGE! Only {liquidity['fill_ratio'] * 100:.0f}% "
+                        "could fill against the visible order book.",
+                recommendation="Split the order into smaller pieces or use limit orders",
+                risk_level="HIGH"
             )
-        elif action == "SELL" and current_signal == "BUY":
+        
+        slippage = liquidity["slippage_bps"] or 0
+        if slippage > self.MAX_SLIPPAGE_BPS * 2:
             return TradeValidation(
                 is_good_trade=False,
-                warning="⚠️ BAD TIMING! Market shows bullish signals.",
-                recommendation="Consider holding - potential upside detected",
-                risk_level=risk
-            )
-        elif risk == "HIGH":
-            return TradeValidation(
-                is_good_trade=True,
-                warning="⚠️ High volatility detected. Trade with caution.",
-                recommendation="Use smaller position size",
-                risk_level=risk
+                warning=f"⚠️ Thin market! Expect ~{slippage / 100:.2f}% slippage on this order.",
+                recommendation="Split the order or use limit orders",
+                risk_level="HIGH"
             )
+        if slippage > self.MAX_SLIPPAGE_BPS:
+            return validation.model_copy(update={
+                "warning": f"⚠️ Expect ~{slippage / 100:.2f}% slippage on this order size.",
+                "recommendation": "Consider a limit order or a smaller size"
+            })
+        return validation
+    
+    def validate_trades_batch(
+        self,
+        actions: List[str],
+        signals: List[Optional[str]],
+        risk_levels: List[Optional[str]]
+    ) -> List[TradeValidation]:
+        """
+        Validate many orders at once against their symbols' signals.
+        A None signal means the symbol had insufficient data.
+        """
+        actions = np.asarray(actions, dtype=object)
+        signals = np.asarray(signals, dtype=object)
+        risk_levels = np.asarray(risk_levels, dtype=object)
+        
+        cases = np.select(
+            [
+                signals == None,  # noqa: E711 - elementwise
+                (actions == "BUY") & (signals == "SELL"),
+                (actions == "SELL") & (signals == "BUY"),
+                risk_levels == "HIGH",
+            ],
+            [0, 1, 2, 3],
+            default=4
+        )
+        
+        results = []
+        for case, signal, risk in zip(cases, signals, risk_levels):
+            if case == 0:
+                results.append(TradeValidation(
+                    is_good_trade=False,
+                    warning="Insufficient data to validate trade",
+                    recommendation="Wait for more market data",
+                    risk_level="UNKNOWN"
+                ))
+            elif case == 1:
+                results.append(TradeValidation(
+                    is_good_trade=False,
+                    warning="⚠️ BAD TIMING! Market shows bearish signals.",
+                    recommendation="Consider waiting or reducing position size",
+                    risk_level=risk
+                ))
+            elif case == 2:
+                results.append(TradeValidation(
+                    is_good_trade=False,
+                    warning="⚠️ BAD TIMING! Market shows bullish signals.",
+                    recommendation="Consider holding - potential upside detected",
+                    risk_level=risk
+                ))
+            elif case == 3:
+                results.append(TradeValidation(
+                    is_good_trade=True,
+                    warning="⚠️ High volatility detected. Trade with caution.",
+                    recommendation="Use smaller position size",
+                    risk_level=risk
+                ))
+            else:
+                results.append(TradeValidation(
+                    is_good_trade=True,
+                    warning=None,
+                    recommendation=f"Trade aligns with {signal} signal ✓",
+                    risk_level=risk
+                ))
+        
+        return results
+    
+    def summarize_basket(
+        self,
+        symbols: List[str],
+        actions: List[str],
+        validations: List[TradeValidation],
+        amounts: List[Optional[float]]
+    ) -> Dict[str, Any]:
+        """
+        Basket-level risk summary for a list of validated orders.
+        Orders are weighted by amount when every order has one,
+        otherwise equally.
+        """
+        if all(a and a > 0 for a in amounts):
+            weights = np.array(amounts, dtype=float)
         else:
-            return TradeValidation(
-                is_good_trade=True,
-                warning=None,
-                recommendation=f"Trade aligns with {current_signal} signal ✓",
-                risk_level=risk
-            )
+            weights = np.ones(len(amounts))
+        weights = weights / weights.sum()
+        good = np.array([v.is_good_trade for v in validations])
+        risk = np.array([v.risk_level for v in validations], dtype=object)
+        risk_score = np.select(
+            [risk == "LOW", risk == "MEDIUM"], [1.0, 2.0], default=3.0  # HIGH/UNKNOWN
+        )
+        
+        weighted_risk = float(weights @ risk_score)
+        if weighted_risk > 2.3:
+            basket_risk = "HIGH"
+        elif weighted_risk > 1.5:
+            basket_risk = "MEDIUM"
+        else:
+            basket_risk = "LOW"
+        
+        # Buying and selling the same coin in one basket cancels out
+        sides: Dict[str, set] = {}
+        for symbol, action in zip(symbols, actions):
+            sides.setdefault(symbol, set()).add(action)
+        conflicting = sorted(s for s, a in sides.items() if len(a) > 1)
+        
+        bad_share = float(weights[~good].sum())
+        if bad_share > 0.3:
+            recommendation = "⚠️ Much of this basket fights the market. Review flagged orders."
+        elif basket_risk == "HIGH":
+            recommendation = "⚠️ High-risk basket. Consider smaller position sizes."
+        elif bad_share > 0:
+            recommendation = "Mostly aligned - review the flagged orders."
+        else:
+            recommendation = "Basket aligns with current signals ✓"
+        
+        return {
+            "order_count": len(validations),
+            "good_trades": int(good.sum()),
+            "bad_trades": int((~good).sum()),
+            "bad_weight_percent": round(bad_share * 100, 1),
+            "risk_breakdown": {
+                level: int((risk == level).sum())
+                for level in ("LOW", "MEDIUM", "HIGH", "UNKNOWN")
+            },
+            "basket_risk": basket_risk,
+            "conflicting_symbols": conflicting,
+            "recommendation": recommendation
+        }
     
     def detect_anomalies(
         self, 
@@ -205,67 +362,3 @@ class SignalGenerator:
                 ))
         
         return alerts
-    
-    def _trend_signal(self, closes: List[float]) -> float:
-        """Moving average trend signal (-1 to 1)"""
-        if len(closes) < 20:
-            return 0
-        
-        short_ma = np.mean(closes[-7:])
-        long_ma = np.mean(closes[-20:])
-        
-        # Normalize to -1 to 1 range
-        trend = (short_ma - long_ma) / long_ma
-        return max(-1, min(1, trend * 10))
-    
-    def _rsi_signal(self, closes: List[float], period: int = 14) -> float:
-        """RSI-based signal (-1 to 1)"""
-        if len(closes) < period + 1:
-            return 0
-        
-        deltas = np.diff(closes[-period-1:])
-        gains = np.where(deltas > 0, deltas, 0)
-        losses = np.where(deltas < 0, -deltas, 0)
-        
-        avg_gain = np.mean(gains) if len(gains) > 0 else 0
-        avg_loss = np.mean(losses) if len(losses) > 0 else 0
-        
-        if avg_loss == 0:
-            rsi = 100
-        else:
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-        
-        # Convert RSI to signal: <30 = oversold (buy), >70 = overbought (sell)
-        if rsi < 30:
-            return (30 - rsi) / 30  # Positive = buy
-        elif rsi > 70:
-            return -(rsi - 70) / 30  # Negative = sell
-        else:
-            return 0
-    
-    def _momentum_signal(self, closes: List[float]) -> float:
-        """Simple momentum signal (-1 to 1)"""
-        if len(closes) < 10:
-            return 0
-        
-        # Rate of change
-        roc = (closes[-1] - closes[-10]) / closes[-10]
-        return max(-1, min(1, roc * 5))
-    
-    def _calculate_volatility(self, closes: List[float]) -> float:
-        """Calculate volatility as percentage"""
-        if len(closes) < 2:
-            return 0
-        
-        returns = np.diff(closes) / closes[:-1]
-        return float(np.std(returns) * 100)
-    
-    def _risk_from_volatility(self, volatility: float) -> str:
-        """Convert volatility to risk level"""
-        if volatility > 5:
-            return "HIGH"
-        elif volatility > 2:
-            return "MEDIUM"
-        else:
-            return "LOW"
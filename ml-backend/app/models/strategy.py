@@ -0,0 +1,282 @@
+"""
+Declarative Signal Strategies
+A StrategySpec lists indicators, their parameters and weights plus the
+score thresholds. It is compiled once into a plan of NumPy steps in
+which shared intermediates (moving averages, diffs, returns) are
+computed once, then evaluated over one symbol or a whole batch.
+"""
+import inspect
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from pydantic import BaseModel, Field, model_validator
+
+
+def _safe_div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Elementwise a / b, 0 where b is 0"""
+    return np.divide(a, b, out=np.zeros(np.broadcast(a, b).shape), where=b != 0)
+
+
+class IndicatorSpec(BaseModel):
+    """One indicator; weight 0 means reported but not scored"""
+    type: str
+    name: Optional[str] = None  # Key in the output (defaults to type)
+    params: Dict[str, float] = Field(default_factory=dict)
+    weight: float = 0.0
+
+    @property
+    def key(self) -> str:
+        return self.name or self.type
+
+
+class Thresholds(BaseModel):
+    """Score cut-offs for BUY/SELL and their strength"""
+    buy: float = 0.5
+    strong_buy: float = 0.7
+    sell: float = -0.5
+    strong_sell: float = -0.7
+
+    @model_validator(mode="after")
+    def _check(self):
+        if not self.buy < self.strong_buy:
+            raise ValueError("thresholds.buy must be below thresholds.strong_buy")
+        if not self.sell > self.strong_sell:
+            raise ValueError("thresholds.sell must be above thresholds.strong_sell")
+        return self
+
+
+class RiskSpec(BaseModel):
+    """Risk level from one indicator's value (HIGH above `high`, MEDIUM above `medium`)"""
+    indicator: str = "volatility"
+    high: float = 5.0
+    medium: float = 2.0
+
+
+class StrategySpec(BaseModel):
+    name: str = "default"
+    indicators: List[IndicatorSpec]
+    thresholds: Thresholds = Field(default_factory=Thresholds)
+    risk: RiskSpec = Field(default_factory=RiskSpec)
+    min_periods: int = Field(default=30, ge=2)
+
+    @model_validator(mode="after")
+    def _check(self):
+        keys = [i.key for i in self.indicators]
+        if len(set(keys)) != len(keys):
+            raise ValueError("Indicator names must be unique")
+        for indicator in self.indicators:
+            if indicator.type not in INDICATORS:
+                raise ValueError(f"Unknown indicator type: {indicator.type} (known: {', '.join(INDICATORS)})")
+            _check_params(indicator, self.min_periods)
+        if self.risk.indicator not in keys:
+            raise ValueError(f"Risk indicator {self.risk.indicator} is not in the strategy")
+        return self
+
+
+def _check_params(indicator: IndicatorSpec, min_periods: int):
+    """Parameters must exist, and every window must fit in min_periods closes"""
+    builder = INDICATORS[indicator.type]
+    defaults = {name: p.default for name, p in list(inspect.signature(builder).parameters.items())[1:]}
+    unknown = sorted(set(indicator.params) - set(defaults))
+    if unknown:
+        raise ValueError(
+            f"Unknown parameters for {indicator.key}: {', '.join(unknown)} (known: {', '.join(defaults)})"
+        )
+
+    for name, (extra, smallest) in WINDOW_PARAMS[indicator.type].items():
+        value = indicator.params.get(name, defaults[name])
+        largest = min_periods - extra
+        if not float(value).is_integer() or not smallest <= value <= largest:
+            raise ValueError(
+                f"{indicator.key}.{name} must be a whole number from {smallest} to {largest} "
+                f"(min_periods is {min_periods}), got {value}"
+            )
+
+
+# --- Plan building --------------------------------------------------------
+
+class _Planner:
+    """Collects steps, reusing any step with the same key"""
+
+    def __init__(self):
+        self.steps: List[Tuple[tuple, Callable, Tuple[tuple, ...]]] = []
+        self._keys = set()
+
+    def node(self, key: tuple, fn: Callable, *deps: tuple) -> tuple:
+        if key not in self._keys:
+            self._keys.add(key)
+            self.steps.append((key, fn, deps))
+        return key
+
+    # Shared intermediates
+    def diffs(self) -> tuple:
+        return self.node(("diff",), lambda c: np.diff(c, axis=-1))
+
+    def returns(self) -> tuple:
+        return self.node(("returns",), lambda c, d: _safe_div(d, c[..., :-1]), self.diffs())
+
+    def mean_last(self, n: int) -> tuple:
+        return self.node(("mean", n), lambda c: c[..., -n:].mean(axis=-1))
+
+    def close_ago(self, n: int) -> tuple:
+        """The close n periods back, counting the latest as 1 (closes[-n])"""
+        return self.node(("close", n), lambda c: c[..., -n])
+
+
+def _trend(p: _Planner, short: float = 7, long: float = 20, scale: float = 10) -> tuple:
+    """Short vs long moving average"""
+    short_ma, long_ma = p.mean_last(int(short)), p.mean_last(int(long))
+    return p.node(
+        ("trend", int(short), int(long), scale),
+        lambda c, s, l: np.clip(_safe_div(s - l, l) * scale, -1, 1),
+        short_ma, long_ma
+    )
+
+
+def _rsi(p: _Planner, period: float = 14, oversold: float = 30, overbought: float = 70) -> tuple:
+    """RSI over `period` changes, mapped to +1 (oversold) .. -1 (overbought)"""
+    n = int(period)
+    gains = p.node(("gain", n), lambda c, d: np.where(d[..., -n:] > 0, d[..., -n:], 0).mean(axis=-1), p.diffs())
+    losses = p.node(("loss", n), lambda c, d: np.where(d[..., -n:] < 0, -d[..., -n:], 0).mean(axis=-1), p.diffs())
+    rsi = p.node(
+        ("rsi", n),
+        lambda c, g, l: np.where(l == 0, 100.0, 100 - 100 / (1 + _safe_div(g, l))),
+        gains, losses
+    )
+    return p.node(
+        ("rsi_signal", n, oversold, overbought),
+        lambda c, r: np.select(
+            [r < oversold, r > overbought],
+            [(oversold - r) / oversold, -(r - overbought) / (100 - overbought)],
+            default=0.0
+        ),
+        rsi
+    )
+
+
+def _momentum(p: _Planner, lookback: float = 10, scale: float = 5) -> tuple:
+    """Rate of change against the close `lookback` periods back"""
+    then = p.close_ago(int(lookback))
+    now = p.close_ago(1)
+    return p.node(
+        ("momentum", int(lookback), scale),
+        lambda c, t, n: np.clip(_safe_div(n - t, t) * scale, -1, 1),
+        then, now
+    )
+
+
+def _volatility(p: _Planner, window: float = 0) -> tuple:
+    """Std of period returns in percent (window 0 = whole series)"""
+    n = int(window)
+    return p.node(
+        ("volatility", n),
+        lambda c, r: (r[..., -n:] if n else r).std(axis=-1) * 100,
+        p.returns()
+    )
+
+
+def _mean_reversion(p: _Planner, window: float = 20, scale: float = 10) -> tuple:
+    """Distance below (+) / above (-) the moving average"""
+    ma = p.mean_last(int(window))
+    now = p.close_ago(1)
+    return p.node(
+        ("mean_reversion", int(window), scale),
+        lambda c, m, n: np.clip(_safe_div(m - n, m) * scale, -1, 1),
+        ma, now
+    )
+
+
+INDICATORS: Dict[str, Callable[..., tuple]] = {
+    "trend": _trend,
+    "rsi": _rsi,
+    "momentum": _momentum,
+    "volatility": _volatility,
+    "mean_reversion": _mean_reversion,
+}
+
+# Window parameters per indicator: (closes read beyond the window, smallest value)
+WINDOW_PARAMS: Dict[str, Dict[str, Tuple[int, int]]] = {
+    "trend": {"short": (0, 1), "long": (0, 1)},
+    "rsi": {"period": (1, 1)},  # `period` changes span period + 1 closes
+    "momentum": {"lookback": (0, 1)},
+    "volatility": {"window": (1, 0)},  # `window` returns; 0 = whole series
+    "mean_reversion": {"window": (0, 1)},
+}
+
+
+class StrategyPlan:
+    """A compiled StrategySpec"""
+
+    def __init__(self, spec: StrategySpec):
+        self.spec = spec
+        planner = _Planner()
+        self.outputs: Dict[str, tuple] = {}
+        for indicator in spec.indicators:
+            try:
+                self.outputs[indicator.key] = INDICATORS[indicator.type](planner, **indicator.params)
+            except TypeError as e:
+                raise ValueError(f"Bad parameters for {indicator.key}: {e}")
+        self.steps = planner.steps
+        self.weights = {i.key: i.weight for i in spec.indicators if i.weight}
+
+    def evaluate(
+        self,
+        closes: np.ndarray,
+        cache: Optional[Dict[tuple, np.ndarray]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        closes: (symbols x periods), oldest first, >= min_periods; any
+        leading shape works (e.g. sliding windows), periods come last.
+        Returns each indicator plus score, signal, strength and risk_level per symbol.
+        `cache` keeps intermediates between plans evaluated on the same closes.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=float))
+        values: Dict[tuple, np.ndarray] = cache if cache is not None else {}
+        for key, fn, deps in self.steps:
+            if key not in values:
+                values[key] = fn(closes, *(values[d] for d in deps))
+
+        result = {name: values[key] for name, key in self.outputs.items()}
+        score = np.zeros(closes.shape[:-1])
+        for name, weight in self.weights.items():
+            score = score + result[name] * weight
+
+        t = self.spec.thresholds
+        risk = self.spec.risk
+        result.update({
+            "score": score,
+            "signal": np.select([score > t.buy, score < t.sell], ["BUY", "SELL"], default="HOLD"),
+            "strength": np.select(
+                [score > t.strong_buy, score > t.buy, score < t.strong_sell, score < t.sell],
+                ["STRONG", "MODERATE", "STRONG", "MODERATE"],
+                default="NEUTRAL"
+            ),
+            "risk_level": np.select(
+                [result[risk.indicator] > risk.high, result[risk.indicator] > risk.medium],
+                ["HIGH", "MEDIUM"], default="LOW"
+            ),
+        })
+        return result
+
+
+def compile_strategy(spec: StrategySpec) -> StrategyPlan:
+    return StrategyPlan(spec)
+
+
+def load_strategy(path: str) -> StrategySpec:
+    """Read a StrategySpec from a JSON file"""
+    with open(path) as f:
+        return StrategySpec(**json.load(f))
+
+
+# The long-standing weighted trend/RSI/momentum blend
+DEFAULT_STRATEGY = StrategySpec(
+    name="default",
+    indicators=[
+        IndicatorSpec(type="trend", params={"short": 7, "long": 20, "scale": 10}, weight=0.4),
+        IndicatorSpec(type="rsi", params={"period": 14, "oversold": 30, "overbought": 70}, weight=0.3),
+        IndicatorSpec(type="momentum", params={"lookback": 10, "scale": 5}, weight=0.3),
+        IndicatorSpec(type="volatility"),
+    ],
+)
@@ -2,5 +2,9 @@
 from .base import DataProvider
 from .binance import BinanceProvider
 from .coincap import CoinCapProvider
+from .symbols import symbol_resolver, SymbolResolver, ResolvedSymbol
 
-__all__ = ["DataProvider", "BinanceProvider", "CoinCapProvider"]
+__all__ = [
+    "DataProvider", "BinanceProvider", "CoinCapProvider",
+    "symbol_resolver", "SymbolResolver", "ResolvedSymbol"
+]
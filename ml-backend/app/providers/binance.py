@@ -4,10 +4,11 @@ Binance Data Provider - PRIMARY data source (free, no API key!)
 import httpx
 from datetime import datetime
 from typing import List, Optional
-from cachetools import TTLCache
 
 from .base import DataProvider, PriceData, CoinInfo
+from .scheduler import scheduler, hop_timeout, BudgetExceeded, DeadlineExceeded
 from ..config import get_settings
+from ..cache import BudgetedCache
 
 
 class BinanceProvider(DataProvider):
@@ -19,7 +20,19 @@ class BinanceProvider(DataProvider):
     def __init__(self):
         settings = get_settings()
         self.base_url = settings.BINANCE_BASE_URL
-        self._cache = TTLCache(maxsize=100, ttl=60)
+        # Expired values stay readable as the fallback when shedding, until memory is needed
+        self._cache = BudgetedCache("binance", ttl=60, keep_stale=True)
+    
+    def _remember(self, cache_key: str, value, cost: float = 1.0):
+        """Cache a fresh value (it stays as the stale fallback once expired)"""
+        self._cache.set(cache_key, value, cost=cost)
+    
+    def _stale_or_raise(self, cache_key: str, error: Exception):
+        """Serve an expired value when budget or time is too short to refresh"""
+        stale = self._cache.get_stale(cache_key)
+        if stale is not None:
+            return stale
+        raise error
     
     @property
     def name(self) -> str:
@@ -41,32 +54,93 @@ class BinanceProvider(DataProvider):
         
         # Convert days to limit (max 1000 per request)
         limit = min(days, 1000)
+        try:
+            prices = await self.get_klines(symbol, interval=interval, limit=limit)
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/klines",
-                params={
-                    "symbol": symbol.upper(),
-                    "interval": interval,
-                    "limit": limit
-                }
-            )
-            response.raise_for_status()
-            data = response.json()
+        self._remember(cache_key, prices, cost=scheduler.weight("binance", "klines"))
+        return prices
+    
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str = "1d",
+        limit: int = 1000,
+        start_time: Optional[datetime] = None
+    ) -> List[PriceData]:
+        """
+        Get raw klines from Binance (uncached).
+        Used for incremental fetches starting at start_time.
+        """
+        params = {
+            "symbol": symbol.upper(),
+            "interval": interval,
+            "limit": min(limit, 1000)
+        }
+        if start_time is not None:
+            params["startTime"] = int(start_time.timestamp() * 1000)
         
-        prices = []
-        for candle in data:
-            prices.append(PriceData(
+        response = await scheduler.get(
+            "binance", "klines", f"{self.base_url}/klines", params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        
+        return [
+            PriceData(
                 timestamp=datetime.fromtimestamp(candle[0] / 1000),
                 open=float(candle[1]),
                 high=float(candle[2]),
                 low=float(candle[3]),
                 close=float(candle[4]),
                 volume=float(candle[5])
-            ))
+            )
+            for candle in data
+        ]
+    
+    async def get_order_book(self, symbol: str, limit: int = 1000) -> dict:
+        """
+        Get an L2 depth snapshot (uncached).
+        Returns Binance's raw {"lastUpdateId", "bids", "asks"}.
+        """
+        # Depth weight grows with the number of levels requested
+        if limit <= 100:
+            weight = 5
+        elif limit <= 500:
+            weight = 25
+        elif limit <= 1000:
+            weight = 50
+        else:
+            weight = 250
         
-        self._cache[cache_key] = prices
-        return prices
+        response = await scheduler.get(
+            "binance", "depth", f"{self.base_url}/depth",
+            weight=weight,
+            params={"symbol": symbol.upper(), "limit": min(limit, 5000)}
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_agg_trades(
+        self,
+        symbol: str,
+        from_id: Optional[int] = None,
+        limit: int = 1000
+    ) -> List[dict]:
+        """
+        Get raw aggregated trades (uncached), oldest first.
+        Without from_id, returns the most recent trades.
+        """
+        params = {"symbol": symbol.upper(), "limit": min(limit, 1000)}
+        if from_id is not None:
+            params["fromId"] = from_id
+        
+        response = await scheduler.get(
+            "binance", "aggTrades", f"{self.base_url}/aggTrades", params=params
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def get_current_price(self, symbol: str) -> float:
         """Get current price for a symbol"""
@@ -74,28 +148,46 @@ class BinanceProvider(DataProvider):
         if cache_key in self._cache:
             return self._cache[cache_key]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        try:
+            response = await scheduler.get(
+                "binance", "ticker/price",
                 f"{self.base_url}/ticker/price",
                 params={"symbol": symbol.upper()}
             )
-            response.raise_for_status()
-            data = response.json()
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
+        response.raise_for_status()
+        data = response.json()
         
         price = float(data["price"])
-        self._cache[cache_key] = price
+        self._remember(cache_key, price, cost=scheduler.weight("binance", "ticker/price"))
         return price
     
+    async def get_24h_tickers(self) -> List[dict]:
+        """Get raw 24h tickers for ALL symbols in one request"""
+        cache_key = "tickers_24h"
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+        
+        try:
+            response = await scheduler.get(
+                "binance", "ticker/24hr:all", f"{self.base_url}/ticker/24hr"
+            )
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
+        response.raise_for_status()
+        data = response.json()
+        
+        self._remember(cache_key, data, cost=scheduler.weight("binance", "ticker/24hr:all"))
+        return data
+    
     async def get_supported_coins(self) -> List[CoinInfo]:
         """Get list of supported trading pairs"""
         cache_key = "coins_list"
         if cache_key in self._cache:
             return self._cache[cache_key]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{self.base_url}/ticker/24hr")
-            response.raise_for_status()
-            data = response.json()
+        data = await self.get_24h_tickers()
         
         # Filter for USDT pairs (most common)
         coins = []
@@ -113,14 +205,14 @@ class BinanceProvider(DataProvider):
         
         # Sort by volume
         coins.sort(key=lambda x: x.volume_24h, reverse=True)
-        self._cache[cache_key] = coins[:100]  # Top 100
+        self._remember(cache_key, coins[:100], cost=scheduler.weight("binance", "ticker/24hr:all"))  # Top 100
         return coins[:100]
     
     async def health_check(self) -> bool:
         """Check if Binance API is available"""
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/ping")
+                response = await client.get(f"{self.base_url}/ping", timeout=hop_timeout(5))
                 return response.status_code == 200
         except Exception:
             return False
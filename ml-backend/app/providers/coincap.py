@@ -4,10 +4,11 @@ CoinCap Data Provider - SECONDARY data source (free, no API key!)
 import httpx
 from datetime import datetime
 from typing import List
-from cachetools import TTLCache
 
 from .base import DataProvider, PriceData, CoinInfo
+from .scheduler import scheduler, hop_timeout, BudgetExceeded, DeadlineExceeded
 from ..config import get_settings
+from ..cache import BudgetedCache
 
 
 class CoinCapProvider(DataProvider):
@@ -20,7 +21,19 @@ class CoinCapProvider(DataProvider):
     def __init__(self):
         settings = get_settings()
         self.base_url = settings.COINCAP_BASE_URL
-        self._cache = TTLCache(maxsize=100, ttl=60)
+        # Expired values stay readable as the fallback when shedding, until memory is needed
+        self._cache = BudgetedCache("coincap", ttl=60, keep_stale=True)
+    
+    def _remember(self, cache_key: str, value):
+        """Cache a fresh value (it stays as the stale fallback once expired)"""
+        self._cache[cache_key] = value
+    
+    def _stale_or_raise(self, cache_key: str, error: Exception):
+        """Serve an expired value when budget or time is too short to refresh"""
+        stale = self._cache.get_stale(cache_key)
+        if stale is not None:
+            return stale
+        raise error
     
     @property
     def name(self) -> str:
@@ -48,8 +61,9 @@ class CoinCapProvider(DataProvider):
         end_time = int(datetime.now().timestamp() * 1000)
         start_time = end_time - (days * 24 * 60 * 60 * 1000)
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
+        try:
+            response = await scheduler.get(
+                "coincap", "history",
                 f"{self.base_url}/assets/{symbol.lower()}/history",
                 params={
                     "interval": api_interval,
@@ -57,8 +71,10 @@ class CoinCapProvider(DataProvider):
                     "end": end_time
                 }
             )
-            response.raise_for_status()
-            data = response.json()
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
+        response.raise_for_status()
+        data = response.json()
         
         prices = []
         for point in data.get("data", []):
@@ -72,7 +88,7 @@ class CoinCapProvider(DataProvider):
                 volume=0  # CoinCap history doesn't include volume
             ))
         
-        self._cache[cache_key] = prices
+        self._remember(cache_key, prices)
         return prices
     
     async def get_current_price(self, symbol: str) -> float:
@@ -81,15 +97,17 @@ class CoinCapProvider(DataProvider):
         if cache_key in self._cache:
             return self._cache[cache_key]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/assets/{symbol.lower()}"
+        try:
+            response = await scheduler.get(
+                "coincap", "asset", f"{self.base_url}/assets/{symbol.lower()}"
             )
-            response.raise_for_status()
-            data = response.json()
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
+        response.raise_for_status()
+        data = response.json()
         
         price = float(data["data"]["priceUsd"])
-        self._cache[cache_key] = price
+        self._remember(cache_key, price)
         return price
     
     async def get_supported_coins(self) -> List[CoinInfo]:
@@ -98,13 +116,14 @@ class CoinCapProvider(DataProvider):
         if cache_key in self._cache:
             return self._cache[cache_key]
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/assets",
-                params={"limit": 100}
+        try:
+            response = await scheduler.get(
+                "coincap", "assets", f"{self.base_url}/assets", params={"limit": 100}
             )
-            response.raise_for_status()
-            data = response.json()
+        except (BudgetExceeded, DeadlineExceeded) as e:
+            return self._stale_or_raise(cache_key, e)
+        response.raise_for_status()
+        data = response.json()
         
         coins = []
         for asset in data.get("data", []):
@@ -118,14 +137,14 @@ class CoinCapProvider(DataProvider):
                 market_cap=float(asset["marketCapUsd"] or 0)
             ))
         
-        self._cache[cache_key] = coins
+        self._remember(cache_key, coins)
         return coins
     
     async def health_check(self) -> bool:
         """Check if CoinCap API is available"""
         try:
             async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/assets/bitcoin")
+                response = await client.get(f"{self.base_url}/assets/bitcoin", timeout=hop_timeout(5))
                 return response.status_code == 200
         except Exception:
             return False
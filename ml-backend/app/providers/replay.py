@@ -0,0 +1,499 @@
+"""
+Record & Replay Provider - run the whole stack from a local archive
+Klines and ticks are stored in one compressed .npz file.
+
+Record with:  python -m app.providers.replay record --symbols btc,eth --minutes 60
+Replay with:  REPLAY_ARCHIVE=replay.npz REPLAY_SPEED=0 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .base import DataProvider, PriceData, CoinInfo
+from .binance import BinanceProvider
+from ..config import get_settings
+
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "2h": 2 * 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "6h": 6 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+
+DAY_MS = INTERVAL_MS["1d"]
+
+# Archive layout: "meta" (JSON), "ticks" [time_ms, price], "tick_pairs"
+# (index into meta["pairs"]) and one "klines__{PAIR}__{interval}" array
+# of [open_ms, open, high, low, close, volume] rows per series
+KLINE_PREFIX = "klines__"
+
+
+def _rows(prices: List[PriceData]) -> np.ndarray:
+    """PriceData list -> (n, 6) kline rows"""
+    return np.array([
+        [p.timestamp.timestamp() * 1000, p.open, p.high, p.low, p.close, p.volume]
+        for p in prices
+    ], dtype=np.float64).reshape(-1, 6)
+
+
+def _prices(rows: np.ndarray) -> List[PriceData]:
+    """(n, 6) kline rows -> PriceData list"""
+    return [
+        PriceData(
+            timestamp=datetime.fromtimestamp(r[0] / 1000),
+            open=r[1], high=r[2], low=r[3], close=r[4], volume=r[5]
+        )
+        for r in rows.tolist()
+    ]
+
+
+def _rollup(rows: np.ndarray, step_ms: int) -> np.ndarray:
+    """Aggregate finer kline rows into `step_ms` bars"""
+    if len(rows) == 0:
+        return rows
+    buckets = rows[:, 0] // step_ms * step_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(rows)] - 1
+    return np.column_stack([
+        buckets[starts],
+        rows[starts, 1],
+        np.maximum.reduceat(rows[:, 2], starts),
+        np.minimum.reduceat(rows[:, 3], starts),
+        rows[ends, 4],
+        np.add.reduceat(rows[:, 5], starts),
+    ])
+
+
+class ReplayProvider(DataProvider):
+    """
+    Serves recorded market data as if it were live.
+    A replay clock decides what is "now"; only data at or before it is visible.
+    speed: 1 = real time, N = N x faster, 0 = as fast as possible.
+    """
+
+    def __init__(self, archive_path: str, speed: float = 1.0):
+        self.archive_path = archive_path
+        self.speed = speed
+        self._klines: Dict[Tuple[str, str], np.ndarray] = {}
+        self._ticks: Dict[str, np.ndarray] = {}
+        self._load(archive_path)
+        self.now_ms = self.start_ms
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self, path: str):
+        with np.load(path) as archive:
+            meta = json.loads(str(archive["meta"]))
+            for key in archive.files:
+                if key.startswith(KLINE_PREFIX):
+                    _, pair, interval = key.split("__")
+                    rows = archive[key]
+                    self._klines[(pair, interval)] = rows[np.argsort(rows[:, 0], kind="stable")]
+            ticks, tick_pairs = archive["ticks"], archive["tick_pairs"]
+
+        self.pairs: List[str] = meta["pairs"]
+        order = np.argsort(ticks[:, 0], kind="stable") if len(ticks) else np.array([], dtype=int)
+        self._timeline = (ticks[order], tick_pairs[order])
+        for i, pair in enumerate(self.pairs):
+            self._ticks[pair] = ticks[order][tick_pairs[order] == i]
+
+        self.start_ms = int(meta["start_ms"])
+        self.end_ms = int(meta["end_ms"])
+
+    @property
+    def name(self) -> str:
+        return "Replay"
+
+    @property
+    def finished(self) -> bool:
+        return self.now_ms >= self.end_ms
+
+    # --- Playback ---------------------------------------------------------
+
+    def start(self, on_tick: Optional[Callable[[str, int, float], None]] = None):
+        """Start advancing the replay clock in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.play(on_tick))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _events(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(time_ms, pair index) of every recorded tick; bar closes if none"""
+        ticks, pairs = self._timeline
+        if len(ticks):
+            return ticks, pairs
+
+        # No ticks recorded: step through base-interval bar closes instead
+        times, indexes = [], []
+        for i, pair in enumerate(self.pairs):
+            interval = self._finest(pair)
+            if interval is None:
+                continue
+            rows = self._klines[(pair, interval)]
+            closes = rows[:, 0] + INTERVAL_MS[interval]
+            keep = (closes > self.start_ms) & (closes <= self.end_ms)
+            times.append(np.column_stack([closes[keep], rows[keep, 4]]))
+            indexes.append(np.full(keep.sum(), i))
+        if not times:
+            return np.empty((0, 2)), np.empty(0, dtype=int)
+        events, pairs = np.concatenate(times), np.concatenate(indexes)
+        order = np.argsort(events[:, 0], kind="stable")
+        return events[order], pairs[order]
+
+    async def play(self, on_tick: Optional[Callable[[str, int, float], None]] = None):
+        """Advance the clock through the recording, calling on_tick(pair, time_ms, price)"""
+        events, pairs = self._events()
+        wall_start = time.monotonic()
+        print(f"⏯️  Replaying {len(events)} events at "
+              f"{'max speed' if self.speed <= 0 else f'{self.speed:g}x'}")
+
+        for i, ((t, price), pair_index) in enumerate(zip(events.tolist(), pairs.tolist())):
+            if self.speed > 0:
+                due = wall_start + (t - self.start_ms) / 1000 / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 200 == 0:
+                await asyncio.sleep(0)  # Let the rest of the stack keep up
+
+            self.now_ms = max(self.now_ms, int(t))
+            if on_tick is not None:
+                try:
+                    on_tick(self.pairs[pair_index], int(t), price)
+                except Exception as e:
+                    print(f"Replay tick error: {e}")
+
+        self.now_ms = self.end_ms
+        print(f"⏹️  Replay finished in {time.monotonic() - wall_start:.1f}s")
+
+    # --- Market data ------------------------------------------------------
+
+    def _finest(self, pair: str) -> Optional[str]:
+        """Finest recorded interval for a pair"""
+        recorded = [iv for (p, iv) in self._klines if p == pair]
+        return min(recorded, key=INTERVAL_MS.get) if recorded else None
+
+    def _series(self, pair: str, interval: str) -> np.ndarray:
+        """Recorded rows for an interval, rolled up from a finer one if needed"""
+        rows = self._klines.get((pair, interval))
+        if rows is not None:
+            return rows
+        step = INTERVAL_MS[interval]
+        finer = [
+            iv for (p, iv) in self._klines
+            if p == pair and INTERVAL_MS[iv] < step and step % INTERVAL_MS[iv] == 0
+        ]
+        if not finer:
+            raise ValueError(f"No recorded {interval} data for {pair}")
+        rows = _rollup(self._klines[(pair, max(finer, key=INTERVAL_MS.get))], step)
+        self._klines[(pair, interval)] = rows
+        return rows
+
+    async def get_klines(
+        self,
+        symbol: str,
+        interval: str = "1d",
+        limit: int = 1000,
+        start_time: Optional[datetime] = None
+    ) -> List[PriceData]:
+        """Bars that had closed by the replay clock (same signature as BinanceProvider)"""
+        rows = self._series(symbol.upper(), interval)
+        step = INTERVAL_MS[interval]
+        closed = int(np.searchsorted(rows[:, 0], self.now_ms - step, side="right"))
+        limit = min(limit, 1000)
+
+        if start_time is not None:
+            start_ms = int(start_time.timestamp() * 1000) // step * step
+            first = int(np.searchsorted(rows[:, 0], start_ms, side="left"))
+            return _prices(rows[first:min(first + limit, closed)])
+        return _prices(rows[max(0, closed - limit):closed])
+
+    async def get_historical_prices(
+        self,
+        symbol: str,
+        days: int = 365,
+        interval: str = "1d"
+    ) -> List[PriceData]:
+        limit = max(1, days * DAY_MS // INTERVAL_MS.get(interval, DAY_MS))
+        return await self.get_klines(symbol, interval=interval, limit=limit)
+
+    def price_at(self, pair: str) -> Optional[float]:
+        """Latest recorded price at the replay clock"""
+        pair = pair.upper()
+        ticks = self._ticks.get(pair)
+        if ticks is not None and len(ticks):
+            i = int(np.searchsorted(ticks[:, 0], self.now_ms, side="right"))
+            if i:
+                return float(ticks[i - 1, 1])
+
+        interval = self._finest(pair)
+        if interval is None:
+            return None
+        rows = self._klines[(pair, interval)]
+        i = int(np.searchsorted(rows[:, 0], self.now_ms - INTERVAL_MS[interval], side="right"))
+        return float(rows[i - 1, 4]) if i else None
+
+    async def get_current_price(self, symbol: str) -> float:
+        price = self.price_at(symbol)
+        if price is None:
+            raise ValueError(f"No recorded price for {symbol}")
+        return price
+
+    def get_24h_ticker(self, pair: str) -> Optional[dict]:
+        """Binance-style 24h ticker computed from the recording"""
+        pair = pair.upper()
+        price = self.price_at(pair)
+        interval = self._finest(pair)
+        if price is None or interval is None:
+            return None
+
+        rows = self._klines[(pair, interval)]
+        step = INTERVAL_MS[interval]
+        lo = int(np.searchsorted(rows[:, 0], self.now_ms - DAY_MS, side="left"))
+        hi = int(np.searchsorted(rows[:, 0], self.now_ms - step, side="right"))
+        window = rows[lo:hi]
+        if len(window) == 0:
+            window = rows[max(0, hi - 1):hi]
+
+        open_price = float(window[0, 1]) if len(window) else price
+        volume = float(window[:, 5].sum()) if len(window) else 0.0
+        return {
+            "symbol": pair,
+            "lastPrice": str(price),
+            "openPrice": str(open_price),
+            "highPrice": str(max(price, float(window[:, 2].max())) if len(window) else price),
+            "lowPrice": str(min(price, float(window[:, 3].min())) if len(window) else price),
+            "volume": str(volume),
+            "quoteVolume": str(float((window[:, 5] * window[:, 4]).sum()) if len(window) else 0.0),
+            "priceChangePercent": str((price - open_price) / open_price * 100 if open_price else 0.0),
+        }
+
+    async def get_24h_tickers(self) -> List[dict]:
+        return [t for t in map(self.get_24h_ticker, self.pairs) if t is not None]
+
+    async def get_supported_coins(self) -> List[CoinInfo]:
+        coins = [
+            CoinInfo(
+                id=t["symbol"][:-len("USDT")].lower(),
+                symbol=t["symbol"][:-len("USDT")],
+                name=t["symbol"][:-len("USDT")],
+                current_price=float(t["lastPrice"]),
+                price_change_24h=float(t["priceChangePercent"]),
+                volume_24h=float(t["volume"])
+            )
+            for t in await self.get_24h_tickers()
+            if t["symbol"].endswith("USDT")
+        ]
+        coins.sort(key=lambda c: c.volume_24h, reverse=True)
+        return coins[:100]
+
+    async def health_check(self) -> bool:
+        return True
+
+
+class ReplayRecorder(DataProvider):
+    """
+    Wraps a live provider and captures every kline and price it returns,
+    so a session can be replayed later with ReplayProvider.
+    """
+
+    def __init__(self, provider: BinanceProvider, archive_path: str):
+        self.provider = provider
+        self.archive_path = archive_path
+        self.start_ms = int(time.time() * 1000)
+        self._klines: Dict[Tuple[str, str], Dict[int, list]] = {}
+        self._ticks: List[Tuple[float, str, float]] = []
+
+    @property
+    def name(self) -> str:
+        return f"{self.provider.name} (recording)"
+
+    def __getattr__(self, attr):
+        # Anything not captured goes straight to the live provider
+        if attr == "provider":
+            raise AttributeError(attr)
+        return getattr(self.provider, attr)
+
+    def _capture_klines(self, pair: str, interval: str, prices: List[PriceData]):
+        series = self._klines.setdefault((pair.upper(), interval), {})
+        for row in _rows(prices).tolist():
+            series[int(row[0])] = row  # Later (closed) versions replace partial ones
+
+    def _capture_tick(self, pair: str, price: float):
+        self._ticks.append((time.time() * 1000, pair.upper(), price))
+
+    async def get_klines(self, symbol: str, interval: str = "1d", limit: int = 1000,
+                         start_time: Optional[datetime] = None) -> List[PriceData]:
+        prices = await self.provider.get_klines(symbol, interval=interval, limit=limit, start_time=start_time)
+        self._capture_klines(symbol, interval, prices)
+        return prices
+
+    async def get_historical_prices(self, symbol: str, days: int = 365,
+                                    interval: str = "1d") -> List[PriceData]:
+        prices = await self.provider.get_historical_prices(symbol, days=days, interval=interval)
+        self._capture_klines(symbol, interval, prices)
+        return prices
+
+    async def get_current_price(self, symbol: str) -> float:
+        price = await self.provider.get_current_price(symbol)
+        self._capture_tick(symbol, price)
+        return price
+
+    async def get_24h_tickers(self) -> List[dict]:
+        tickers = await self.provider.get_24h_tickers()
+        for t in tickers:
+            if t["symbol"].endswith("USDT"):
+                self._capture_tick(t["symbol"], float(t["lastPrice"]))
+        return tickers
+
+    async def get_supported_coins(self) -> List[CoinInfo]:
+        return await self.provider.get_supported_coins()
+
+    async def health_check(self) -> bool:
+        return await self.provider.health_check()
+
+    def save(self, path: Optional[str] = None):
+        """Write everything captured so far to a compressed archive"""
+        path = path or self.archive_path
+        pairs = sorted({p for p, _ in self._klines} | {p for _, p, _ in self._ticks})
+        index = {p: i for i, p in enumerate(pairs)}
+        ticks = sorted(self._ticks)
+
+        arrays = {
+            "meta": np.array(json.dumps({
+                "pairs": pairs,
+                "start_ms": self.start_ms,
+                "end_ms": int(ticks[-1][0]) if ticks else int(time.time() * 1000),
+                "recorded_at": datetime.now().isoformat(),
+            })),
+            "ticks": np.array([[t, price] for t, _, price in ticks], dtype=np.float64).reshape(-1, 2),
+            "tick_pairs": np.array([index[p] for _, p, _ in ticks], dtype=np.int32),
+        }
+        for (pair, interval), series in self._klines.items():
+            rows = np.array([series[k] for k in sorted(series)], dtype=np.float64).reshape(-1, 6)
+            arrays[f"{KLINE_PREFIX}{pair}__{interval}"] = rows
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+        print(f"💾 Recorded {len(ticks)} ticks, {len(self._klines)} kline series -> {path}")
+
+
+# Process-wide market data provider (shared so replay has one clock)
+_market_provider: Optional[DataProvider] = None
+
+
+def market_provider() -> DataProvider:
+    """
+    Provider for Binance-style market data.
+    Replays REPLAY_ARCHIVE or records to REPLAY_RECORD_PATH when configured.
+    """
+    global _market_provider
+    settings = get_settings()
+    if settings.REPLAY_ARCHIVE:
+        if _market_provider is None:
+            _market_provider = ReplayProvider(settings.REPLAY_ARCHIVE, settings.REPLAY_SPEED)
+        return _market_provider
+    if settings.REPLAY_RECORD_PATH:
+        if _market_provider is None:
+            _market_provider = ReplayRecorder(BinanceProvider(), settings.REPLAY_RECORD_PATH)
+        return _market_provider
+    return BinanceProvider()
+
+
+def active_replay() -> Optional[ReplayProvider]:
+    """The running ReplayProvider, if the app is in replay mode"""
+    return _market_provider if isinstance(_market_provider, ReplayProvider) else None
+
+
+def active_recorder() -> Optional[ReplayRecorder]:
+    """The running ReplayRecorder, if the app is in record mode"""
+    return _market_provider if isinstance(_market_provider, ReplayRecorder) else None
+
+
+async def record(pairs: List[str], minutes: float, tick_seconds: float, path: str):
+    """Capture history plus live ticks for a few symbols"""
+    recorder = ReplayRecorder(BinanceProvider(), path)
+    await asyncio.gather(*(
+        recorder.get_klines(pair, interval=interval, limit=1000)
+        for pair in pairs for interval in ("1m", "1h", "1d")
+    ))
+
+    print(f"🎙️  Recording {', '.join(pairs)} for {minutes:g} minutes")
+    deadline = time.monotonic() + minutes * 60
+    last_save = time.monotonic()
+    try:
+        while time.monotonic() < deadline:
+            results = await asyncio.gather(
+                *(recorder.get_current_price(pair) for pair in pairs), return_exceptions=True
+            )
+            for pair, result in zip(pairs, results):
+                if isinstance(result, Exception):
+                    print(f"Record error for {pair}: {result}")
+            if time.monotonic() - last_save > 60:
+                recorder.save()
+                last_save = time.monotonic()
+            await asyncio.sleep(tick_seconds)
+
+        # Closed 1m bars for the recorded span
+        start = datetime.fromtimestamp(recorder.start_ms / 1000)
+        await asyncio.gather(*(
+            recorder.get_klines(pair, interval="1m", limit=1000, start_time=start)
+            for pair in pairs
+        ))
+    finally:
+        recorder.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.providers.replay")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rec = commands.add_parser("record", help="Record live market data")
+    rec.add_argument("--symbols", default="btc,eth", help="Tickers or pairs, comma separated")
+    rec.add_argument("--minutes", type=float, default=60)
+    rec.add_argument("--tick-seconds", type=float, default=2)
+    rec.add_argument("--out", default="replay.npz")
+
+    info = commands.add_parser("info", help="Describe an archive")
+    info.add_argument("archive")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        pairs = [
+            s.upper() if s.upper().endswith("USDT") else f"{s.upper()}USDT"
+            for s in args.symbols.split(",") if s.strip()
+        ]
+        try:
+            asyncio.run(record(pairs, args.minutes, args.tick_seconds, args.out))
+        except KeyboardInterrupt:
+            pass
+    else:
+        replay = ReplayProvider(args.archive)
+        span = (replay.end_ms - replay.start_ms) / 60_000
+        print(f"{args.archive}: {len(replay.pairs)} pairs, {span:.1f} minutes of ticks")
+        for (pair, interval), rows in sorted(replay._klines.items()):
+            print(f"  {pair:<12} {interval:<4} {len(rows):>6} bars")
+
+
+if __name__ == "__main__":
+    main()
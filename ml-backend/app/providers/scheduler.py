@@ -0,0 +1,315 @@
+"""
+Upstream Request Scheduler - keeps us inside provider rate limits
+Token buckets per provider and endpoint, priority queueing,
+and load shedding before Binance bans the IP
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..config import get_settings
+
+
+class Priority(IntEnum):
+    """Lower value = served first"""
+    INTERACTIVE = 0  # A user is waiting on the response
+    BACKGROUND = 1  # Refresh loops, scanners, warm-up
+
+
+# Set to BACKGROUND inside background loops; inherited by tasks they create
+request_priority: ContextVar[Priority] = ContextVar(
+    "request_priority", default=Priority.INTERACTIVE
+)
+
+
+# Monotonic time by which the current request must be answered (set per request)
+request_deadline: ContextVar[Optional[float]] = ContextVar(
+    "request_deadline", default=None
+)
+
+
+class BudgetExceeded(Exception):
+    """Request shed to protect the upstream rate-limit budget"""
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before the upstream call"""
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the request deadline (None without one; background work has none)"""
+    deadline = request_deadline.get()
+    if deadline is None or request_priority.get() >= Priority.BACKGROUND:
+        return None
+    return deadline - time.monotonic()
+
+
+def hop_timeout(default: float) -> float:
+    """Timeout for one upstream hop: its own limit, capped by what's left of the request"""
+    left = time_left()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+@contextmanager
+def deadline_share(fraction: float):
+    """
+    Give the calls inside only `fraction` of the remaining time, leaving
+    the rest for a fallback.
+    """
+    left = time_left()
+    if left is None or left <= 0:
+        yield
+        return
+    token = request_deadline.set(time.monotonic() + left * fraction)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously"""
+
+    def __init__(self, capacity: float, per_seconds: float = 60):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.level = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.level
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available"""
+        self._refill()
+        wait = max(0.0, self.blocked_until - time.monotonic())
+        if self.level < amount:
+            wait = max(wait, (amount - self.level) / self.rate)
+        return wait
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+    def sync_used(self, used: float):
+        """Align with the usage the server reports"""
+        self._refill()
+        self.level = min(self.level, self.capacity - used)
+
+    def block(self, seconds: float):
+        """Stop spending until the server lets us back in"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.level = min(self.level, 0)
+
+
+class UpstreamScheduler:
+    """
+    Admits upstream requests by priority within each provider's budget.
+    Interactive requests queue ahead of background ones; background
+    requests are shed once the budget drops into the interactive reserve.
+    """
+
+    # Binance request weights (https://binance-docs.github.io/apidocs/spot/en/)
+    BINANCE_WEIGHTS = {
+        "klines": 2,
+        "ticker/price": 2,
+        "ticker/price:all": 4,
+        "ticker/24hr": 2,
+        "ticker/24hr:all": 80,
+        "exchangeInfo": 20,
+        "depth": 5,
+        "aggTrades": 2,
+        "ping": 1,
+    }
+
+    def __init__(self):
+        settings = get_settings()
+        self.reserve = settings.UPSTREAM_BUDGET_RESERVE
+        self.timeout = settings.UPSTREAM_TIMEOUT_SECONDS
+        self.max_wait = {
+            Priority.INTERACTIVE: settings.UPSTREAM_MAX_WAIT_SECONDS,
+            Priority.BACKGROUND: settings.UPSTREAM_MAX_WAIT_SECONDS * 6,
+        }
+        self._buckets: Dict[str, TokenBucket] = {
+            # Stay a little under the documented limits
+            "binance": TokenBucket(settings.BINANCE_WEIGHT_PER_MINUTE * 0.9),
+            "coincap": TokenBucket(settings.COINCAP_REQUESTS_PER_MINUTE * 0.9),
+        }
+        self._endpoint_buckets: Dict[Tuple[str, str], TokenBucket] = {
+            # Heavy full-market calls get their own, tighter budget
+            ("binance", "ticker/24hr:all"): TokenBucket(6),
+            ("binance", "exchangeInfo"): TokenBucket(6),
+        }
+        self._queues: Dict[str, List[tuple]] = {}
+        self._conditions: Dict[str, asyncio.Condition] = {}
+        self._seq = itertools.count()
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def weight(self, provider: str, endpoint: str) -> int:
+        """Request weight for an endpoint (1 if unknown)"""
+        if provider == "binance":
+            return self.BINANCE_WEIGHTS.get(endpoint, 1)
+        return 1
+
+    def _count(self, provider: str, key: str):
+        counters = self._counters.setdefault(provider, {})
+        counters[key] = counters.get(key, 0) + 1
+
+    async def acquire(
+        self,
+        provider: str,
+        endpoint: str,
+        weight: Optional[int] = None,
+        priority: Optional[Priority] = None
+    ):
+        """Wait for budget, or raise BudgetExceeded if the request should be shed"""
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return  # Unmetered provider
+
+        weight = self.weight(provider, endpoint) if weight is None else weight
+        priority = request_priority.get() if priority is None else priority
+        buckets, costs = [bucket], [weight]
+        if (provider, endpoint) in self._endpoint_buckets:
+            # Endpoint buckets count requests, not weight
+            buckets.append(self._endpoint_buckets[(provider, endpoint)])
+            costs.append(1)
+
+        # Background work never eats into the interactive reserve
+        if priority >= Priority.BACKGROUND:
+            if any(b.available() - c < b.capacity * self.reserve for b, c in zip(buckets, costs)):
+                self._count(provider, "shed")
+                raise BudgetExceeded(f"{provider} budget reserved for interactive requests")
+
+        deadline = time.monotonic() + self.max_wait[priority]
+        left = time_left()
+        cut_short = left is not None and left < self.max_wait[priority]
+        if cut_short:
+            deadline = time.monotonic() + left  # The caller won't wait longer than this
+        queue = self._queues.setdefault(provider, [])
+        condition = self._conditions.setdefault(provider, asyncio.Condition())
+        entry = (int(priority), next(self._seq))
+
+        async with condition:
+            heapq.heappush(queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if queue[0] == entry:
+                        wait = max(b.time_until(c) for b, c in zip(buckets, costs))
+                        if wait <= 0:
+                            for b, c in zip(buckets, costs):
+                                b.take(c)
+                            self._count(provider, "admitted")
+                            return
+                        if now + wait > deadline:
+                            break
+                        timeout = wait
+                    else:
+                        timeout = deadline - now
+                        if timeout <= 0:
+                            break
+
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                if entry in queue:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                condition.notify_all()
+
+        self._count(provider, "shed")
+        if cut_short:
+            raise DeadlineExceeded(f"Request deadline passed while waiting for {provider} budget")
+        raise BudgetExceeded(f"{provider} budget exhausted")
+
+    def observe(self, provider: str, response: httpx.Response):
+        """Sync budgets with the provider's rate-limit headers"""
+        bucket = self._buckets.get(provider)
+        if bucket is None:
+            return
+
+        used = response.headers.get("x-mbx-used-weight-1m")
+        if used is not None:
+            try:
+                bucket.sync_used(float(used))
+            except ValueError:
+                pass
+
+        # 429 = slow down, 418 = IP banned; both say how long to back off
+        if response.status_code in (418, 429):
+            retry_after = response.headers.get("retry-after")
+            try:
+                seconds = float(retry_after) if retry_after else 60
+            except ValueError:
+                seconds = 60
+            bucket.block(seconds)
+            self._count(provider, f"http_{response.status_code}")
+
+    async def get(
+        self,
+        provider: str,
+        endpoint: str,
+        url: str,
+        client: Optional[httpx.AsyncClient] = None,
+        weight: Optional[int] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """
+        Budgeted GET request. The whole call (queueing included) stays
+        within the current request's deadline.
+        """
+        await self.acquire(provider, endpoint, weight)
+        timeout = hop_timeout(kwargs.pop("timeout", self.timeout))
+        try:
+            if client is None:
+                async with httpx.AsyncClient() as own_client:
+                    response = await asyncio.wait_for(own_client.get(url, timeout=timeout, **kwargs), timeout)
+            else:
+                response = await asyncio.wait_for(client.get(url, timeout=timeout, **kwargs), timeout)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self._count(provider, "timeouts")
+            left = time_left()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded(f"Request deadline passed waiting on {provider} {endpoint}")
+            raise
+        self.observe(provider, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Budget levels and admission counters per provider"""
+        now = time.monotonic()
+        return {
+            provider: {
+                "available": round(bucket.available(), 1),
+                "capacity": bucket.capacity,
+                "blocked_for_seconds": round(max(0.0, bucket.blocked_until - now), 1),
+                "queued": len(self._queues.get(provider, [])),
+                **self._counters.get(provider, {})
+            }
+            for provider, bucket in self._buckets.items()
+        }
+
+
+# Global instance
+scheduler = UpstreamScheduler()
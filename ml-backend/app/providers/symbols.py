@@ -0,0 +1,244 @@
+"""
+Symbol Resolver - maps coin IDs and tickers to each provider's identifier
+Built from Binance exchangeInfo + CoinCap asset lists
+"""
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import httpx
+from pydantic import BaseModel
+
+from ..config import get_settings
+from ..cache import BudgetedCache
+from .scheduler import scheduler, request_priority, Priority
+
+
+# CoinGecko IDs used by the frontend that differ from CoinCap IDs/tickers
+COINGECKO_ALIASES = {
+    "bitcoin": "BTC",
+    "ethereum": "ETH",
+    "binancecoin": "BNB",
+    "ripple": "XRP",
+    "cardano": "ADA",
+    "solana": "SOL",
+    "dogecoin": "DOGE",
+    "polkadot": "DOT",
+    "shiba-inu": "SHIB",
+    "litecoin": "LTC",
+    "avalanche-2": "AVAX",
+    "chainlink": "LINK",
+    "polygon": "MATIC",
+    "uniswap": "UNI",
+    "stellar": "XLM",
+    "tron": "TRX",
+    "monero": "XMR",
+    "bitcoin-cash": "BCH",
+    "fantom": "FTM",
+    "near-protocol": "NEAR",
+    "cosmos": "ATOM",
+    "algorand": "ALGO",
+    "vechain": "VET",
+    "internet-computer": "ICP",
+    "filecoin": "FIL",
+    "theta-token": "THETA",
+    "sand": "SAND",
+    "mana": "MANA",
+    "axie-infinity": "AXS",
+    "the-graph": "GRT",
+    "aave": "AAVE",
+    "eos": "EOS",
+    "tezos": "XTZ",
+    "elrond-erd-2": "EGLD",
+    "quant-network": "QNT",
+}
+
+
+class ResolvedSymbol(BaseModel):
+    """Provider identifiers for one coin"""
+    symbol: str  # BTC
+    binance: Optional[str] = None  # BTCUSDT
+    coincap: Optional[str] = None  # bitcoin
+
+
+class SymbolResolver:
+    """
+    O(1) lookup of coin IDs and tickers.
+    Unknown symbols are negatively cached so they fail fast.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.binance_url = settings.BINANCE_BASE_URL
+        self.coincap_url = settings.COINCAP_BASE_URL
+        self.snapshot_path = settings.SYMBOLS_SNAPSHOT_PATH
+        self.refresh_seconds = settings.SYMBOLS_REFRESH_SECONDS
+        self._index: Dict[str, ResolvedSymbol] = {}
+        # Capped: junk-symbol traffic must not flush the provider caches
+        self._negative = BudgetedCache(
+            "symbols_negative", ttl=settings.SYMBOLS_NEGATIVE_TTL_SECONDS, max_entries=10_000
+        )
+        self._refresh_lock = asyncio.Lock()
+        self._last_attempt = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[datetime] = None
+        self.load_snapshot()
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._index)
+
+    def lookup(self, key: str) -> Optional[ResolvedSymbol]:
+        """
+        Resolve a CoinGecko/CoinCap ID or ticker without I/O.
+        Before any metadata is loaded, falls back to treating the
+        input as a ticker.
+        """
+        key = key.strip().lower()
+        if not self.loaded:
+            symbol = COINGECKO_ALIASES.get(key, key.upper())
+            return ResolvedSymbol(symbol=symbol, binance=f"{symbol}USDT", coincap=key)
+
+        if key in self._negative:
+            return None
+        resolved = self._index.get(key)
+        if resolved is None:
+            self._negative[key] = True
+        return resolved
+
+    async def resolve(self, key: str) -> Optional[ResolvedSymbol]:
+        """Resolve a symbol, loading metadata first if there is none yet"""
+        if not self.loaded and time.monotonic() - self._last_attempt > 60:
+            await self.refresh()
+        return self.lookup(key)
+
+    def normalize(self, key: str) -> str:
+        """Ticker for an ID or ticker (uppercased input if unknown)"""
+        resolved = self.lookup(key)
+        return resolved.symbol if resolved else key.upper()
+
+    async def refresh(self):
+        """Rebuild the index from both providers' metadata"""
+        async with self._refresh_lock:
+            self._last_attempt = time.monotonic()
+            async with httpx.AsyncClient() as client:
+                binance, coincap = await asyncio.gather(
+                    self._fetch_binance(client),
+                    self._fetch_coincap(client),
+                    return_exceptions=True
+                )
+
+            if isinstance(binance, Exception):
+                print(f"Symbol resolver: Binance exchangeInfo failed: {binance}")
+                binance = None
+            if isinstance(coincap, Exception):
+                print(f"Symbol resolver: CoinCap assets failed: {coincap}")
+                coincap = None
+            if binance is None and coincap is None:
+                return  # Keep the previous index
+
+            self._index = self._build_index(binance or {}, coincap or [])
+            self._negative.clear()
+            self.loaded_at = datetime.now()
+            self.save_snapshot()
+
+    async def _fetch_binance(self, client: httpx.AsyncClient) -> Dict[str, str]:
+        """Ticker -> Binance USDT pair for every trading pair"""
+        response = await scheduler.get(
+            "binance", "exchangeInfo", f"{self.binance_url}/exchangeInfo",
+            client=client, timeout=30
+        )
+        response.raise_for_status()
+        return {
+            s["baseAsset"].upper(): s["symbol"]
+            for s in response.json().get("symbols", [])
+            if s.get("quoteAsset") == "USDT" and s.get("status") == "TRADING"
+        }
+
+    async def _fetch_coincap(self, client: httpx.AsyncClient) -> list:
+        """[(coincap_id, ticker)] ordered by market-cap rank"""
+        response = await scheduler.get(
+            "coincap", "assets", f"{self.coincap_url}/assets",
+            client=client, params={"limit": 2000}, timeout=30
+        )
+        response.raise_for_status()
+        return [(a["id"], a["symbol"].upper()) for a in response.json().get("data", [])]
+
+    @staticmethod
+    def _build_index(binance: Dict[str, str], coincap: list) -> Dict[str, ResolvedSymbol]:
+        """Key every known ID and ticker (lowercase) to its provider identifiers"""
+        coincap_by_ticker: Dict[str, str] = {}
+        for asset_id, ticker in coincap:
+            coincap_by_ticker.setdefault(ticker, asset_id)  # Highest rank wins
+
+        entries = {
+            ticker: ResolvedSymbol(
+                symbol=ticker,
+                binance=binance.get(ticker),
+                coincap=coincap_by_ticker.get(ticker)
+            )
+            for ticker in set(binance) | set(coincap_by_ticker)
+        }
+
+        index = {ticker.lower(): entry for ticker, entry in entries.items()}
+        for asset_id, ticker in coincap:
+            index.setdefault(asset_id, entries[ticker])
+        for alias, ticker in COINGECKO_ALIASES.items():
+            if ticker in entries:
+                index.setdefault(alias, entries[ticker])
+        return index
+
+    def load_snapshot(self):
+        """Load the last saved index so lookups work before the first refresh"""
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            self._index = {k: ResolvedSymbol(**v) for k, v in data["index"].items()}
+            self.loaded_at = datetime.fromisoformat(data["saved_at"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Symbol resolver: ignoring bad snapshot: {e}")
+
+    def save_snapshot(self):
+        """Write the index to disk atomically"""
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "saved_at": self.loaded_at.isoformat(),
+                    "index": {k: v.model_dump() for k, v in self._index.items()}
+                }, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            print(f"Symbol resolver: snapshot failed: {e}")
+
+    def start(self):
+        """Refresh metadata in the background"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Symbol resolver error: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+
+# Global instance
+symbol_resolver = SymbolResolver()
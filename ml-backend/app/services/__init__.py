@@ -1,4 +1,5 @@
 """Services module"""
 from .websocket import streamer, RealTimeStreamer
+from .candles import candle_aggregator, CandleAggregator
 
-__all__ = ["streamer", "RealTimeStreamer"]
+__all__ = ["streamer", "RealTimeStreamer", "candle_aggregator", "CandleAggregator"]
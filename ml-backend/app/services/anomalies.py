@@ -0,0 +1,248 @@
+"""
+Live Anomaly Monitor
+Runs the detect_anomalies checks incrementally and pushes new alerts
+to WebSocket subscribers. Price and volume spikes are checked on the
+bar still in progress, on every trade tick and base candle, so they go
+out as they happen; trend reversals need the bar to close.
+"""
+import asyncio
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from ..config import get_settings
+from ..models.signals import MarketAlert
+from ..providers.base import PriceData
+from .candles import candle_aggregator, SymbolCandles, INTERVAL_MS
+from .trades import trade_streams
+
+
+class AnomalyState:
+    """
+    Rolling state for one symbol, updated in O(1) per candle.
+    Mirrors SignalGenerator.detect_anomalies thresholds.
+    """
+
+    SHORT_MA = 7
+    LONG_MA = 20
+    VOLUME_WINDOW = 20
+
+    def __init__(self):
+        self.closes: Deque[float] = deque(maxlen=self.LONG_MA + 1)
+        self.short_sum = 0.0
+        self.long_sum = 0.0
+        self.volumes: Deque[float] = deque(maxlen=self.VOLUME_WINDOW)
+        self.volume_sum = 0.0
+        self.last_ms: Optional[int] = None  # Open time of the last closed bar
+        self._bar_ms: Optional[int] = None  # Bar the raised alerts belong to
+        self._raised: Set[Tuple[str, bool]] = set()
+
+    def _price_alert(self, close: float) -> Optional[MarketAlert]:
+        """1. Unusual price movement against the previous close"""
+        if not self.closes or not self.closes[-1]:
+            return None
+        recent_change = (close - self.closes[-1]) / self.closes[-1] * 100
+        if abs(recent_change) <= 5:
+            return None
+        return MarketAlert(
+            type="VOLATILITY",
+            severity="WARNING",
+            message=f"Unusual price movement: {recent_change:+.1f}% in last period",
+            should_pause=abs(recent_change) > 10
+        )
+
+    def _volume_alert(self, volume: float, avg_volume: float) -> Optional[MarketAlert]:
+        """2. Volume spike against the rolling baseline (whale activity indicator)"""
+        if volume <= avg_volume * 3:
+            return None
+        return MarketAlert(
+            type="WHALE",
+            severity="WARNING",
+            message="🐋 Unusual volume detected! Possible whale activity.",
+            should_pause=True
+        )
+
+    def _dedupe(self, bar_ms: int, alerts: List[Optional[MarketAlert]]) -> List[MarketAlert]:
+        """
+        Each alert once per bar. A volatility warning that later crosses
+        the pause threshold is raised again, since it now pauses trading.
+        """
+        if bar_ms != self._bar_ms:
+            self._bar_ms = bar_ms
+            self._raised = set()
+
+        fresh = []
+        for alert in alerts:
+            if alert is None:
+                continue
+            key = (alert.type, alert.should_pause)
+            if key not in self._raised:
+                self._raised.add(key)
+                fresh.append(alert)
+        return fresh
+
+    def check(self, bar_ms: int, close: float, volume: Optional[float] = None) -> List[MarketAlert]:
+        """
+        Spikes on the bar still in progress (the rolling state is untouched).
+        Volume is only known from candles; ticks pass None.
+        """
+        if self.last_ms is not None and bar_ms <= self.last_ms:
+            return []
+
+        alerts = [self._price_alert(close)]
+        if volume is not None and volume > 0:
+            # The baseline the bar will be judged against once it closes
+            full = len(self.volumes) == self.volumes.maxlen
+            total = self.volume_sum - (self.volumes[0] if full else 0.0) + volume
+            alerts.append(self._volume_alert(volume, total / (len(self.volumes) + (0 if full else 1))))
+        return self._dedupe(bar_ms, alerts)
+
+    def update(self, candle: PriceData) -> List[MarketAlert]:
+        """Fold in a closed candle and return any alerts it triggers (not already raised live)"""
+        bar_ms = round(candle.timestamp.timestamp() * 1000)
+        alerts = []
+        closes = self.closes
+        prev_short = self.short_sum / self.SHORT_MA
+        prev_long = self.long_sum / self.LONG_MA
+        had_long = len(closes) >= self.LONG_MA
+
+        alerts.append(self._price_alert(candle.close))
+        self.last_ms = bar_ms
+
+        # Roll the moving-average windows
+        closes.append(candle.close)
+        self.short_sum += candle.close
+        self.long_sum += candle.close
+        if len(closes) > self.SHORT_MA:
+            self.short_sum -= closes[-self.SHORT_MA - 1]
+        if len(closes) > self.LONG_MA:
+            self.long_sum -= closes[-self.LONG_MA - 1]
+
+        # Fold the volume into the rolling baseline
+        if candle.volume > 0:
+            if len(self.volumes) == self.volumes.maxlen:
+                self.volume_sum -= self.volumes[0]
+            self.volumes.append(candle.volume)
+            self.volume_sum += candle.volume
+            alerts.append(self._volume_alert(candle.volume, self.volume_sum / len(self.volumes)))
+
+        # 3. Trend reversal detection (golden cross / death cross)
+        if had_long:
+            short_ma = self.short_sum / self.SHORT_MA
+            long_ma = self.long_sum / self.LONG_MA
+            if prev_short < prev_long and short_ma > long_ma:
+                alerts.append(MarketAlert(
+                    type="TREND_REVERSAL",
+                    severity="INFO",
+                    message="📈 Bullish crossover detected!",
+                    should_pause=False
+                ))
+            elif prev_short > prev_long and short_ma < long_ma:
+                alerts.append(MarketAlert(
+                    type="TREND_REVERSAL",
+                    severity="DANGER",
+                    message="📉 Bearish crossover detected! Consider pausing buys.",
+                    should_pause=True
+                ))
+
+        return self._dedupe(bar_ms, alerts)
+
+
+class AnomalyMonitor:
+    """
+    Watches the candle aggregator's live feed and the trade streams.
+    Keeps a bounded alert history per symbol for the REST endpoint.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.interval = settings.ANOMALY_INTERVAL
+        self.interval_ms = INTERVAL_MS[self.interval]
+        self.history_size = settings.ALERT_HISTORY_SIZE
+        self._states: Dict[str, AnomalyState] = {}
+        self._sources: Dict[str, SymbolCandles] = {}
+        self._history: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._broadcast = None  # async (symbol, data) -> None
+        candle_aggregator.add_listener(self.on_bar)
+        candle_aggregator.add_live_listener(self.on_live)
+        trade_streams.add_listener(self.on_tick)
+
+    def set_broadcaster(self, broadcast):
+        """Set the coroutine used to push alerts to clients"""
+        self._broadcast = broadcast
+
+    async def watch(self, symbol: str):
+        """
+        Start live monitoring for a symbol (BTC, ETH, ...).
+        Primes the rolling state from already-closed bars.
+        """
+        symbol = symbol.upper()
+        source = await candle_aggregator.track(f"{symbol}USDT")
+        if self._sources.get(symbol) is source:
+            return
+
+        state = AnomalyState()
+        for bar in source.closed_prices(self.interval):
+            state.update(bar)
+        self._states[symbol] = state
+        self._sources[symbol] = source
+
+    def recent(self, symbol: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent alerts first"""
+        history = list(self._history.get(symbol.upper(), ()))
+        return history[:limit] if limit else history
+
+    def _state(self, pair: str) -> Optional[AnomalyState]:
+        if not pair.endswith("USDT"):
+            return None
+        return self._states.get(pair[:-len("USDT")])
+
+    def on_bar(self, pair: str, interval: str, bar: PriceData):
+        """Candle aggregator listener: a bar closed"""
+        state = self._state(pair)
+        if interval != self.interval or state is None:
+            return
+        self._emit(pair[:-len("USDT")], bar.timestamp, state.update(bar), closed=True)
+
+    def on_live(self, pair: str, source: SymbolCandles):
+        """Candle aggregator listener: new base candles, the bar is still in progress"""
+        state = self._state(pair)
+        if state is None:
+            return
+        bars = source.bars(self.interval, 1)
+        if bars:
+            bar_ms, close, volume = bars[-1][0], bars[-1][4], bars[-1][5]
+            self._check(pair[:-len("USDT")], state, bar_ms, close, volume)
+
+    def on_tick(self, pair: str, time_ms: int, price: float):
+        """Trade stream listener: every trade price as it happens"""
+        state = self._state(pair)
+        if state is None or time_ms is None:
+            return
+        self._check(pair[:-len("USDT")], state, time_ms - time_ms % self.interval_ms, price)
+
+    def _check(self, symbol: str, state: AnomalyState, bar_ms: int, close: float, volume: Optional[float] = None):
+        # Only the bar right after the last closed one (not before the close has been rolled up)
+        if state.last_ms is None or bar_ms != state.last_ms + self.interval_ms:
+            return
+        self._emit(symbol, datetime.fromtimestamp(bar_ms / 1000), state.check(bar_ms, close, volume), closed=False)
+
+    def _emit(self, symbol: str, bar_time: datetime, alerts: List[MarketAlert], closed: bool):
+        for alert in alerts:
+            event = {
+                "event": "alert",
+                "symbol": symbol,
+                "interval": self.interval,
+                "timestamp": bar_time.isoformat(),
+                "bar_closed": closed,
+                "alert": alert.model_dump()
+            }
+            history = self._history.setdefault(symbol, deque(maxlen=self.history_size))
+            history.appendleft(event)
+
+            if self._broadcast is not None:
+                asyncio.get_running_loop().create_task(self._broadcast(symbol, event))
+
+
+# Global instance
+anomaly_monitor = AnomalyMonitor()
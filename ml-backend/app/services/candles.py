@@ -0,0 +1,340 @@
+"""
+Multi-timeframe Candle Aggregator
+Keeps ONE base (1m) stream per symbol and rolls it up in memory
+into 5m, 15m, 1h, 4h and 1d bars (stored compressed, see timeseries.py)
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..config import get_settings
+from ..providers.base import PriceData
+from ..providers.binance import BinanceProvider
+from ..providers.replay import market_provider
+from ..providers.scheduler import request_priority, Priority
+from .timeseries import CompressedSeries
+
+
+BASE_INTERVAL = "1m"
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+}
+
+# Tiers seeded from upstream once; every other tier is rolled up from its source
+SEED_INTERVALS = ("1m", "1h", "1d")
+ROLLUP_SOURCE = {"5m": "1m", "15m": "1m", "4h": "1h"}
+
+DAY_MS = INTERVAL_MS["1d"]
+
+
+def _to_bar(candle: PriceData) -> list:
+    """PriceData -> [open_ms, open, high, low, close, volume]"""
+    return [
+        int(candle.timestamp.timestamp() * 1000),
+        candle.open, candle.high, candle.low, candle.close, candle.volume
+    ]
+
+
+def _to_price(bar: list) -> PriceData:
+    """[open_ms, open, high, low, close, volume] -> PriceData"""
+    return PriceData(
+        timestamp=datetime.fromtimestamp(bar[0] / 1000),
+        open=bar[1], high=bar[2], low=bar[3], close=bar[4], volume=bar[5]
+    )
+
+
+def _merge(bar: list, candle: list):
+    """Fold a finer candle into a bar in place"""
+    bar[2] = max(bar[2], candle[2])
+    bar[3] = min(bar[3], candle[3])
+    bar[4] = candle[4]
+    bar[5] += candle[5]
+
+
+class CandleSeries:
+    """Bars of one interval; the last bar is the one still in progress"""
+
+    def __init__(self, interval: str, max_bars: int, chunk_size: int = 256):
+        self.interval = interval
+        self.interval_ms = INTERVAL_MS[interval]
+        self.store = CompressedSeries(chunk_size, max_rows=max_bars)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def last(self) -> Optional[list]:
+        return self.store.last()
+
+    def replace_last(self, bar: list):
+        self.store.replace_last(bar)
+
+    def extend(self, bars: List[list]):
+        self.store.extend(bars)
+
+    def tail(self, n: Optional[int] = None) -> List[list]:
+        """Last `n` bars (all when None) as [open_ms, o, h, l, c, v] lists"""
+        return [[int(r[0]), *r[1:]] for r in self.store.tail(n).tolist()]
+
+    def add(self, candle: list):
+        """Roll a finer candle into this series"""
+        bucket = candle[0] - candle[0] % self.interval_ms
+        last = self.store.last()
+
+        if last is not None and bucket == last[0]:
+            _merge(last, candle)
+            self.store.replace_last(last)
+        elif last is None or bucket > last[0]:
+            self.store.append([bucket, candle[1], candle[2], candle[3], candle[4], candle[5]])
+
+    def completes(self, candle: list, candle_ms: int) -> bool:
+        """Check if a finer candle is the last one of its bar"""
+        return (candle[0] + candle_ms) % self.interval_ms == 0
+
+
+class SymbolCandles:
+    """All timeframes for one symbol"""
+
+    def __init__(self, symbol: str, max_bars: int, chunk_size: int = 256):
+        self.symbol = symbol
+        self.series = {iv: CandleSeries(iv, max_bars, chunk_size) for iv in INTERVAL_MS}
+        self.cursor = 0  # Open time (ms) of the next base candle to roll up
+        self.live: Optional[list] = None  # In-progress base candle
+        self.last_access = time.monotonic()
+
+    def bars(self, interval: str, limit: Optional[int] = None) -> List[list]:
+        """Bars for an interval, with the live base candle folded in"""
+        bars = self.series[interval].tail(limit)
+        live = self.live
+        if live is None or live[0] < self.cursor:
+            return bars
+
+        interval_ms = INTERVAL_MS[interval]
+        bucket = live[0] - live[0] % interval_ms
+        if bars and bars[-1][0] == bucket:
+            _merge(bars[-1], live)
+        elif not bars or bucket > bars[-1][0]:
+            bars.append([bucket, live[1], live[2], live[3], live[4], live[5]])
+        return bars
+
+    def closed_rows(self, interval: str, limit: Optional[int] = None) -> np.ndarray:
+        """
+        Fully closed bars of an interval as a (bars x 6) array,
+        decoded straight from the compressed store.
+        """
+        in_progress = self.cursor % INTERVAL_MS[interval] != 0
+        store = self.series[interval].store
+        rows = store.tail(limit + 1 if limit is not None and in_progress else limit)
+        if len(rows) and in_progress:
+            rows = rows[:-1]  # Last bar is still in progress
+        return rows
+
+    def closed_prices(self, interval: str, limit: Optional[int] = None) -> List[PriceData]:
+        """Only the bars of an interval that have fully closed"""
+        return [_to_price([int(r[0]), *r[1:]]) for r in self.closed_rows(interval, limit).tolist()]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {interval: series.store.stats() for interval, series in self.series.items()}
+
+
+class CandleAggregator:
+    """
+    Serves candles for every supported interval from in-memory rollups.
+    A background task per symbol polls only new base candles.
+    """
+
+    def __init__(self, provider: BinanceProvider):
+        settings = get_settings()
+        self.provider = provider
+        self.poll_seconds = settings.CANDLE_POLL_SECONDS
+        self.max_bars = settings.CANDLE_MAX_BARS
+        self.retain_bars = settings.CANDLE_RETAIN_BARS
+        self.chunk_size = settings.CANDLE_CHUNK_SIZE
+        self.idle_seconds = settings.CANDLE_IDLE_SECONDS
+        self._symbols: Dict[str, SymbolCandles] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._seed_locks: Dict[str, asyncio.Lock] = {}
+        self._listeners: List[Callable[[str, str, PriceData], None]] = []
+        self._live_listeners: List[Callable[[str, SymbolCandles], None]] = []
+
+    @staticmethod
+    def supports(interval: str) -> bool:
+        """Check if an interval can be served from rollups"""
+        return interval in INTERVAL_MS
+
+    def add_listener(self, callback: Callable[[str, str, PriceData], None]):
+        """Call callback(symbol, interval, bar) whenever a bar closes"""
+        self._listeners.append(callback)
+
+    def add_live_listener(self, callback: Callable[[str, SymbolCandles], None]):
+        """Call callback(symbol, state) after every poll, while bars are still in progress"""
+        self._live_listeners.append(callback)
+
+    async def get_historical_prices(
+        self,
+        symbol: str,
+        days: int = 365,
+        interval: str = "1d"
+    ) -> List[PriceData]:
+        """
+        Get OHLCV bars covering `days` (same signature as DataProvider).
+        Symbol format: BTCUSDT, ETHUSDT, etc.
+        """
+        if not self.supports(interval):
+            return await self.provider.get_historical_prices(symbol, days=days, interval=interval)
+
+        state = await self.track(symbol)
+        limit = max(1, days * DAY_MS // INTERVAL_MS[interval])
+        return [_to_price(b) for b in state.bars(interval, limit)[-limit:]]
+
+    async def track(self, symbol: str) -> SymbolCandles:
+        """Start aggregating a symbol (seeding it on first use)"""
+        symbol = symbol.upper()
+        state = self._symbols.get(symbol)
+        if state is None:
+            lock = self._seed_locks.setdefault(symbol, asyncio.Lock())
+            async with lock:
+                state = self._symbols.get(symbol)
+                if state is None:
+                    state = await self._seed(symbol)
+                    self._symbols[symbol] = state
+                    self._tasks[symbol] = asyncio.create_task(self._poll_loop(symbol))
+
+        state.last_access = time.monotonic()
+        return state
+
+    def peek(self, symbol: str) -> Optional[SymbolCandles]:
+        """Candles of a symbol that is already tracked (never seeds)"""
+        return self._symbols.get(symbol.upper())
+
+    def tracked_symbols(self) -> List[str]:
+        """Symbols with a running base stream"""
+        return list(self._symbols)
+
+    def stats(self) -> Dict[str, Any]:
+        """Candles held in memory and what they cost"""
+        rows = compressed = total = 0
+        for state in list(self._symbols.values()):
+            for series in state.stats().values():
+                rows += series["rows"]
+                compressed += series["compressed_bytes"]
+                total += series["compressed_bytes"] + series["head_bytes"]
+        return {
+            "symbols": len(self._symbols),
+            "candles": rows,
+            "bytes": total,
+            "compressed_bytes": compressed,
+            "bytes_per_candle": round(total / rows, 2) if rows else 0.0
+        }
+
+    async def stop(self):
+        """Cancel all background streams"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._symbols.clear()
+
+    async def _seed(self, symbol: str) -> SymbolCandles:
+        """Load initial history: base, hourly and daily tiers in parallel"""
+        seeded = await asyncio.gather(*(
+            self.provider.get_klines(symbol, interval=iv, limit=self.max_bars)
+            for iv in SEED_INTERVALS
+        ))
+        if not seeded[0]:
+            raise ValueError(f"No candle data for {symbol}")
+
+        state = SymbolCandles(symbol, self.retain_bars, self.chunk_size)
+        for interval, candles in zip(SEED_INTERVALS, seeded):
+            state.series[interval].extend([_to_bar(c) for c in candles])
+        for interval, source in ROLLUP_SOURCE.items():
+            series = state.series[interval]
+            for bar in state.series[source].tail():
+                series.add(bar)
+
+        # Upstream bars already include the current minute
+        live = state.series[BASE_INTERVAL].last()
+        state.cursor = live[0] + INTERVAL_MS[BASE_INTERVAL]
+        return state
+
+    async def _poll_loop(self, symbol: str):
+        """Fetch new base candles until the symbol goes idle"""
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            state = self._symbols.get(symbol)
+            if state is None:
+                return
+            if time.monotonic() - state.last_access > self.idle_seconds:
+                self._symbols.pop(symbol, None)
+                self._tasks.pop(symbol, None)
+                return
+
+            try:
+                await self._poll(state)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Candle poll error for {symbol}: {e}")
+
+    async def _poll(self, state: SymbolCandles):
+        """Roll up base candles that closed since the last poll"""
+        base = state.series[BASE_INTERVAL]
+        last = base.last()
+        since = last[0] if last else state.cursor
+        candles = await self.provider.get_klines(
+            state.symbol,
+            interval=BASE_INTERVAL,
+            start_time=datetime.fromtimestamp(since / 1000)
+        )
+
+        now_ms = int(time.time() * 1000)
+        base_ms = INTERVAL_MS[BASE_INTERVAL]
+        for candle in map(_to_bar, candles):
+            if candle[0] + base_ms > now_ms:
+                state.live = candle  # Still in progress
+                continue
+            if candle[0] < state.cursor:
+                # Replace the partial base candle seen at seed time
+                if last is not None and last[0] == candle[0]:
+                    base.replace_last(candle)
+                continue
+
+            self._ingest(state, candle)
+
+        for callback in self._live_listeners:
+            try:
+                callback(state.symbol, state)
+            except Exception as e:
+                print(f"Candle listener error: {e}")
+
+    def _ingest(self, state: SymbolCandles, candle: list):
+        """Roll one closed base candle into every tier"""
+        state.cursor = candle[0] + INTERVAL_MS[BASE_INTERVAL]
+        if state.live is not None and state.live[0] < state.cursor:
+            state.live = None
+
+        for interval, series in state.series.items():
+            series.add(list(candle))
+            if series.completes(candle, INTERVAL_MS[BASE_INTERVAL]):
+                self._notify(state.symbol, interval, series.last())
+
+    def _notify(self, symbol: str, interval: str, bar: list):
+        """Tell listeners a bar has closed"""
+        for callback in self._listeners:
+            try:
+                callback(symbol, interval, _to_price(bar))
+            except Exception as e:
+                print(f"Candle listener error: {e}")
+
+
+# Global instance
+candle_aggregator = CandleAggregator(market_provider())
@@ -0,0 +1,287 @@
+"""
+Rolling Correlation Engine
+Keeps a window of log returns for the top-N symbols in one array and
+updates their covariance/correlation matrix as each bar closes.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config import get_settings
+from ..providers.replay import market_provider
+from ..providers.scheduler import request_priority, Priority
+from .candles import INTERVAL_MS
+
+
+class ReturnWindow:
+    """
+    Fixed-size ring of return rows (one column per symbol) with running
+    sums and cross products, so adding a bar is O(N^2) instead of a full
+    O(window * N^2) recompute.
+    """
+
+    def __init__(self, symbols: List[str], window: int):
+        self.symbols = symbols
+        self.index = {s: i for i, s in enumerate(symbols)}
+        self.window = window
+        n = len(symbols)
+        self._rows = np.zeros((window, n))
+        self._count = 0
+        self._pos = 0
+        self._sum = np.zeros(n)
+        self._cross = np.zeros((n, n))
+        self._since_rebuild = 0
+        self._correlation: Optional[np.ndarray] = None
+        self.updated_at: Optional[datetime] = None
+
+    @property
+    def bars(self) -> int:
+        return self._count
+
+    def push(self, returns: np.ndarray):
+        """Add one row of returns, dropping the oldest once full"""
+        if self._count == self.window:
+            old = self._rows[self._pos]
+            self._sum -= old
+            self._cross -= np.outer(old, old)
+        else:
+            self._count += 1
+
+        self._rows[self._pos] = returns
+        self._sum += returns
+        self._cross += np.outer(returns, returns)
+        self._pos = (self._pos + 1) % self.window
+
+        # Rebuild from the ring now and then so float error can't accumulate
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+        self._correlation = None
+        self.updated_at = datetime.now()
+
+    def load(self, rows: np.ndarray):
+        """Replace the window with a (bars x symbols) block of returns"""
+        rows = rows[-self.window:]
+        self._rows[:] = 0
+        self._rows[:len(rows)] = rows
+        self._count = len(rows)
+        self._pos = len(rows) % self.window
+        self._rebuild()
+        self._correlation = None
+        self.updated_at = datetime.now()
+
+    def _rebuild(self):
+        live = self._rows[:self._count]
+        self._sum = live.sum(axis=0)
+        self._cross = live.T @ live
+        self._since_rebuild = 0
+
+    def covariance(self) -> np.ndarray:
+        n = self._count
+        if n < 2:
+            return np.full_like(self._cross, np.nan)
+        return (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+    def correlation(self) -> np.ndarray:
+        """Pearson correlation matrix (NaN where a symbol has no variance)"""
+        if self._correlation is None:
+            cov = self.covariance()
+            var = np.diag(cov)
+            # Running sums leave rounding residue where the variance should be 0
+            flat = ~(var > 1e-12 * np.diag(self._cross) / max(self._count, 1))
+            std = np.sqrt(np.clip(var, 0, None))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = cov / np.outer(std, std)
+            corr[flat, :] = np.nan
+            corr[:, flat] = np.nan
+            self._correlation = np.clip(corr, -1, 1)
+        return self._correlation
+
+
+class CorrelationEngine:
+    """
+    Follows the most liquid USDT pairs with closed bars of one interval,
+    fetched straight from the provider once per bar (no 1m candle streams
+    are kept up for this), and folds each new bar into a shared
+    ReturnWindow. The universe is re-ranked by volume every bar.
+    """
+
+    def __init__(self, provider):
+        settings = get_settings()
+        self.provider = provider
+        self.interval = settings.CORRELATION_INTERVAL
+        self.interval_ms = INTERVAL_MS[self.interval]
+        self.window_size = settings.CORRELATION_WINDOW
+        self.max_symbols = settings.CORRELATION_MAX_SYMBOLS
+        self.concurrency = settings.CORRELATION_CONCURRENCY
+        self.refresh_seconds = settings.CORRELATION_REFRESH_SECONDS
+        self.window: Optional[ReturnWindow] = None
+        self._history: Dict[str, np.ndarray] = {}  # Symbol -> (bars x 2) open time, close
+        self._last_row_ms = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def ready(self) -> bool:
+        return self.window is not None and self.window.bars >= 2
+
+    def start(self):
+        """Start tracking the universe in the background"""
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _now_ms(self) -> int:
+        # Replays run on their own clock
+        return getattr(self.provider, "now_ms", None) or int(time.time() * 1000)
+
+    def _last_closed_ms(self) -> int:
+        """Open time of the newest bar that has closed"""
+        return self._now_ms() // self.interval_ms * self.interval_ms - self.interval_ms
+
+    async def _loop(self):
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            # Upstream calls only once a new bar has closed
+            if self.window is None or self._last_closed_ms() > self._last_row_ms:
+                try:
+                    await self.refresh()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Correlation refresh error: {e}")
+            await asyncio.sleep(self.refresh_seconds)
+
+    async def _rank(self) -> List[str]:
+        """The most liquid USDT pairs right now"""
+        tickers = [
+            t for t in await self.provider.get_24h_tickers()
+            if t["symbol"].endswith("USDT") and float(t["lastPrice"]) > 0
+        ]
+        tickers.sort(key=lambda t: float(t["quoteVolume"]), reverse=True)
+        return [t["symbol"] for t in tickers[:self.max_symbols]]
+
+    async def _fetch(self, pairs: List[str], end_ms: int) -> Dict[str, np.ndarray]:
+        """
+        Closed bars up to end_ms for each pair: only the missing ones for
+        pairs already followed, a full window for new ones.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        keep = self.window_size + 1
+
+        async def closed(pair: str) -> np.ndarray:
+            symbol = pair[:-len("USDT")]
+            known = self._history.get(symbol)
+            missing = keep if known is None or not len(known) else (end_ms - int(known[-1, 0])) // self.interval_ms
+            if missing <= 0:
+                return known
+            async with semaphore:
+                try:
+                    # One extra for the bar still in progress
+                    bars = await self.provider.get_klines(pair, interval=self.interval, limit=min(missing, keep) + 1)
+                except Exception as e:
+                    print(f"Correlation history error for {pair}: {e}")
+                    return known if known is not None else np.empty((0, 2))
+            rows = np.array([(round(b.timestamp.timestamp() * 1000), b.close) for b in bars]).reshape(-1, 2)
+            rows = rows[rows[:, 0] <= end_ms]
+            if known is not None and len(known):
+                rows = np.vstack([known, rows[rows[:, 0] > known[-1, 0]]])
+            return rows[-keep:]
+
+        histories = await asyncio.gather(*(closed(p) for p in pairs))
+        return {p[:-len("USDT")]: h for p, h in zip(pairs, histories) if len(h)}
+
+    async def refresh(self):
+        """Re-rank the universe and fold in the bars that closed since the last refresh"""
+        end_ms = self._last_closed_ms()
+        histories = await self._fetch(await self._rank(), end_ms)
+        self._history = histories
+        # Columns in symbol order, so a volume reshuffle doesn't force a rebuild
+        usable = sorted(((s, h) for s, h in histories.items() if len(h) >= 2), key=lambda u: u[0])
+        if not usable:
+            raise RuntimeError("No symbols with enough history")
+
+        # Align on a common bar grid, carrying the last close over gaps
+        grid = end_ms - np.arange(self.window_size, -1, -1) * self.interval_ms
+        closes = np.full((len(grid), len(usable)), np.nan)
+        for j, (_, history) in enumerate(usable):
+            idx = np.searchsorted(history[:, 0], grid, side="right") - 1
+            has = idx >= 0
+            closes[has, j] = history[idx[has], 1]
+
+        symbols = [s for s, _ in usable]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.nan_to_num(np.diff(np.log(closes), axis=0), nan=0.0, posinf=0.0, neginf=0.0)
+
+        window = self.window
+        new_rows = int((grid > self._last_row_ms).sum())
+        if window is not None and window.symbols == symbols and new_rows < len(returns):
+            # Same universe: just the new bars
+            for row in returns[len(returns) - new_rows:]:
+                window.push(row)
+        else:
+            window = ReturnWindow(symbols, self.window_size)
+            window.load(returns)
+            print(f"📈 Correlations: {len(window.symbols)} symbols, {window.bars} x {self.interval} bars")
+
+        self._last_row_ms = int(grid[-1])
+        self.window = window
+
+    def _value(self, x: float) -> Optional[float]:
+        return None if np.isnan(x) else round(float(x), 4)
+
+    def matrix(self, symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Correlation matrix for some (default: all) tracked symbols"""
+        window = self.window
+        symbols = [s for s in (symbols or window.symbols) if s in window.index]
+        idx = [window.index[s] for s in symbols]
+        corr = window.correlation()[np.ix_(idx, idx)]
+        return {
+            **self.info(),
+            "symbols": symbols,
+            "matrix": [[self._value(x) for x in row] for row in corr]
+        }
+
+    def top_correlated(self, symbol: str, k: int = 10, least: bool = False) -> List[Dict[str, Any]]:
+        """Symbols moving most (or least) with `symbol`, with their beta to it"""
+        window = self.window
+        i = window.index[symbol]
+        corr = window.correlation()[i]
+        cov = window.covariance()
+        variance = cov[i, i]
+
+        candidates = [j for j in range(len(window.symbols)) if j != i and not np.isnan(corr[j])]
+        candidates.sort(key=lambda j: corr[j], reverse=not least)
+        return [
+            {
+                "symbol": window.symbols[j],
+                "correlation": self._value(corr[j]),
+                "beta": self._value(cov[i, j] / variance) if variance > 0 else None
+            }
+            for j in candidates[:k]
+        ]
+
+    def info(self) -> Dict[str, Any]:
+        window = self.window
+        return {
+            "interval": self.interval,
+            "window": self.window_size,
+            "bars": window.bars if window else 0,
+            "symbols_tracked": len(window.symbols) if window else 0,
+            "updated_at": window.updated_at.isoformat() if window and window.updated_at else None
+        }
+
+
+# Global instance
+correlation_engine = CorrelationEngine(market_provider())
@@ -0,0 +1,186 @@
+"""
+Candle History Export
+Streams OHLCV bars for any range as CSV, NDJSON or Arrow IPC without
+building the range in memory: bars older than the in-memory store are
+paged from Binance, the rest are decoded from the store one chunk at a
+time, and each batch is encoded (and gzip-compressed) as it goes out.
+"""
+import io
+import json
+import time
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+import numpy as np
+
+# pyarrow import with fallback (only needed for Arrow IPC exports)
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from ..config import get_settings
+from ..providers.scheduler import request_deadline, request_priority, Priority
+from .candles import candle_aggregator, INTERVAL_MS
+from .timeseries import COLUMNS
+
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FIELDS = ("open_time",) + COLUMNS[1:]  # open_time in ms, like Binance klines
+PAGE_SIZE = 1000  # Binance's klines limit
+
+
+async def candle_batches(pair: str, interval: str, start_ms: int, end_ms: int) -> AsyncIterator[np.ndarray]:
+    """
+    Closed bars with start_ms <= open time <= end_ms, oldest first, as
+    (bars x 6) arrays. Upstream pages cover what the local store doesn't.
+    """
+    # Bulk paging must not starve interactive requests of upstream quota
+    request_priority.set(Priority.BACKGROUND)
+    step = INTERVAL_MS[interval]
+    end_ms = min(end_ms, int(time.time() * 1000) - step)
+
+    state = candle_aggregator.peek(pair)
+    local_from = None
+    if state is not None and state.series[interval].store.start_ms is not None:
+        # A rolled-up tier's first bar can miss base candles from before the seed
+        local_from = state.series[interval].store.start_ms + step
+    upstream_to = end_ms if local_from is None else min(end_ms, local_from - step)
+
+    cursor = start_ms
+    while cursor <= upstream_to:
+        page = await candle_aggregator.provider.get_klines(
+            pair, interval=interval, limit=PAGE_SIZE,
+            start_time=datetime.fromtimestamp(cursor / 1000)
+        )
+        if not page:
+            break
+        rows = np.array([
+            (round(p.timestamp.timestamp() * 1000), p.open, p.high, p.low, p.close, p.volume) for p in page
+        ])
+        next_cursor = int(rows[-1, 0]) + step
+        rows = rows[rows[:, 0] <= upstream_to]
+        if len(rows):
+            yield rows
+        if len(page) < PAGE_SIZE or next_cursor <= cursor:
+            break
+        cursor = next_cursor
+
+    if local_from is not None:
+        series = state.series[interval].store
+        for rows in series.iter_between(max(start_ms, local_from), end_ms):
+            rows = rows[rows[:, 0] + step <= state.cursor]  # Drop the bar still in progress
+            if len(rows):
+                yield rows
+
+
+class CsvEncoder:
+    def header(self) -> bytes:
+        return (",".join(FIELDS) + "\n").encode()
+
+    def encode(self, rows: np.ndarray) -> bytes:
+        return "".join(
+            f"{int(t)},{o},{h},{l},{c},{v}\n" for t, o, h, l, c, v in rows.tolist()
+        ).encode()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class NdjsonEncoder:
+    def header(self) -> bytes:
+        return b""
+
+    def encode(self, rows: np.ndarray) -> bytes:
+        return "".join(
+            json.dumps(dict(zip(FIELDS, [int(row[0]), *row[1:]]))) + "\n" for row in rows.tolist()
+        ).encode()
+
+    def footer(self) -> bytes:
+        return b""
+
+
+class ArrowEncoder:
+    """Arrow IPC stream: the schema first, then one record batch per batch of bars"""
+
+    def __init__(self):
+        self.schema = pa.schema(
+            [("open_time", pa.timestamp("ms", tz="UTC"))] + [(name, pa.float64()) for name in FIELDS[1:]]
+        )
+        self.sink = io.BytesIO()
+        self.writer = pa.ipc.new_stream(self.sink, self.schema)
+
+    def _drain(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def header(self) -> bytes:
+        return self._drain()
+
+    def encode(self, rows: np.ndarray) -> bytes:
+        columns = [pa.array(rows[:, 0].astype(np.int64), type=pa.timestamp("ms", tz="UTC"))]
+        columns += [pa.array(rows[:, i]) for i in range(1, len(FIELDS))]
+        self.writer.write_batch(pa.record_batch(columns, schema=self.schema))
+        return self._drain()
+
+    def footer(self) -> bytes:
+        self.writer.close()
+        return self._drain()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "arrow": ArrowEncoder}
+
+
+async def open_export(
+    pair: str,
+    interval: str,
+    start_ms: int,
+    end_ms: int,
+    fmt: str,
+    compress: bool
+) -> AsyncIterator[bytes]:
+    """
+    Start an export. The first batch is fetched here, so an upstream
+    failure can still become an error response instead of an empty file.
+    """
+    batches = candle_batches(pair, interval, start_ms, end_ms)
+    try:
+        first: Optional[np.ndarray] = await batches.__anext__()
+    except StopAsyncIteration:
+        first = None
+    compressor = zlib.compressobj(get_settings().EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+    return _stream(pair, first, batches, ENCODERS[fmt](), compressor)
+
+
+async def _stream(pair: str, first, batches, encoder, compressor) -> AsyncIterator[bytes]:
+    # Once bytes flow the client decides how long to wait, not the request deadline
+    request_deadline.set(None)
+    request_priority.set(Priority.BACKGROUND)
+
+    def out(data: bytes) -> bytes:
+        if compressor is None:
+            return data
+        # Sync flush: every batch reaches the client as soon as it's encoded
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    yield out(encoder.header())
+    if first is not None:
+        yield out(encoder.encode(first))
+        try:
+            async for rows in batches:
+                yield out(encoder.encode(rows))
+        except Exception as e:
+            # Too late for an error status: end without a trailer so the truncation shows
+            print(f"Export error for {pair}: {e}")
+            raise
+
+    tail = encoder.footer()
+    yield compressor.compress(tail) + compressor.flush() if compressor else tail
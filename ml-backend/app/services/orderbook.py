@@ -0,0 +1,356 @@
+"""
+Local L2 Order Book
+Keeps a sorted, array-backed copy of each symbol's Binance depth,
+updated from the diff-depth stream with snapshot resync, and answers
+spread / depth / slippage questions in microseconds.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ..config import get_settings
+from ..providers.replay import market_provider
+from ..providers.scheduler import request_priority, Priority, hop_timeout, DeadlineExceeded
+
+
+class OrderBook:
+    """
+    One symbol's book. Each side is a pair of arrays sorted from the
+    touch outwards: asks by price, bids by -price.
+    """
+
+    def __init__(self, symbol: str, max_levels: int = 5000):
+        self.symbol = symbol
+        self.max_levels = max_levels
+        self.last_update_id = 0
+        self.updated_at = 0.0
+        self._sides: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            "bids": (np.empty(0), np.empty(0)),
+            "asks": (np.empty(0), np.empty(0)),
+        }
+        self._cumulative: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id > 0
+
+    @staticmethod
+    def _levels(levels: list, side: str) -> Tuple[np.ndarray, np.ndarray]:
+        """[[price, qty], ...] strings -> (sort keys, quantities)"""
+        if not levels:
+            return np.empty(0), np.empty(0)
+        arr = np.asarray(levels, dtype=np.float64)
+        keys = -arr[:, 0] if side == "bids" else arr[:, 0]
+        return keys, arr[:, 1]
+
+    def load_snapshot(self, snapshot: Dict[str, Any]):
+        """Replace the book with a REST depth snapshot"""
+        for side in ("bids", "asks"):
+            keys, qty = self._levels(snapshot.get(side, []), side)
+            order = np.argsort(keys, kind="stable")
+            self._sides[side] = (keys[order][:self.max_levels], qty[order][:self.max_levels])
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self._touched()
+
+    def apply_diff(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply one diff-depth event. Returns False when an update was
+        missed and the book must be resynced from a snapshot.
+        """
+        first, final = int(event["U"]), int(event["u"])
+        if final <= self.last_update_id:
+            return True  # Already covered by the snapshot
+        if first > self.last_update_id + 1:
+            return False
+
+        for side, field in (("bids", "b"), ("asks", "a")):
+            if event.get(field):
+                self._sides[side] = self._merge(*self._sides[side], *self._levels(event[field], side))
+        self.last_update_id = final
+        self._touched()
+        return True
+
+    def _merge(
+        self,
+        keys: np.ndarray,
+        qty: np.ndarray,
+        new_keys: np.ndarray,
+        new_qty: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Upsert levels (qty 0 removes) keeping the side sorted"""
+        order = np.argsort(new_keys, kind="stable")
+        new_keys, new_qty = new_keys[order], new_qty[order]
+        last = np.r_[new_keys[1:] != new_keys[:-1], True]  # Last update per price wins
+        new_keys, new_qty = new_keys[last], new_qty[last]
+
+        # Existing levels are updated in place, new ones inserted in order
+        idx = np.searchsorted(keys, new_keys)
+        exists = idx < len(keys)
+        exists[exists] = keys[idx[exists]] == new_keys[exists]
+        qty = qty.copy()
+        qty[idx[exists]] = new_qty[exists]
+
+        insert = ~exists & (new_qty > 0)
+        if insert.any():
+            keys = np.insert(keys, idx[insert], new_keys[insert])
+            qty = np.insert(qty, idx[insert], new_qty[insert])
+
+        live = qty > 0
+        if not live.all():
+            keys, qty = keys[live], qty[live]
+        return keys[:self.max_levels], qty[:self.max_levels]
+
+    def _touched(self):
+        self.updated_at = time.time()
+        self._cumulative.clear()
+
+    def _side(self, side: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(prices, cumulative qty, cumulative notional) from the touch out"""
+        cached = self._cumulative.get(side)
+        if cached is None:
+            keys, qty = self._sides[side]
+            prices = np.abs(keys)
+            cached = (prices, np.cumsum(qty), np.cumsum(prices * qty))
+            self._cumulative[side] = cached
+        return cached
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        keys = self._sides["bids"][0]
+        return float(-keys[0]) if len(keys) else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        keys = self._sides["asks"][0]
+        return float(keys[0]) if len(keys) else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        bid, ask = self.best_bid, self.best_ask
+        if bid is None or ask is None:
+            return None
+        return (bid + ask) / 2
+
+    def spread_bps(self) -> Optional[float]:
+        mid = self.mid
+        if not mid:
+            return None
+        return (self.best_ask - self.best_bid) / mid * 10_000
+
+    def depth_within(self, bps: float) -> Dict[str, float]:
+        """USD resting on each side within `bps` of the mid price"""
+        mid = self.mid
+        if not mid:
+            return {"bid_usd": 0.0, "ask_usd": 0.0}
+
+        depth = {}
+        for side, limit in (("bids", mid * (1 - bps / 10_000)), ("asks", mid * (1 + bps / 10_000))):
+            prices, _, notional = self._side(side)
+            if side == "bids":
+                n = int(np.searchsorted(-prices, -limit, side="right"))
+            else:
+                n = int(np.searchsorted(prices, limit, side="right"))
+            depth[f"{side[:-1]}_usd"] = float(notional[n - 1]) if n else 0.0
+        return depth
+
+    def slippage(self, action: str, notional_usd: float) -> Dict[str, Any]:
+        """Walk the book for a market order of `notional_usd` (BUY hits asks)"""
+        side = "asks" if action.upper() == "BUY" else "bids"
+        prices, cum_qty, cum_notional = self._side(side)
+        mid = self.mid
+        if not mid or len(prices) == 0:
+            return {"fillable": False, "fill_ratio": 0.0, "slippage_bps": None, "worst_price": None}
+
+        i = int(np.searchsorted(cum_notional, notional_usd, side="left"))
+        if i >= len(prices):
+            # Not enough visible liquidity: report what would fill
+            filled_usd, filled_qty, worst = cum_notional[-1], cum_qty[-1], prices[-1]
+        else:
+            before_usd = cum_notional[i - 1] if i else 0.0
+            before_qty = cum_qty[i - 1] if i else 0.0
+            filled_usd = notional_usd
+            filled_qty = before_qty + (notional_usd - before_usd) / prices[i]
+            worst = prices[i]
+
+        average = filled_usd / filled_qty
+        slippage = (average - mid) / mid if side == "asks" else (mid - average) / mid
+        return {
+            "fillable": i < len(prices),
+            "fill_ratio": round(float(min(1.0, filled_usd / notional_usd)), 4) if notional_usd > 0 else 1.0,
+            "average_price": float(average),
+            "worst_price": float(worst),
+            "slippage_bps": round(float(slippage * 10_000), 2),
+        }
+
+    def liquidity(self, action: str, notional_usd: float, depth_bps: float = 50) -> Dict[str, Any]:
+        """Spread, nearby depth and slippage for one order"""
+        spread = self.spread_bps()
+        return {
+            "symbol": self.symbol,
+            "best_bid": self.best_bid,
+            "best_ask": self.best_ask,
+            "spread_bps": round(spread, 2) if spread is not None else None,
+            "depth_bps": depth_bps,
+            **self.depth_within(depth_bps),
+            "order_usd": notional_usd,
+            **self.slippage(action, notional_usd),
+            "book_age_seconds": round(time.time() - self.updated_at, 1),
+        }
+
+
+class OrderBookMaintainer:
+    """
+    Maintains local books for symbols that are being asked about.
+    Each book follows the diff-depth WebSocket stream (REST snapshots
+    if the stream is unavailable) and is dropped once idle, or when
+    max_symbols are tracked and it is the least recently used.
+    """
+
+    def __init__(self, provider):
+        settings = get_settings()
+        self.provider = provider
+        self.ws_url = settings.BINANCE_WS_URL
+        self.snapshot_limit = settings.ORDER_BOOK_SNAPSHOT_LIMIT
+        self.max_levels = settings.ORDER_BOOK_MAX_LEVELS
+        self.poll_seconds = settings.ORDER_BOOK_POLL_SECONDS
+        self.idle_seconds = settings.ORDER_BOOK_IDLE_SECONDS
+        self.max_symbols = settings.ORDER_BOOK_MAX_SYMBOLS
+        self.depth_bps = settings.LIQUIDITY_DEPTH_BPS
+        self._books: Dict[str, OrderBook] = {}
+        self._ready: Dict[str, asyncio.Event] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last_access: Dict[str, float] = {}
+
+    @property
+    def available(self) -> bool:
+        """Replayed data has no order books"""
+        return hasattr(self.provider, "get_order_book")
+
+    async def track(self, symbol: str, timeout: float = 5.0) -> Optional[OrderBook]:
+        """Start maintaining a symbol's book and wait for it to sync"""
+        if not self.available:
+            return None
+        symbol = symbol.upper()
+        self._last_access[symbol] = time.monotonic()
+        if symbol not in self._tasks or self._tasks[symbol].done():
+            self._make_room()
+            self._books[symbol] = OrderBook(symbol, self.max_levels)
+            self._ready[symbol] = asyncio.Event()
+            self._tasks[symbol] = asyncio.create_task(self._run(symbol))
+
+        try:
+            await asyncio.wait_for(self._ready[symbol].wait(), hop_timeout(timeout))
+        except (asyncio.TimeoutError, DeadlineExceeded):
+            return None
+        # Ready is also set when a sync fails, and the book may be gone by now
+        return self.get(symbol)
+
+    def _make_room(self):
+        """Drop the least recently used books until a new one fits"""
+        while len(self._tasks) >= self.max_symbols:
+            symbol = min(self._tasks, key=lambda s: self._last_access.get(s, 0))
+            self._tasks.pop(symbol).cancel()
+            self._books.pop(symbol, None)
+            self._last_access.pop(symbol, None)
+            ready = self._ready.pop(symbol, None)
+            if ready is not None:
+                ready.set()
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        """Synced book for a symbol, if it is being maintained"""
+        book = self._books.get(symbol.upper())
+        return book if book is not None and book.synced else None
+
+    async def liquidity(self, symbol: str, action: str, notional_usd: float) -> Optional[Dict[str, Any]]:
+        """Liquidity metrics for an order (None if no book is available)"""
+        try:
+            book = await self.track(symbol)
+        except Exception as e:
+            print(f"Order book error for {symbol}: {e}")
+            return None
+        if book is None:
+            return None
+        return book.liquidity(action, notional_usd, self.depth_bps)
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._books.clear()
+
+    def _idle(self, symbol: str) -> bool:
+        return time.monotonic() - self._last_access.get(symbol, 0) > self.idle_seconds
+
+    async def _resync(self, book: OrderBook):
+        snapshot = await self.provider.get_order_book(book.symbol, limit=self.snapshot_limit)
+        book.load_snapshot(snapshot)
+        self._wake(book.symbol)
+
+    def _wake(self, symbol: str):
+        """Release everyone waiting for a symbol's book, synced or not"""
+        ready = self._ready.get(symbol)
+        if ready is not None:
+            ready.set()
+
+    async def _run(self, symbol: str):
+        request_priority.set(Priority.BACKGROUND)
+        book = self._books[symbol]
+        try:
+            while not self._idle(symbol):
+                try:
+                    await self._stream(book)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Order book stream error for {symbol}: {e}; polling snapshots")
+                    try:
+                        await self._resync(book)
+                    except Exception as poll_error:
+                        print(f"Order book snapshot error for {symbol}: {poll_error}")
+                        self._wake(symbol)  # Don't keep waiters for the full timeout
+                    await asyncio.sleep(self.poll_seconds)
+        finally:
+            # Idle or cancelled: free the book (unless it was evicted and replaced)
+            if self._tasks.get(symbol) is asyncio.current_task():
+                self._wake(symbol)
+                self._books.pop(symbol, None)
+                self._tasks.pop(symbol, None)
+                self._ready.pop(symbol, None)
+
+    async def _stream(self, book: OrderBook):
+        """Follow the diff-depth stream, resyncing whenever an update is missed"""
+        import websockets
+
+        url = f"{self.ws_url}/{book.symbol.lower()}@depth@100ms"
+        async with websockets.connect(url) as ws:
+            # Events buffered while the snapshot loads are replayed after it
+            queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+
+            async def reader():
+                async for message in ws:
+                    await queue.put(json.loads(message))
+
+            reader_task = asyncio.create_task(reader())
+            try:
+                await self._resync(book)
+                while not self._idle(book.symbol):
+                    if reader_task.done():
+                        reader_task.result()  # Surface the disconnect
+                        return
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        continue
+                    if not book.apply_diff(event):
+                        await self._resync(book)
+            finally:
+                reader_task.cancel()
+                await asyncio.gather(reader_task, return_exceptions=True)
+
+
+# Global instance
+order_books = OrderBookMaintainer(market_provider())
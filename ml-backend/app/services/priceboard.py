@@ -0,0 +1,384 @@
+"""
+Shared-memory Price Board
+One collector process writes the latest ticker + indicator state for
+every symbol into a fixed-layout shared-memory region; every web worker
+reads it without locks.
+
+Run the collector standalone with:  python -m app.services.priceboard
+(gunicorn.conf.py starts it automatically for multi-worker deployments)
+"""
+import asyncio
+import json
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from ..config import get_settings
+
+
+MAGIC = 0x50424F41  # "PBOA"
+RETIRED = 0  # Magic of a region whose collector has shut down
+VERSION = 2
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "<u4"),
+    ("version", "<u4"),
+    ("capacity", "<u4"),
+    ("count", "<u4"),  # Slots in use; grows append-only
+    ("epoch", "<u8"),  # Changes every time a collector creates the region
+])
+
+NAME_DTYPE = np.dtype("S20")  # Binance pair, e.g. b"BTCUSDT"
+
+# Every record is guarded by a seqlock: odd seq = write in progress
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"),
+    ("price", "<f8"),
+    ("open_24h", "<f8"),
+    ("high_24h", "<f8"),
+    ("low_24h", "<f8"),
+    ("volume_24h", "<f8"),
+    ("quote_volume_24h", "<f8"),
+    ("price_change_24h", "<f8"),  # Percent
+    ("ema_fast", "<f8"),
+    ("ema_slow", "<f8"),
+    ("momentum", "<f8"),  # ema_fast / ema_slow - 1, in percent
+    ("updated_at", "<f8"),  # Unix seconds
+])
+
+FIELDS = RECORD_DTYPE.names[1:]
+
+# EMA smoothing per tick (~1s): fast ~1 minute, slow ~5 minutes
+EMA_FAST_ALPHA = 2 / (60 + 1)
+EMA_SLOW_ALPHA = 2 / (300 + 1)
+
+
+def region_size(capacity: int) -> int:
+    """Bytes needed for a board with `capacity` symbols"""
+    return HEADER_DTYPE.itemsize + capacity * (NAME_DTYPE.itemsize + RECORD_DTYPE.itemsize)
+
+
+def _views(buf, capacity: int):
+    """Numpy views over the shared region (no copies)"""
+    header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=buf, offset=0)
+    names_offset = HEADER_DTYPE.itemsize
+    names = np.ndarray((capacity,), dtype=NAME_DTYPE, buffer=buf, offset=names_offset)
+    records_offset = names_offset + capacity * NAME_DTYPE.itemsize
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=buf, offset=records_offset)
+    return header, names, records
+
+
+class PriceBoardWriter:
+    """Single writer: owns the shared region and the slot assignment"""
+
+    def __init__(self, name: str, capacity: int):
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=region_size(capacity))
+        except FileExistsError:
+            # Left over from a crashed collector - take it over
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=region_size(capacity))
+
+        self.header, self.names, self.records = _views(self.shm.buf, capacity)
+        self.records[:] = 0
+        self.header[0] = (MAGIC, VERSION, capacity, 0, time.time_ns())
+        self.capacity = capacity
+        self._slots: Dict[str, int] = {}
+
+    def write(self, pair: str, **values: float) -> bool:
+        """Publish one symbol's state (False if the board is full)"""
+        slot = self._slots.get(pair)
+        if slot is None:
+            slot = len(self._slots)
+            if slot >= self.capacity:
+                return False
+            self.names[slot] = pair.encode()
+            self._slots[pair] = slot
+            self.header["count"][0] = slot + 1
+
+        records = self.records
+        seq = int(records["seq"][slot])
+        records["seq"][slot] = seq + 1  # Odd: readers retry
+        for field, value in values.items():
+            records[field][slot] = value
+        records["seq"][slot] = seq + 2
+        return True
+
+    def previous(self, pair: str) -> Optional[np.void]:
+        """Last written record for a pair (writer-side, no seqlock needed)"""
+        slot = self._slots.get(pair)
+        return None if slot is None else self.records[slot]
+
+    def close(self):
+        # Readers still mapping this region move on to the next collector's
+        self.header["magic"][0] = RETIRED
+        del self.header, self.names, self.records
+        self.shm.close()
+        self.shm.unlink()
+
+
+class PriceBoard:
+    """
+    Lock-free reader used by web workers.
+    Attaches lazily; `available` is False when no collector is running.
+    A restarted collector creates a new region under the same name, so
+    a reader whose region is retired, or whose data goes stale, checks
+    for a newer epoch and re-attaches.
+    """
+
+    def __init__(self, name: str, max_age_seconds: float):
+        self.name = name
+        self.max_age_seconds = max_age_seconds
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._slots: Dict[str, int] = {}
+        self._known = 0
+        self._epoch = 0
+        self._next_attach = 0.0
+        self._next_check = 0.0
+
+    @property
+    def available(self) -> bool:
+        return self._attach()
+
+    def _attach(self) -> bool:
+        if self._shm is not None:
+            if self.header["magic"][0] == MAGIC:
+                return True
+            self._detach()  # The collector shut down; look for its successor
+        now = time.monotonic()
+        if now < self._next_attach:
+            return False
+        self._next_attach = now + 5  # Don't retry on every read
+
+        shm = self._open()
+        if shm is None:
+            return False
+        self._use(shm)
+        return True
+
+    def _open(self) -> Optional[shared_memory.SharedMemory]:
+        """Map the region currently under our name (None if absent or not a live board)"""
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except (FileNotFoundError, OSError):
+            return None
+        # Readers must not unlink the collector's region when they exit
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf, offset=0)
+        live = header["magic"][0] == MAGIC and header["version"][0] == VERSION
+        del header
+        if not live:
+            shm.close()
+            return None
+        return shm
+
+    def _use(self, shm: shared_memory.SharedMemory):
+        capacity = int(np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)["capacity"][0])
+        self._shm = shm
+        self.header, self.names, self.records = _views(shm.buf, capacity)
+        self._epoch = int(self.header["epoch"][0])
+        self._slots = {}
+        self._known = 0
+
+    def _detach(self):
+        del self.header, self.names, self.records
+        self._shm.close()
+        self._shm = None
+        self._slots = {}
+        self._known = 0
+        self._next_attach = 0.0  # Look for a successor right away
+
+    def _replaced(self) -> bool:
+        """
+        Whether a new collector has recreated the region (checked at most
+        every 5s, when data is missing or stale); switches over if so.
+        """
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + 5
+
+        shm = self._open()
+        if shm is None:
+            return False
+        epoch = int(np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)["epoch"][0])
+        if epoch == self._epoch:
+            shm.close()
+            return False
+        self._detach()
+        self._use(shm)
+        return True
+
+    def _refresh_index(self):
+        """Index symbols the collector appended since the last look"""
+        count = int(self.header["count"][0])
+        for i in range(self._known, count):
+            self._slots[self.names[i].decode()] = i
+        self._known = count
+
+    def _slot(self, pair: str) -> Optional[int]:
+        slot = self._slots.get(pair)
+        if slot is None:
+            self._refresh_index()
+            slot = self._slots.get(pair)
+        return slot
+
+    def read(self, pair: str) -> Optional[Dict[str, float]]:
+        """Consistent snapshot of one symbol's record (None if missing/stale)"""
+        if not self._attach():
+            return None
+        data = self._read(pair.upper())
+        if data is None and self._replaced():
+            data = self._read(pair.upper())
+        return data
+
+    def _read(self, pair: str) -> Optional[Dict[str, float]]:
+        slot = self._slot(pair)
+        if slot is None:
+            return None
+
+        records = self.records
+        for _ in range(100):
+            before = int(records["seq"][slot])
+            if before & 1:
+                continue  # Writer mid-update
+            record = records[slot].item()
+            if int(records["seq"][slot]) == before:
+                break
+        else:
+            return None
+
+        data = dict(zip(FIELDS, record[1:]))
+        if time.time() - data["updated_at"] > self.max_age_seconds:
+            return None
+        return data
+
+    def symbols(self) -> list:
+        """Every pair published on the board"""
+        if not self._attach():
+            return []
+        self._refresh_index()
+        return list(self._slots)
+
+
+class PriceCollector:
+    """
+    The one process that talks to Binance for live tickers.
+    Uses the all-market mini-ticker WebSocket stream, with REST polling
+    as a fallback, so upstream load is independent of worker count.
+    """
+
+    def __init__(self, writer: PriceBoardWriter):
+        settings = get_settings()
+        self.writer = writer
+        self.ws_url = settings.BINANCE_WS_URL
+        self.base_url = settings.BINANCE_BASE_URL
+        self.poll_seconds = settings.PRICE_BOARD_POLL_SECONDS
+
+    def publish(self, pair: str, price: float, open_24h: float, high: float,
+                low: float, volume: float, quote_volume: float):
+        """Update indicators incrementally and write the record"""
+        if not pair.endswith("USDT") or price <= 0:
+            return
+        prev = self.writer.previous(pair)
+        if prev is None or prev["ema_slow"] == 0:
+            ema_fast = ema_slow = price
+        else:
+            ema_fast = prev["ema_fast"] + EMA_FAST_ALPHA * (price - prev["ema_fast"])
+            ema_slow = prev["ema_slow"] + EMA_SLOW_ALPHA * (price - prev["ema_slow"])
+
+        self.writer.write(
+            pair,
+            price=price,
+            open_24h=open_24h,
+            high_24h=high,
+            low_24h=low,
+            volume_24h=volume,
+            quote_volume_24h=quote_volume,
+            price_change_24h=(price - open_24h) / open_24h * 100 if open_24h else 0.0,
+            ema_fast=ema_fast,
+            ema_slow=ema_slow,
+            momentum=(ema_fast / ema_slow - 1) * 100,
+            updated_at=time.time()
+        )
+
+    async def run(self):
+        """Stream forever, falling back to polling while the stream is down"""
+        while True:
+            try:
+                await self._stream()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Price board stream error: {e}; polling instead")
+                try:
+                    await self._poll_once()
+                except Exception as poll_error:
+                    print(f"Price board poll error: {poll_error}")
+                await asyncio.sleep(self.poll_seconds)
+
+    async def _stream(self):
+        import websockets
+
+        async with websockets.connect(f"{self.ws_url}/!miniTicker@arr") as ws:
+            async for message in ws:
+                for t in json.loads(message):
+                    self.publish(
+                        t["s"], float(t["c"]), float(t["o"]), float(t["h"]),
+                        float(t["l"]), float(t["v"]), float(t["q"])
+                    )
+
+    async def _poll_once(self):
+        import httpx
+
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{self.base_url}/ticker/24hr", timeout=10)
+            response.raise_for_status()
+        for t in response.json():
+            self.publish(
+                t["symbol"], float(t["lastPrice"]), float(t["openPrice"]),
+                float(t["highPrice"]), float(t["lowPrice"]),
+                float(t["volume"]), float(t["quoteVolume"])
+            )
+
+
+def run_collector():
+    """Entry point for the collector process"""
+    settings = get_settings()
+    writer = PriceBoardWriter(settings.PRICE_BOARD_NAME, settings.PRICE_BOARD_CAPACITY)
+    print(f"📋 Price board collector writing to '{settings.PRICE_BOARD_NAME}'")
+    try:
+        asyncio.run(PriceCollector(writer).run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+
+def board_payload(board_record: Dict[str, Any]) -> Dict[str, Any]:
+    """Price board record -> fields used by the streamer"""
+    return {
+        "price": board_record["price"],
+        "price_change_24h": board_record["price_change_24h"],
+        "high_24h": board_record["high_24h"],
+        "low_24h": board_record["low_24h"],
+        "volume_24h": board_record["volume_24h"],
+        "momentum": round(board_record["momentum"], 4),
+    }
+
+
+# Global reader instance (attaches when a collector is running)
+_settings = get_settings()
+price_board = PriceBoard(_settings.PRICE_BOARD_NAME, _settings.PRICE_BOARD_MAX_AGE_SECONDS)
+
+
+if __name__ == "__main__":
+    run_collector()
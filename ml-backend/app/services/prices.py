@@ -0,0 +1,81 @@
+"""
+In-process price source
+Latest USD prices shared by the streamer, whale tracker and routes
+"""
+import json
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from ..config import get_settings
+from ..providers.scheduler import scheduler
+from .priceboard import price_board
+
+
+class PriceBook:
+    """
+    Latest known USD price per symbol (BTC, ETH, ...).
+    Fed by the live streams; missing or stale symbols are
+    fetched in ONE batched Binance request.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.base_url = settings.BINANCE_BASE_URL
+        self.ttl = settings.PRICE_SOURCE_TTL_SECONDS
+        self._prices: Dict[str, Tuple[float, float]] = {}  # symbol -> (price, updated_at)
+
+    def update(self, symbol: str, price: float):
+        """Record the latest price for a symbol"""
+        self._prices[symbol.upper()] = (price, time.monotonic())
+
+    def get(self, symbol: str) -> Optional[float]:
+        """Get a fresh price from memory (None if missing or stale)"""
+        entry = self._prices.get(symbol.upper())
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            # The shared price board is kept fresh by the collector process
+            record = price_board.read(f"{symbol.upper()}USDT")
+            return record["price"] if record else None
+        return entry[0]
+
+    async def get_many(
+        self,
+        symbols: Iterable[str],
+        client: Optional[httpx.AsyncClient] = None
+    ) -> Dict[str, float]:
+        """Get prices for several symbols, refreshing stale ones in one request"""
+        symbols = [s.upper() for s in symbols]
+        prices = {s: self.get(s) for s in symbols}
+        stale = [s for s, p in prices.items() if p is None]
+
+        if stale:
+            try:
+                await self._refresh(stale, client)
+            except Exception as e:
+                print(f"Price source error: {e}")
+            for s in stale:
+                # Fall back to the last known price, however old
+                entry = self._prices.get(s)
+                prices[s] = entry[0] if entry else None
+
+        return {s: p for s, p in prices.items() if p is not None}
+
+    async def _refresh(self, symbols: list, client: Optional[httpx.AsyncClient]):
+        """Fetch USDT prices for several symbols in a single call"""
+        params = {"symbols": json.dumps([f"{s}USDT" for s in symbols], separators=(",", ":"))}
+
+        response = await scheduler.get(
+            "binance", "ticker/price:all",
+            f"{self.base_url}/ticker/price",
+            client=client,
+            params=params
+        )
+        response.raise_for_status()
+
+        for ticker in response.json():
+            self.update(ticker["symbol"][:-len("USDT")], float(ticker["price"]))
+
+
+# Global instance
+price_book = PriceBook()
@@ -0,0 +1,237 @@
+"""
+Pub/Sub for WebSocket Fan-out
+Channels carry JSON-able dicts between workers. LocalBroker keeps
+everything in-process (single worker, or a stand-in for tests);
+RedisBroker spans workers and nodes. Both provide leases so exactly
+one worker produces each symbol's feed, plus a small shared store
+(hashes and counters) for state every worker must see.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+# Redis import with fallback (only needed for multi-worker fan-out)
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+from ..config import get_settings
+
+
+Handler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# Lease scripts: only the owner may renew or release
+_RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+def worker_id() -> str:
+    """Identifies this process across the cluster"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class Broker(ABC):
+    """Channel handlers and dispatch shared by both backends"""
+
+    name = "base"
+
+    def __init__(self):
+        self._handlers: Dict[str, Set[Handler]] = {}
+
+    @abstractmethod
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        pass
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self._handlers.setdefault(channel, set()).add(handler)
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        handlers = self._handlers.get(channel)
+        if handlers is not None:
+            handlers.discard(handler)
+            if not handlers:
+                del self._handlers[channel]
+
+    @abstractmethod
+    async def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        """Take or renew a lease; False while someone else holds it"""
+        pass
+
+    @abstractmethod
+    async def release_lease(self, key: str, owner: str):
+        pass
+
+    @abstractmethod
+    async def next_id(self, key: str) -> int:
+        """Increment a shared counter and return the new value"""
+        pass
+
+    @abstractmethod
+    async def hash_set(self, key: str, field: str, value: str):
+        pass
+
+    @abstractmethod
+    async def hash_get(self, key: str, field: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def hash_delete(self, key: str, field: str) -> bool:
+        """Remove a field; False if it wasn't there (someone else got to it first)"""
+        pass
+
+    @abstractmethod
+    async def hash_all(self, key: str) -> Dict[str, str]:
+        pass
+
+    async def close(self):
+        self._handlers.clear()
+
+    async def _dispatch(self, channel: str, message: Dict[str, Any]):
+        for handler in list(self._handlers.get(channel, ())):
+            try:
+                await handler(message)
+            except Exception as e:
+                print(f"Pub/sub handler error on {channel}: {e}")
+
+
+class LocalBroker(Broker):
+    """In-process channels and leases"""
+
+    name = "local"
+
+    def __init__(self):
+        super().__init__()
+        self._leases: Dict[str, Tuple[str, float]] = {}  # key -> (owner, expires_at)
+        self._counters: Dict[str, int] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        await self._dispatch(channel, message)
+
+    async def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        now = time.monotonic()
+        holder = self._leases.get(key)
+        if holder is not None and holder[0] != owner and holder[1] > now:
+            return False
+        self._leases[key] = (owner, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, key: str, owner: str):
+        holder = self._leases.get(key)
+        if holder is not None and holder[0] == owner:
+            del self._leases[key]
+
+    async def next_id(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def hash_set(self, key: str, field: str, value: str):
+        self._hashes.setdefault(key, {})[field] = value
+
+    async def hash_get(self, key: str, field: str) -> Optional[str]:
+        return self._hashes.get(key, {}).get(field)
+
+    async def hash_delete(self, key: str, field: str) -> bool:
+        return self._hashes.get(key, {}).pop(field, None) is not None
+
+    async def hash_all(self, key: str) -> Dict[str, str]:
+        return dict(self._hashes.get(key, {}))
+
+
+class RedisBroker(Broker):
+    """
+    Redis pub/sub with one subscriber connection per worker; a reader
+    task hands incoming messages to local handlers.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        super().__init__()
+        self._redis = aioredis.from_url(url, decode_responses=True)
+        self._pubsub = self._redis.pubsub()
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, channel: str, message: Dict[str, Any]):
+        await self._redis.publish(channel, json.dumps(message))
+
+    async def subscribe(self, channel: str, handler: Handler):
+        first = channel not in self._handlers
+        await super().subscribe(channel, handler)
+        if first:
+            await self._pubsub.subscribe(channel)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel: str, handler: Handler):
+        await super().unsubscribe(channel, handler)
+        if channel not in self._handlers:
+            await self._pubsub.unsubscribe(channel)
+
+    async def acquire_lease(self, key: str, owner: str, ttl_seconds: float) -> bool:
+        ttl_ms = int(ttl_seconds * 1000)
+        if await self._redis.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        return bool(await self._redis.eval(_RENEW, 1, key, owner, ttl_ms))
+
+    async def release_lease(self, key: str, owner: str):
+        await self._redis.eval(_RELEASE, 1, key, owner)
+
+    async def next_id(self, key: str) -> int:
+        return int(await self._redis.incr(key))
+
+    async def hash_set(self, key: str, field: str, value: str):
+        await self._redis.hset(key, field, value)
+
+    async def hash_get(self, key: str, field: str) -> Optional[str]:
+        return await self._redis.hget(key, field)
+
+    async def hash_delete(self, key: str, field: str) -> bool:
+        return bool(await self._redis.hdel(key, field))
+
+    async def hash_all(self, key: str) -> Dict[str, str]:
+        return await self._redis.hgetall(key)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            await asyncio.gather(self._reader, return_exceptions=True)
+        await self._pubsub.aclose()
+        await self._redis.aclose()
+        await super().close()
+
+    async def _read(self):
+        while True:
+            if not self._handlers:
+                await asyncio.sleep(0.5)
+                continue
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Redis pub/sub error: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message is not None:
+                await self._dispatch(message["channel"], json.loads(message["data"]))
+
+
+def create_broker(url: str) -> Broker:
+    """'' -> in-process; redis://... -> Redis (falls back to in-process if redis isn't installed)"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if REDIS_AVAILABLE:
+            return RedisBroker(url)
+        print("⚠️ PUBSUB_URL is set but redis is not installed; WebSocket fan-out stays in-process")
+    return LocalBroker()
+
+
+# Global instance
+broker = create_broker(get_settings().PUBSUB_URL)
@@ -0,0 +1,483 @@
+"""
+Price Alert Rules
+Clients register "BTC crosses 70k" or "ETH drops 5% in an hour" rules.
+Every rule fires on a crossing, so each index is a pair of sorted level
+lists and a tick only visits the levels between the previous value and
+the new one: O(log n + matches) no matter how many rules a symbol has.
+Rules live in the pub/sub broker's store, so every worker can list and
+delete them; one worker (the lease holder) evaluates them.
+"""
+import asyncio
+import json
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from ..config import get_settings
+from ..providers.scheduler import request_priority, Priority
+from ..providers.symbols import symbol_resolver
+from .candles import candle_aggregator
+from .pubsub import Broker, broker, worker_id
+from .trades import trade_streams
+
+
+PRICE_CONDITIONS = ("crosses_above", "crosses_below")
+CHANGE_CONDITIONS = ("rises", "drops")  # value = percent over window_seconds
+CONDITIONS = PRICE_CONDITIONS + CHANGE_CONDITIONS
+
+
+class Rule:
+    __slots__ = ("id", "owner", "symbol", "condition", "value", "window_seconds",
+                 "repeat", "note", "created_at", "triggered")
+
+    def __init__(self, rule_id: int, owner: str, symbol: str, condition: str, value: float,
+                 window_seconds: Optional[int], repeat: bool, note: Optional[str]):
+        self.id = rule_id
+        self.owner = owner
+        self.symbol = symbol
+        self.condition = condition
+        self.value = value
+        self.window_seconds = window_seconds if condition in CHANGE_CONDITIONS else None
+        self.repeat = repeat
+        self.note = note
+        self.created_at = datetime.now()
+        self.triggered = 0
+
+    @property
+    def level(self) -> float:
+        """Where the rule sits in its index (drops are negative changes)"""
+        return -self.value if self.condition == "drops" else self.value
+
+    @property
+    def upward(self) -> bool:
+        return self.condition in ("crosses_above", "rises")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "owner": self.owner,
+            "symbol": self.symbol,
+            "condition": self.condition,
+            "value": self.value,
+            "window_seconds": self.window_seconds,
+            "repeat": self.repeat,
+            "note": self.note,
+            "created_at": self.created_at.isoformat(),
+            "triggered": self.triggered
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rule":
+        rule = cls(
+            data["id"], data["owner"], data["symbol"], data["condition"], data["value"],
+            data["window_seconds"], data["repeat"], data["note"]
+        )
+        rule.created_at = datetime.fromisoformat(data["created_at"])
+        rule.triggered = data["triggered"]
+        return rule
+
+
+class CrossingIndex:
+    """Levels that fire when a value moves up through them, or down through them"""
+
+    def __init__(self):
+        # Parallel sorted lists: levels and the rule ids sitting on them
+        self._up: Tuple[List[float], List[int]] = ([], [])
+        self._down: Tuple[List[float], List[int]] = ([], [])
+
+    def __len__(self) -> int:
+        return len(self._up[0]) + len(self._down[0])
+
+    def add(self, level: float, rule_id: int, upward: bool):
+        levels, ids = self._up if upward else self._down
+        i = bisect_right(levels, level)
+        levels.insert(i, level)
+        ids.insert(i, rule_id)
+
+    def remove(self, level: float, rule_id: int, upward: bool):
+        levels, ids = self._up if upward else self._down
+        for i in range(bisect_left(levels, level), bisect_right(levels, level)):
+            if ids[i] == rule_id:
+                del levels[i], ids[i]
+                return
+
+    def crossed(self, previous: float, current: float) -> List[int]:
+        """Rules whose level lies between the two values, in the direction moved"""
+        if current > previous:
+            levels, ids = self._up
+            return ids[bisect_right(levels, previous):bisect_right(levels, current)]  # previous < level <= current
+        if current < previous:
+            levels, ids = self._down
+            return ids[bisect_left(levels, current):bisect_left(levels, previous)]  # current <= level < previous
+        return []
+
+
+class ChangeTracker:
+    """Percent change against the price `window` seconds ago"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.ticks: Deque[Tuple[float, float]] = deque()  # (unix time, price), one per second
+        self.change: Optional[float] = None
+
+    def seed(self, ticks: List[Tuple[float, float]]):
+        """Prepend older prices (e.g. 1m closes) so rules work immediately"""
+        oldest = self.ticks[0][0] if self.ticks else float("inf")
+        self.ticks.extendleft(reversed([t for t in ticks if t[0] < oldest]))
+
+    def update(self, now: float, price: float) -> Optional[float]:
+        """Fold in a tick; None until the history covers the window"""
+        ticks = self.ticks
+        if ticks and now - ticks[-1][0] < 1:
+            ticks[-1] = (ticks[-1][0], price)
+        else:
+            ticks.append((now, price))
+
+        # Keep exactly one tick at or before the window start: the reference
+        cutoff = now - self.window
+        while len(ticks) > 1 and ticks[1][0] <= cutoff:
+            ticks.popleft()
+        if ticks[0][0] > cutoff or not ticks[0][1]:
+            return None
+        return (price - ticks[0][1]) / ticks[0][1] * 100
+
+
+class SymbolRules:
+    """Every rule on one symbol"""
+
+    def __init__(self):
+        self.price = CrossingIndex()
+        self.changes: Dict[int, Tuple[ChangeTracker, CrossingIndex]] = {}  # window -> ...
+        self.last_price: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self.price) + sum(len(index) for _, index in self.changes.values())
+
+    def index_for(self, rule: Rule) -> CrossingIndex:
+        return self.price if rule.window_seconds is None else self.changes[rule.window_seconds][1]
+
+
+class RulesEngine:
+    """
+    Holds rules per symbol, evaluates them on every trade price (only the
+    trade streams: REST prices lag and would interleave into false
+    crossings) and pushes triggered alerts to the owner's stream.
+
+    Rules and trigger history are kept in the broker's store and every
+    change is announced on a channel, so each worker holds the full set
+    and can answer any GET or DELETE. Only the worker holding the rules
+    lease evaluates ticks (and keeps live trade feeds running for symbols
+    that have rules); another worker takes over if it dies.
+    """
+
+    RULES_KEY = "rules"
+    HISTORY_KEY = "rules:history"
+    ID_KEY = "rules:next_id"
+    EVENTS = "rules:events"
+    LEASE = "rules-lease"
+
+    def __init__(self, broker: Broker):
+        settings = get_settings()
+        self.broker = broker
+        self.worker_id = worker_id()
+        self.max_per_owner = settings.RULES_MAX_PER_OWNER
+        self.feed_seconds = settings.RULES_FEED_SECONDS
+        self.lease_seconds = settings.WS_LEASE_SECONDS  # Same failover time as the WebSocket producers
+        self.history_size = settings.ALERT_HISTORY_SIZE
+        self.evaluating = False
+        self._rules: Dict[int, Rule] = {}
+        self._by_owner: Dict[str, Set[int]] = {}
+        self._symbols: Dict[str, SymbolRules] = {}
+        self._history_lock = asyncio.Lock()
+        self._broadcast = None  # async (stream key, data) -> None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"ticks": 0, "triggered": 0}
+        trade_streams.add_listener(self.on_tick)
+
+    @staticmethod
+    def stream_key(owner: str) -> str:
+        """WebSocket stream an owner's alerts go to"""
+        return f"rules:{owner}"
+
+    def set_broadcaster(self, broadcast):
+        """Set the coroutine used to push alerts to clients"""
+        self._broadcast = broadcast
+
+    async def add(self, owner: str, specs: List[Dict[str, Any]]) -> List[Rule]:
+        """
+        Register rules (dicts with symbol, condition, value and optionally
+        window_seconds, repeat, note). Raises ValueError for unknown symbols,
+        when the owner would go over their limit, or when a new symbol would
+        need more trade streams than are kept at once.
+        """
+        owned = self._by_owner.get(owner, set())
+        if len(owned) + len(specs) > self.max_per_owner:
+            raise ValueError(f"At most {self.max_per_owner} rules per owner")
+
+        resolved = {}
+        for spec in specs:
+            key = spec["symbol"].lower()
+            if key not in resolved:
+                r = await symbol_resolver.resolve(key)
+                if r is None or not r.binance:
+                    raise ValueError(f"No live prices for {spec['symbol']}")
+                resolved[key] = r
+
+        # Every rule symbol holds a pinned trade stream
+        new_symbols = {r.symbol for r in resolved.values()} - set(self._symbols)
+        if new_symbols and len(self._symbols) + len(new_symbols) > trade_streams.max_symbols:
+            raise ValueError(f"Rules can cover at most {trade_streams.max_symbols} symbols")
+
+        rules = []
+        for spec in specs:
+            r = resolved[spec["symbol"].lower()]
+            rule = Rule(
+                await self.broker.next_id(self.ID_KEY), owner, r.symbol, spec["condition"], float(spec["value"]),
+                spec.get("window_seconds"), spec.get("repeat", False), spec.get("note")
+            )
+            await self.broker.hash_set(self.RULES_KEY, str(rule.id), json.dumps(rule.to_dict()))
+            await self._announce({"op": "add", "rule": rule.to_dict()})
+            await self._index(rule)
+            rules.append(rule)
+        return rules
+
+    async def _index(self, rule: Rule):
+        """Add a rule to this worker's indexes"""
+        if rule.id in self._rules:
+            return
+        state = self._symbols.setdefault(rule.symbol, SymbolRules())
+        tracker = None
+        if rule.window_seconds is not None and rule.window_seconds not in state.changes:
+            tracker = ChangeTracker(rule.window_seconds)
+            state.changes[rule.window_seconds] = (tracker, CrossingIndex())
+
+        state.index_for(rule).add(rule.level, rule.id, rule.upward)
+        self._rules[rule.id] = rule
+        self._by_owner.setdefault(rule.owner, set()).add(rule.id)
+
+        if self.evaluating:
+            pair = f"{rule.symbol}USDT"
+            if tracker is not None:
+                await self._seed(tracker, pair)
+            await self._keep_feed(pair)
+
+    async def _seed(self, tracker: ChangeTracker, pair: str):
+        """Prime a change window from closed 1m candles"""
+        try:
+            source = await candle_aggregator.track(pair)
+            rows = source.closed_rows("1m", tracker.window // 60 + 1)
+            tracker.seed([(row[0] / 1000 + 60, row[4]) for row in rows.tolist()])
+        except Exception as e:
+            print(f"Rule history error for {pair}: {e}")
+
+    async def remove(self, rule_id: int, owner: Optional[str] = None) -> bool:
+        raw = await self.broker.hash_get(self.RULES_KEY, str(rule_id))
+        if raw is None or (owner is not None and json.loads(raw)["owner"] != owner):
+            return False
+        if not await self.broker.hash_delete(self.RULES_KEY, str(rule_id)):
+            return False
+        await self._announce({"op": "remove", "id": rule_id})
+        self._forget(rule_id)
+        return True
+
+    def _forget(self, rule_id: int):
+        """Drop a rule from this worker's indexes"""
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return
+        owned = self._by_owner.get(rule.owner)
+        if owned is not None:
+            owned.discard(rule.id)
+            if not owned:
+                del self._by_owner[rule.owner]
+
+        state = self._symbols[rule.symbol]
+        state.index_for(rule).remove(rule.level, rule.id, rule.upward)
+        if rule.window_seconds is not None and not len(state.changes[rule.window_seconds][1]):
+            del state.changes[rule.window_seconds]
+        if not len(state):
+            del self._symbols[rule.symbol]
+            trade_streams.unpin(f"{rule.symbol}USDT")
+
+    def rules(self, owner: str) -> List[Dict[str, Any]]:
+        return [self._rules[i].to_dict() for i in sorted(self._by_owner.get(owner, ()))]
+
+    async def recent(self, owner: str) -> List[Dict[str, Any]]:
+        """Most recent triggers first"""
+        raw = await self.broker.hash_get(self.HISTORY_KEY, owner)
+        return json.loads(raw) if raw else []
+
+    def on_tick(self, pair: str, time_ms: int, price: float):
+        """Trade stream listener"""
+        if not self.evaluating:
+            return
+        state = self._symbols.get(pair[:-len("USDT")]) if pair.endswith("USDT") else None
+        if state is None:
+            return
+        self.stats["ticks"] += 1
+
+        fired: List[Tuple[int, Optional[float]]] = []
+        previous, state.last_price = state.last_price, price
+        if previous is not None:
+            fired.extend((rule_id, None) for rule_id in state.price.crossed(previous, price))
+
+        now = time_ms / 1000 if time_ms is not None else time.time()
+        for tracker, index in list(state.changes.values()):
+            change = tracker.update(now, price)
+            if change is None:
+                continue
+            if tracker.change is not None:
+                fired.extend((rule_id, change) for rule_id in index.crossed(tracker.change, change))
+            tracker.change = change
+
+        for rule_id, change in fired:
+            self._trigger(self._rules[rule_id], price, change)
+
+    def _trigger(self, rule: Rule, price: float, change: Optional[float]):
+        rule.triggered += 1
+        self.stats["triggered"] += 1
+        event = {
+            "event": "rule_triggered",
+            "symbol": rule.symbol,
+            "trigger_price": price,
+            "change_percent": round(change, 2) if change is not None else None,
+            "timestamp": datetime.now().isoformat(),
+            "rule": rule.to_dict()
+        }
+        if not rule.repeat:
+            self._forget(rule.id)
+
+        loop = asyncio.get_running_loop()
+        loop.create_task(self._record(rule, event))
+        if self._broadcast is not None:
+            loop.create_task(self._broadcast(self.stream_key(rule.owner), event))
+
+    async def _record(self, rule: Rule, event: Dict[str, Any]):
+        """Persist a trigger: the rule's count (or its removal) and the owner's history"""
+        try:
+            if rule.repeat:
+                await self.broker.hash_set(self.RULES_KEY, str(rule.id), json.dumps(rule.to_dict()))
+            else:
+                await self.broker.hash_delete(self.RULES_KEY, str(rule.id))
+            await self._announce({"op": "triggered", "id": rule.id})
+
+            async with self._history_lock:
+                history = await self.recent(rule.owner)
+                history.insert(0, event)
+                await self.broker.hash_set(self.HISTORY_KEY, rule.owner, json.dumps(history[:self.history_size]))
+        except Exception as e:
+            print(f"Rule store error for {rule.id}: {e}")
+
+    async def _announce(self, message: Dict[str, Any]):
+        await self.broker.publish(self.EVENTS, {**message, "worker": self.worker_id})
+
+    async def _on_event(self, message: Dict[str, Any]):
+        """Apply another worker's change to this worker's indexes"""
+        if message["worker"] == self.worker_id:
+            return
+        op = message["op"]
+        if op == "add":
+            await self._index(Rule.from_dict(message["rule"]))
+        elif op == "remove":
+            self._forget(message["id"])
+        elif op == "triggered":
+            rule = self._rules.get(message["id"])
+            if rule is not None:
+                rule.triggered += 1
+                if not rule.repeat:
+                    self._forget(rule.id)
+
+    async def _keep_feed(self, pair: str):
+        trade_streams.pin(pair)
+        try:
+            await trade_streams.track(pair, wait=False)
+        except Exception as e:
+            print(f"Rule feed error for {pair}: {e}")
+
+    def _release_feeds(self):
+        """Another worker evaluates now: our streams may be evicted again"""
+        for symbol in self._symbols:
+            trade_streams.unpin(f"{symbol}USDT")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.evaluating:
+            self.evaluating = False
+            self._release_feeds()
+            try:
+                await self.broker.release_lease(self.LEASE, self.worker_id)
+            except Exception as e:
+                print(f"Rules lease release error: {e}")
+
+    async def _load(self):
+        """Follow other workers' changes, then load every stored rule"""
+        await self.broker.subscribe(self.EVENTS, self._on_event)
+        for raw in (await self.broker.hash_all(self.RULES_KEY)).values():
+            await self._index(Rule.from_dict(json.loads(raw)))
+
+    async def _take_over(self):
+        """Start evaluating: fresh reference prices, primed change windows, live feeds"""
+        for symbol, state in list(self._symbols.items()):
+            state.last_price = None
+            for tracker, _ in state.changes.values():
+                tracker.ticks.clear()
+                tracker.change = None
+                await self._seed(tracker, f"{symbol}USDT")
+
+    async def _loop(self):
+        """Contend for the rules lease; the holder keeps trade feeds alive while rules need ticks"""
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            try:
+                await self._load()
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Rules load error: {e}")
+                await asyncio.sleep(self.lease_seconds)
+
+        fed_at = 0.0
+        while True:
+            try:
+                holder = await self.broker.acquire_lease(self.LEASE, self.worker_id, self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Rules lease error: {e}")
+                holder = False
+
+            if holder and not self.evaluating:
+                await self._take_over()
+                fed_at = 0.0
+            elif self.evaluating and not holder:
+                self._release_feeds()
+            self.evaluating = holder
+
+            if holder and time.monotonic() - fed_at >= self.feed_seconds:
+                fed_at = time.monotonic()
+                for symbol in list(self._symbols):
+                    await self._keep_feed(f"{symbol}USDT")
+            await asyncio.sleep(self.lease_seconds / 3)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "rules": len(self._rules),
+            "owners": len(self._by_owner),
+            "symbols": len(self._symbols),
+            "evaluating": self.evaluating,
+            **self.stats
+        }
+
+
+# Global instance
+rules_engine = RulesEngine(broker)
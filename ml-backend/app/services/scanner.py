@@ -0,0 +1,187 @@
+"""
+Background Market Scanner
+Scores every USDT pair on a fixed cadence and keeps ranked leaderboards
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ..config import get_settings
+from ..models.signals import SignalGenerator
+from ..providers.binance import BinanceProvider
+from ..providers.replay import market_provider
+from ..providers.scheduler import request_priority, Priority
+
+
+HISTORY_DAYS = 30  # Same window as /signals (more if the strategy needs it)
+
+
+class MarketScanner:
+    """
+    Evaluates SignalGenerator scores, volatility and anomaly flags
+    across the market in one vectorized pass per cycle.
+    """
+
+    def __init__(self, provider: BinanceProvider, signal_gen: SignalGenerator):
+        settings = get_settings()
+        self.provider = provider
+        self.signal_gen = signal_gen
+        self.history_days = max(HISTORY_DAYS, signal_gen.strategy.min_periods)
+        self.interval_seconds = settings.SCANNER_INTERVAL_SECONDS
+        self.max_symbols = settings.SCANNER_MAX_SYMBOLS
+        self.concurrency = settings.SCANNER_CONCURRENCY
+        self.results: List[Dict[str, Any]] = []
+        self.stats: Dict[str, Any] = {"scans": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background scan loop"""
+        if not self.running:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the background scan loop"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        request_priority.set(Priority.BACKGROUND)
+        while True:
+            try:
+                await self.scan_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Scanner error: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def scan_once(self) -> Dict[str, Any]:
+        """Run one full market scan"""
+        started = time.perf_counter()
+
+        # 1. One request for every ticker, keep the most liquid USDT pairs
+        tickers = [
+            t for t in await self.provider.get_24h_tickers()
+            if t["symbol"].endswith("USDT") and float(t["lastPrice"]) > 0
+        ]
+        tickers.sort(key=lambda t: float(t["quoteVolume"]), reverse=True)
+        tickers = tickers[:self.max_symbols]
+
+        # 2. Fetch daily candles in bounded-concurrency batches
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(pair: str):
+            async with semaphore:
+                try:
+                    return await self.provider.get_klines(pair, interval="1d", limit=self.history_days)
+                except Exception:
+                    return []
+
+        histories = await asyncio.gather(*(fetch(t["symbol"]) for t in tickers))
+        fetched_at = time.perf_counter()
+
+        # 3. Stack complete histories into (symbols x days) matrices
+        rows = [
+            (t, h) for t, h in zip(tickers, histories) if len(h) >= self.history_days
+        ]
+        if not rows:
+            raise RuntimeError("No symbols with enough history")
+
+        closes = np.array([[p.close for p in h[-self.history_days:]] for _, h in rows])
+        volumes = np.array([[p.volume for p in h[-self.history_days:]] for _, h in rows])
+
+        batch = self.signal_gen.generate_signals_batch(closes)
+        risk = batch[self.signal_gen.strategy.risk.indicator]  # "volatility" unless the spec says otherwise
+
+        # Anomaly flags (same thresholds as detect_anomalies)
+        last_change = (closes[:, -1] - closes[:, -2]) / closes[:, -2] * 100
+        price_spike = np.abs(last_change) > 5
+        volume_spike = volumes[:, -1] > volumes[:, -20:].mean(axis=1) * 3
+
+        results = []
+        for i, (ticker, _) in enumerate(rows):
+            anomalies = []
+            if price_spike[i]:
+                anomalies.append("VOLATILITY")
+            if volume_spike[i]:
+                anomalies.append("WHALE")
+
+            results.append({
+                "symbol": ticker["symbol"][:-len("USDT")],
+                "price": float(ticker["lastPrice"]),
+                "price_change_24h": float(ticker["priceChangePercent"]),
+                "volume_24h_usd": float(ticker["quoteVolume"]),
+                "signal": str(batch["signal"][i]),
+                "strength": str(batch["strength"][i]),
+                "score": round(float(batch["score"][i]), 2),
+                "volatility": round(float(risk[i]), 2),
+                "risk_level": str(batch["risk_level"][i]),
+                "anomalies": anomalies
+            })
+
+        results.sort(key=lambda r: r["score"], reverse=True)
+        self.results = results
+
+        finished = time.perf_counter()
+        self.stats = {
+            "scans": self.stats.get("scans", 0) + 1,
+            "scanned_at": datetime.now().isoformat(),
+            "symbols_scanned": len(results),
+            "symbols_skipped": len(tickers) - len(results),
+            "fetch_ms": round((fetched_at - started) * 1000, 1),
+            "compute_ms": round((finished - fetched_at) * 1000, 1),
+            "duration_ms": round((finished - started) * 1000, 1),
+            "interval_seconds": self.interval_seconds
+        }
+        return self.stats
+
+    def leaderboards(self, limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Strongest BUY/SELL, most volatile and flagged symbols"""
+        return {
+            "top_buy": [r for r in self.results if r["signal"] == "BUY"][:limit],
+            "top_sell": [r for r in reversed(self.results) if r["signal"] == "SELL"][:limit],
+            "most_volatile": sorted(
+                self.results, key=lambda r: r["volatility"], reverse=True
+            )[:limit],
+            "anomalies": [r for r in self.results if r["anomalies"]][:limit]
+        }
+
+    def query(
+        self,
+        signal: Optional[str] = None,
+        risk_level: Optional[str] = None,
+        min_volume_usd: float = 0,
+        anomalies_only: bool = False,
+        sort: str = "score",
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Filter and rank the latest scan results"""
+        results = [
+            r for r in self.results
+            if (signal is None or r["signal"] == signal.upper())
+            and (risk_level is None or r["risk_level"] == risk_level.upper())
+            and r["volume_24h_usd"] >= min_volume_usd
+            and (not anomalies_only or r["anomalies"])
+        ]
+
+        if sort == "volatility":
+            results.sort(key=lambda r: r["volatility"], reverse=True)
+        elif sort == "volume":
+            results.sort(key=lambda r: r["volume_24h_usd"], reverse=True)
+        elif sort == "score_asc" or (sort == "score" and signal and signal.upper() == "SELL"):
+            results.sort(key=lambda r: r["score"])
+
+        return results[:limit]
+
+
+# Global instance
+market_scanner = MarketScanner(market_provider(), SignalGenerator())
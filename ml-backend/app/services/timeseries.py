@@ -0,0 +1,200 @@
+"""
+Compressed In-memory Time Series
+OHLCV rows are appended to an uncompressed head block; full blocks are
+sealed into chunks with delta-of-delta timestamps and XOR-encoded,
+byte-shuffled float columns, which decode straight into NumPy arrays.
+"""
+import zlib
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional
+
+import numpy as np
+
+
+COLUMNS = ("time", "open", "high", "low", "close", "volume")
+_UINT_TYPES = (np.uint8, np.uint16, np.uint32, np.uint64)
+
+
+def encode_times(times: np.ndarray) -> bytes:
+    """
+    Delta-of-delta: regular bars (every dod == 0) cost a 17-byte header;
+    otherwise the zigzagged dods are stored at the narrowest width.
+    """
+    times = times.astype(np.int64)
+    first = times[0]
+    delta = times[1] - times[0] if len(times) > 1 else 0
+    dod = np.diff(times, n=2)
+    header = np.array([first, delta], dtype=np.int64).tobytes()
+    if not dod.any():
+        return header + b"\x00"
+
+    zigzag = ((dod << 1) ^ (dod >> 63)).astype(np.uint64)
+    width = next(i for i, t in enumerate(_UINT_TYPES) if zigzag.max() <= np.iinfo(t).max)
+    return header + bytes([width + 1]) + zlib.compress(zigzag.astype(_UINT_TYPES[width]).tobytes())
+
+
+def decode_times(data: bytes, count: int) -> np.ndarray:
+    first, delta = np.frombuffer(data[:16], dtype=np.int64)
+    width = data[16]
+    if width == 0:
+        return first + delta * np.arange(count, dtype=np.int64)
+
+    zigzag = np.frombuffer(zlib.decompress(data[17:]), dtype=_UINT_TYPES[width - 1]).astype(np.int64)
+    dod = (zigzag >> 1) ^ -(zigzag & 1)
+    deltas = np.concatenate(([delta], delta + np.cumsum(dod)))
+    return np.concatenate(([first], first + np.cumsum(deltas)))[:count]
+
+
+def encode_floats(values: np.ndarray) -> bytes:
+    """
+    XOR each value with the previous one (unchanged high bits become
+    zeros), then group bytes by significance so zlib sees long runs.
+    """
+    bits = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    xored = bits.copy()
+    xored[1:] ^= bits[:-1]
+    planes = xored.view(np.uint8).reshape(-1, 8).T
+    return zlib.compress(planes.tobytes())
+
+
+def decode_floats(data: bytes, count: int) -> np.ndarray:
+    planes = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(8, count)
+    xored = np.ascontiguousarray(planes.T).view(np.uint64).ravel()
+    return np.bitwise_xor.accumulate(xored).view(np.float64)
+
+
+class Chunk:
+    """An immutable, compressed block of rows"""
+
+    __slots__ = ("count", "start_ms", "end_ms", "columns")
+
+    def __init__(self, rows: np.ndarray):
+        self.count = len(rows)
+        self.start_ms = int(rows[0, 0])
+        self.end_ms = int(rows[-1, 0])
+        self.columns = (encode_times(rows[:, 0]),) + tuple(
+            encode_floats(rows[:, i]) for i in range(1, rows.shape[1])
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(c) for c in self.columns)
+
+    def decode(self) -> np.ndarray:
+        """-> (count x columns) float64 array"""
+        rows = np.empty((self.count, len(self.columns)))
+        rows[:, 0] = decode_times(self.columns[0], self.count)
+        for i, data in enumerate(self.columns[1:], start=1):
+            rows[:, i] = decode_floats(data, self.count)
+        return rows
+
+
+class CompressedSeries:
+    """
+    Append-only OHLCV rows ([open_ms, open, high, low, close, volume]).
+    Only the last row can change (for in-progress bars), so it always
+    lives in the uncompressed head.
+    """
+
+    def __init__(self, chunk_size: int = 256, max_rows: Optional[int] = None):
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self._chunks: Deque[Chunk] = deque()
+        self._sealed_rows = 0
+        self._head = np.empty((min(16, chunk_size), len(COLUMNS)))  # Grows up to chunk_size
+        self._head_len = 0
+
+    def __len__(self) -> int:
+        return self._sealed_rows + self._head_len
+
+    def append(self, row: List[float]):
+        if self._head_len == self.chunk_size:
+            self._seal()
+        elif self._head_len == len(self._head):
+            grown = np.empty((min(len(self._head) * 2, self.chunk_size), len(COLUMNS)))
+            grown[:self._head_len] = self._head[:self._head_len]
+            self._head = grown
+        self._head[self._head_len] = row
+        self._head_len += 1
+
+    def extend(self, rows: List[List[float]]):
+        for row in rows:
+            self.append(row)
+
+    def last(self) -> Optional[list]:
+        """Newest row as a list (None when empty)"""
+        if self._head_len == 0:
+            return None
+        row = self._head[self._head_len - 1].tolist()
+        row[0] = int(row[0])
+        return row
+
+    def replace_last(self, row: List[float]):
+        self._head[self._head_len - 1] = row
+
+    def _seal(self):
+        self._chunks.append(Chunk(self._head[:self._head_len]))
+        self._sealed_rows += self._head_len
+        self._head_len = 0
+
+        if self.max_rows is not None:
+            while self._chunks and len(self) - self._chunks[0].count >= self.max_rows:
+                self._sealed_rows -= self._chunks.popleft().count
+
+    def tail(self, n: Optional[int] = None) -> np.ndarray:
+        """Last `n` rows (all when None), decoding only the chunks needed"""
+        if n is None:
+            n = len(self)
+        n = min(n, len(self))
+        if n <= 0:
+            return np.empty((0, len(COLUMNS)))
+
+        blocks = [self._head[:self._head_len]]
+        have = self._head_len
+        for chunk in reversed(self._chunks):
+            if have >= n:
+                break
+            blocks.append(chunk.decode())
+            have += chunk.count
+        return np.concatenate(blocks[::-1])[-n:]
+
+    def between(self, start_ms: int, end_ms: int) -> np.ndarray:
+        """Rows with start_ms <= open time <= end_ms"""
+        blocks = [c.decode() for c in self._chunks if c.end_ms >= start_ms and c.start_ms <= end_ms]
+        blocks.append(self._head[:self._head_len])
+        rows = np.concatenate(blocks)
+        return rows[(rows[:, 0] >= start_ms) & (rows[:, 0] <= end_ms)]
+
+    def iter_between(self, start_ms: int, end_ms: int) -> Iterator[np.ndarray]:
+        """Like between(), one chunk at a time, so memory stays at one chunk"""
+        for chunk in list(self._chunks):
+            if chunk.end_ms >= start_ms and chunk.start_ms <= end_ms:
+                rows = chunk.decode()
+                yield rows[(rows[:, 0] >= start_ms) & (rows[:, 0] <= end_ms)]
+        rows = self._head[:self._head_len].copy()
+        yield rows[(rows[:, 0] >= start_ms) & (rows[:, 0] <= end_ms)]
+
+    @property
+    def start_ms(self) -> Optional[int]:
+        """Open time of the oldest row (None when empty)"""
+        if self._chunks:
+            return self._chunks[0].start_ms
+        return int(self._head[0, 0]) if self._head_len else None
+
+    def arrays(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Last `n` rows as named column arrays (for indicator math)"""
+        rows = self.tail(n)
+        return {name: rows[:, i] for i, name in enumerate(COLUMNS)}
+
+    def stats(self) -> Dict[str, float]:
+        compressed = sum(c.nbytes for c in self._chunks)
+        head = self._head.nbytes
+        rows = len(self)
+        return {
+            "rows": rows,
+            "chunks": len(self._chunks),
+            "compressed_bytes": compressed,
+            "head_bytes": head,
+            "bytes_per_candle": round((compressed + head) / rows, 2) if rows else 0.0,
+            "sealed_bytes_per_candle": round(compressed / self._sealed_rows, 2) if self._sealed_rows else None
+        }
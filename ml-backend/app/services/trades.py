@@ -0,0 +1,316 @@
+"""
+Trade Stream Aggregation
+Follows each symbol's aggregated trade stream and keeps rolling VWAP,
+buy/sell imbalance, trade counts and large trades over several windows
+in constant memory.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from ..config import get_settings
+from ..providers.replay import market_provider
+from ..providers.scheduler import request_priority, Priority, hop_timeout, DeadlineExceeded
+from .prices import price_book
+
+
+# Per-second bucket columns
+VOLUME, NOTIONAL, BUY_VOLUME, SELL_VOLUME, TRADES, LARGE_TRADES = range(6)
+
+
+class TradeWindows:
+    """
+    Rolling trade statistics for one symbol.
+    Trades land in a ring of one-second buckets sized to the longest
+    window; each window keeps running totals that are updated as
+    buckets enter and leave it, so every trade is O(windows).
+    """
+
+    def __init__(self, windows: Sequence[int], large_usd: float, large_history: int = 20):
+        self.windows = sorted(windows)
+        self.size = self.windows[-1]
+        self.large_usd = large_usd
+        self._buckets = np.zeros((self.size, 6))
+        self._seconds = np.full(self.size, -1, dtype=np.int64)
+        self._totals = np.zeros((len(self.windows), 6))
+        self._head: Optional[int] = None  # Newest second seen
+        self.last_price: Optional[float] = None
+        self.last_time_ms: Optional[int] = None
+        self.last_trade_id: Optional[int] = None
+        self.large_trades: Deque[Dict[str, Any]] = deque(maxlen=large_history)
+
+    def _advance(self, second: int):
+        """Move the newest second forward, expiring buckets from each window"""
+        if self._head is None:
+            self._head = second
+            return
+        if second <= self._head:
+            return
+        if second - self._head >= self.size:
+            # Quiet for longer than the longest window: start over
+            self._buckets[:] = 0
+            self._seconds[:] = -1
+            self._totals[:] = 0
+            self._head = second
+            return
+
+        for s in range(self._head + 1, second + 1):
+            for i, window in enumerate(self.windows):
+                expired = s - window
+                slot = expired % self.size
+                if self._seconds[slot] == expired:
+                    self._totals[i] -= self._buckets[slot]
+            slot = s % self.size
+            self._buckets[slot] = 0
+            self._seconds[slot] = s
+        self._head = second
+
+    def add(self, time_ms: int, price: float, qty: float, is_sell: bool, trade_id: Optional[int] = None):
+        """Fold in one trade (is_sell = the seller was the aggressor)"""
+        second = time_ms // 1000
+        self._advance(second)
+        if second < self._head:
+            second = self._head  # Late trade: count it in the newest second
+
+        notional = price * qty
+        large = notional >= self.large_usd
+        row = np.zeros(6)
+        row[VOLUME] = qty
+        row[NOTIONAL] = notional
+        row[SELL_VOLUME if is_sell else BUY_VOLUME] = qty
+        row[TRADES] = 1
+        row[LARGE_TRADES] = large
+
+        slot = second % self.size
+        if self._seconds[slot] != second:
+            self._buckets[slot] = 0
+            self._seconds[slot] = second
+        self._buckets[slot] += row
+        self._totals += row
+
+        self.last_price = price
+        self.last_time_ms = time_ms
+        if trade_id is not None:
+            self.last_trade_id = trade_id
+        if large:
+            self.large_trades.append({
+                "timestamp": time_ms,
+                "side": "SELL" if is_sell else "BUY",
+                "price": price,
+                "quantity": qty,
+                "usd_value": round(notional, 2)
+            })
+
+    def stats(self, now_ms: Optional[int] = None) -> Dict[str, Any]:
+        """VWAP, imbalance, counts and volume per window"""
+        if now_ms is not None:
+            self._advance(now_ms // 1000)
+
+        windows = {}
+        for window, totals in zip(self.windows, self._totals):
+            volume = totals[VOLUME]
+            buy, sell = totals[BUY_VOLUME], totals[SELL_VOLUME]
+            windows[f"{window}s"] = {
+                "vwap": round(float(totals[NOTIONAL] / volume), 8) if volume > 0 else None,
+                "volume": round(float(volume), 8),
+                "volume_usd": round(float(totals[NOTIONAL]), 2),
+                "buy_volume": round(float(buy), 8),
+                "sell_volume": round(float(sell), 8),
+                "imbalance": round(float((buy - sell) / (buy + sell)), 4) if buy + sell > 0 else 0.0,
+                "trades": int(totals[TRADES]),
+                "large_trades": int(totals[LARGE_TRADES])
+            }
+        return {
+            "last_price": self.last_price,
+            "windows": windows,
+            "recent_large_trades": list(self.large_trades)
+        }
+
+
+class TradeStreamAggregator:
+    """
+    Runs one aggTrade subscription per symbol that is being watched.
+    Falls back to polling REST aggTrades when the stream is down;
+    symbols nobody asks about are dropped, and past max_symbols the
+    least recently used one makes room. Pinned symbols (the ones alert
+    rules need) are never the ones dropped.
+    """
+
+    def __init__(self, provider):
+        settings = get_settings()
+        self.provider = provider
+        self.ws_url = settings.BINANCE_WS_URL
+        self.windows = settings.TRADE_WINDOWS_SECONDS
+        self.large_usd = settings.TRADE_LARGE_USD
+        self.poll_seconds = settings.TRADE_POLL_SECONDS
+        self.idle_seconds = settings.TRADE_IDLE_SECONDS
+        self.max_symbols = settings.TRADE_MAX_SYMBOLS
+        self._symbols: Dict[str, TradeWindows] = {}
+        self._ready: Dict[str, asyncio.Event] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._last_access: Dict[str, float] = {}
+        self._pinned: Set[str] = set()
+        self._listeners: List[Callable[[str, int, float], None]] = []
+
+    def add_listener(self, callback: Callable[[str, int, float], None]):
+        """Call callback(pair, time_ms, price) with the last trade price as trades arrive"""
+        self._listeners.append(callback)
+
+    def pin(self, symbol: str):
+        """Keep a symbol's stream out of LRU eviction"""
+        self._pinned.add(symbol.upper())
+
+    def unpin(self, symbol: str):
+        self._pinned.discard(symbol.upper())
+
+    @property
+    def available(self) -> bool:
+        """Replayed data has no trade stream"""
+        return hasattr(self.provider, "get_agg_trades")
+
+    async def track(self, symbol: str, timeout: float = 5.0, wait: bool = True) -> Optional[TradeWindows]:
+        """
+        Start aggregating a symbol's trades and wait for the backfill.
+        With wait=False a symbol that isn't backfilled yet returns None
+        right away (its stream keeps starting in the background).
+        """
+        if not self.available:
+            return None
+        symbol = symbol.upper()
+        self._last_access[symbol] = time.monotonic()
+        if symbol not in self._tasks or self._tasks[symbol].done():
+            self._make_room()
+            self._symbols[symbol] = TradeWindows(self.windows, self.large_usd)
+            self._ready[symbol] = asyncio.Event()
+            self._tasks[symbol] = asyncio.create_task(self._run(symbol))
+
+        ready = self._ready[symbol]
+        if wait:
+            try:
+                await asyncio.wait_for(ready.wait(), hop_timeout(timeout))
+            except (asyncio.TimeoutError, DeadlineExceeded):
+                return None
+        # The stream may have stopped or been evicted in the meantime
+        return self._symbols.get(symbol) if ready.is_set() else None
+
+    def _make_room(self):
+        """Drop the least recently used unpinned symbols until a new one fits"""
+        while len(self._tasks) >= self.max_symbols:
+            evictable = [s for s in self._tasks if s not in self._pinned]
+            if not evictable:
+                break  # Only pinned streams left; their owners keep them within the cap
+            symbol = min(evictable, key=lambda s: self._last_access.get(s, 0))
+            self._tasks.pop(symbol).cancel()
+            self._symbols.pop(symbol, None)
+            self._last_access.pop(symbol, None)
+            ready = self._ready.pop(symbol, None)
+            if ready is not None:
+                ready.set()
+
+    async def flow(self, symbol: str, wait: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Current trade-flow stats (None if no trades have been seen).
+        Callers for whom trade flow is optional pass wait=False rather
+        than sit out a new symbol's backfill.
+        """
+        try:
+            state = await self.track(symbol, wait=wait)
+        except Exception as e:
+            print(f"Trade stream error for {symbol}: {e}")
+            return None
+        if state is None or state.last_price is None:
+            return None
+        return state.stats(int(time.time() * 1000))
+
+    def tracked_symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    async def stop(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._symbols.clear()
+
+    def _idle(self, symbol: str) -> bool:
+        return time.monotonic() - self._last_access.get(symbol, 0) > self.idle_seconds
+
+    @staticmethod
+    def _ingest(state: TradeWindows, trade: Dict[str, Any]):
+        """Binance aggTrade payload (stream or REST) -> TradeWindows"""
+        if state.last_trade_id is not None and int(trade["a"]) <= state.last_trade_id:
+            return  # Already counted
+        state.add(int(trade["T"]), float(trade["p"]), float(trade["q"]), bool(trade["m"]), int(trade["a"]))
+
+    async def _run(self, symbol: str):
+        request_priority.set(Priority.BACKGROUND)
+        state = self._symbols[symbol]
+        try:
+            # Backfill recent trades so the short windows are useful right away
+            try:
+                await self._poll(symbol, state)
+            except Exception as e:
+                print(f"Trade backfill error for {symbol}: {e}")
+            self._ready[symbol].set()
+
+            while not self._idle(symbol):
+                try:
+                    await self._stream(symbol, state)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Trade stream error for {symbol}: {e}; polling aggTrades")
+                    try:
+                        await self._poll(symbol, state)
+                    except Exception as poll_error:
+                        print(f"Trade poll error for {symbol}: {poll_error}")
+                    await asyncio.sleep(self.poll_seconds)
+        finally:
+            if self._tasks.get(symbol) is asyncio.current_task():  # Not already evicted and replaced
+                self._ready[symbol].set()  # Waiters get None instead of the full timeout
+                self._symbols.pop(symbol, None)
+                self._tasks.pop(symbol, None)
+                self._ready.pop(symbol, None)
+
+    async def _stream(self, symbol: str, state: TradeWindows):
+        import websockets
+
+        async with websockets.connect(f"{self.ws_url}/{symbol.lower()}@aggTrade") as ws:
+            while not self._idle(symbol):
+                try:
+                    message = await asyncio.wait_for(ws.recv(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    continue
+                self._ingest(state, json.loads(message))
+                self._publish_price(symbol, state)
+
+    async def _poll(self, symbol: str, state: TradeWindows):
+        """Catch up from REST, continuing after the last trade seen"""
+        from_id = state.last_trade_id + 1 if state.last_trade_id is not None else None
+        for trade in await self.provider.get_agg_trades(symbol, from_id=from_id):
+            self._ingest(state, trade)
+        self._publish_price(symbol, state)
+
+    def _publish_price(self, symbol: str, state: TradeWindows):
+        """The last trade is the freshest price there is"""
+        if state.last_price is None:
+            return
+        if symbol.endswith("USDT"):
+            price_book.update(symbol[:-len("USDT")], state.last_price)
+        self.notify(symbol, state.last_time_ms, state.last_price)
+
+    def notify(self, pair: str, time_ms: int, price: float):
+        """Hand a trade price to the listeners (replays feed theirs through here too)"""
+        for callback in self._listeners:
+            try:
+                callback(pair, time_ms, price)
+            except Exception as e:
+                print(f"Trade listener error: {e}")
+
+
+# Global instance
+trade_streams = TradeStreamAggregator(market_provider())
@@ -0,0 +1,121 @@
+"""
+Startup Warm-up
+Runs named prefetch steps concurrently (respecting dependencies) so the
+first users hit warm caches, and reports progress for /ready.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+from ..config import get_settings
+from ..providers.scheduler import request_priority, Priority
+
+
+class WarmupStep:
+    """One prefetch job; `run` returns a short detail for the status report"""
+
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]], after: Sequence[str] = ()):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+        self.status = "pending"  # pending | running | done | failed | timed_out
+        self.detail: Any = None
+        self.duration_ms: Optional[float] = None
+        self.finished = asyncio.Event()
+
+
+class Warmup:
+    """
+    Steps start as soon as the steps they depend on have finished
+    (successfully or not). The instance counts as ready once every step
+    has finished or the overall timeout has passed.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.enabled = settings.WARMUP_ENABLED
+        self.timeout = settings.WARMUP_TIMEOUT_SECONDS
+        self.steps: Dict[str, WarmupStep] = {}
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.timed_out = False
+        self._started = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def add_step(self, name: str, run: Callable[[], Awaitable[Any]], after: Sequence[str] = ()):
+        self.steps[name] = WarmupStep(name, run, after)
+
+    @property
+    def ready(self) -> bool:
+        return not self.enabled or self.finished_at is not None
+
+    def start(self):
+        """Run the warm-up in the background"""
+        if not self.enabled or self._task is not None:
+            return
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self):
+        request_priority.set(Priority.BACKGROUND)
+        tasks = [asyncio.create_task(self._run_step(step)) for step in self.steps.values()]
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            print(f"⚠️ Warm-up timed out after {self.timeout}s; serving anyway")
+        self.finished_at = datetime.now()
+
+        failed = [s.name for s in self.steps.values() if s.status == "failed"]
+        elapsed = time.perf_counter() - self._started
+        print(f"🔥 Warm-up finished in {elapsed:.1f}s" + (f" (failed: {', '.join(failed)})" if failed else ""))
+
+    async def _run_step(self, step: WarmupStep):
+        started = None
+        try:
+            for name in step.after:
+                if name in self.steps:
+                    await self.steps[name].finished.wait()
+
+            step.status = "running"
+            started = time.perf_counter()
+            step.detail = await step.run()
+            step.status = "done"
+        except asyncio.CancelledError:
+            # Cut off by the overall timeout, while running or still waiting
+            step.status = "timed_out"
+            raise
+        except Exception as e:
+            step.status = "failed"
+            step.detail = str(e)
+            print(f"Warm-up step {step.name} failed: {e}")
+        finally:
+            if started is not None:
+                step.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            step.finished.set()
+
+    def status(self) -> Dict[str, Any]:
+        finished = sum(1 for s in self.steps.values() if s.finished.is_set())
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "progress": f"{finished}/{len(self.steps)}",
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "timed_out": self.timed_out,
+            "steps": {
+                s.name: {"status": s.status, "duration_ms": s.duration_ms, "detail": s.detail}
+                for s in self.steps.values()
+            }
+        }
+
+
+# Global instance
+warmup = Warmup()
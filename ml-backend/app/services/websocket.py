@@ -1,73 +1,112 @@
 """
 WebSocket Manager for Real-time Streaming
-Provides live price updates and signals every second
+Provides live price updates and signals every few seconds.
+One worker per symbol produces the feed; every worker relays it
+to its own clients through pub/sub.
 """
 import asyncio
 import json
-from typing import Dict, Set
+from typing import Callable, Dict, Optional, Set
 from fastapi import WebSocket, WebSocketDisconnect
-import httpx
 from datetime import datetime
 
 from ..config import get_settings
 from ..models.signals import SignalGenerator
-
-
-# CoinGecko ID to Symbol mapping (same as routes.py)
-COIN_ID_TO_SYMBOL = {
-    "bitcoin": "BTC",
-    "ethereum": "ETH",
-    "binancecoin": "BNB",
-    "ripple": "XRP",
-    "cardano": "ADA",
-    "solana": "SOL",
-    "dogecoin": "DOGE",
-    "polkadot": "DOT",
-    "shiba-inu": "SHIB",
-    "litecoin": "LTC",
-}
+from ..providers.symbols import symbol_resolver
+from ..providers.scheduler import scheduler
+from ..providers.replay import active_replay, ReplayProvider
+from .prices import price_book
+from .priceboard import price_board, board_payload
+from .anomalies import anomaly_monitor
+from .rules import rules_engine
+from .trades import trade_streams
+from .pubsub import Broker, broker, worker_id
 
 
 def normalize_symbol(input_symbol: str) -> str:
     """Convert CoinGecko ID to Binance symbol"""
-    lower = input_symbol.lower()
-    if lower in COIN_ID_TO_SYMBOL:
-        return COIN_ID_TO_SYMBOL[lower]
-    return input_symbol.upper()
+    return symbol_resolver.normalize(input_symbol)
 
 
 class ConnectionManager:
-    """Manages WebSocket connections"""
+    """
+    Manages this worker's WebSocket connections.
+    Subscribes to a symbol's channel while it has local clients.
+    """
     
-    def __init__(self):
+    def __init__(self, broker: Broker):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.signal_gen = SignalGenerator()
+        self.broker = broker
+        self.send_timeout = get_settings().WS_SEND_TIMEOUT_SECONDS
+        self._relays: Dict[str, Callable] = {}
+        self._last_update: Dict[str, dict] = {}
+    
+    @staticmethod
+    def channel(symbol: str) -> str:
+        return f"ws:{symbol}"
     
     async def connect(self, websocket: WebSocket, symbol: str):
         """Connect a client to a symbol stream"""
         await websocket.accept()
         if symbol not in self.active_connections:
             self.active_connections[symbol] = set()
+            
+            async def relay(data: dict):
+                if "price" in data:
+                    self._last_update[symbol] = data
+                await self.broadcast(symbol, data)
+            
+            self._relays[symbol] = relay
+            await self.broker.subscribe(self.channel(symbol), relay)
         self.active_connections[symbol].add(websocket)
+        
+        # Latest update straight away instead of waiting for the next tick
+        last = self._last_update.get(symbol)
+        if last is not None:
+            await websocket.send_json(last)
     
-    def disconnect(self, websocket: WebSocket, symbol: str):
+    async def disconnect(self, websocket: WebSocket, symbol: str):
         """Disconnect a client"""
         if symbol in self.active_connections:
             self.active_connections[symbol].discard(websocket)
+            if not self.active_connections[symbol]:
+                del self.active_connections[symbol]
+                self._last_update.pop(symbol, None)
+                await self.broker.unsubscribe(self.channel(symbol), self._relays.pop(symbol))
+    
+    async def publish(self, symbol: str, data: dict):
+        """Send data to everyone watching a symbol, on every worker"""
+        await self.broker.publish(self.channel(symbol), data)
     
     async def broadcast(self, symbol: str, data: dict):
-        """Broadcast data to all clients watching a symbol"""
-        if symbol in self.active_connections:
-            dead_connections = set()
-            for connection in self.active_connections[symbol]:
-                try:
-                    await connection.send_json(data)
-                except Exception:
-                    dead_connections.add(connection)
-            
-            # Clean up dead connections
-            for conn in dead_connections:
-                self.active_connections[symbol].discard(conn)
+        """
+        Send data to all clients watching a symbol, concurrently.
+        A client that fails or takes longer than send_timeout is dropped,
+        so one slow socket can't hold up the feed for everyone else.
+        """
+        # Snapshot: clients can connect or leave while sends are in flight
+        connections = list(self.active_connections.get(symbol, ()))
+        if not connections:
+            return
+        
+        results = await asyncio.gather(
+            *(asyncio.wait_for(connection.send_json(data), self.send_timeout) for connection in connections),
+            return_exceptions=True
+        )
+        
+        # Clean up dead connections (unsubscribes once the last one is gone)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                await self.disconnect(connection, symbol)
+                await self._close(connection)
+    
+    async def _close(self, websocket: WebSocket):
+        """Close a dropped client so its stream loop ends too"""
+        try:
+            await asyncio.wait_for(websocket.close(code=1011), self.send_timeout)
+        except Exception:
+            pass
 
 
 class RealTimeStreamer:
@@ -78,71 +117,200 @@ class RealTimeStreamer:
     
     def __init__(self):
         settings = get_settings()
+        self.binance_url = settings.BINANCE_BASE_URL
         self.binance_ws_url = settings.BINANCE_WS_URL
-        self.manager = ConnectionManager()
+        self.push_seconds = settings.WS_PUSH_SECONDS
+        self.lease_seconds = settings.WS_LEASE_SECONDS
+        self.worker_id = worker_id()
+        self.manager = ConnectionManager(broker)
         self._running_streams: Dict[str, asyncio.Task] = {}
+        
+        # Live anomaly alerts are pushed to everyone watching the symbol,
+        # rule alerts to their owner's stream
+        anomaly_monitor.set_broadcaster(self.manager.publish)
+        rules_engine.set_broadcaster(self.manager.publish)
     
     async def get_live_price(self, symbol: str) -> dict:
         """Get current price from Binance REST API"""
-        normalized = normalize_symbol(symbol)
+        resolved = symbol_resolver.lookup(symbol)
+        if resolved is None or not resolved.binance:
+            return {"error": f"Unknown symbol: {symbol}"}
+        normalized = resolved.symbol
+        
+        replay = active_replay()
+        if replay is not None:
+            return self._replay_price(replay, symbol, resolved.binance)
+        
+        # Shared board first: no upstream call per worker
+        record = price_board.read(resolved.binance)
+        if record is not None:
+            return {
+                "symbol": symbol.upper(),
+                **board_payload(record),
+                "timestamp": datetime.fromtimestamp(record["updated_at"]).isoformat()
+            }
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"https://api.binance.com/api/v3/ticker/24hr",
-                    params={"symbol": f"{normalized}USDT"}
-                )
-                data = response.json()
-                
-                return {
-                    "symbol": symbol.upper(),
-                    "price": float(data["lastPrice"]),
-                    "price_change_24h": float(data["priceChangePercent"]),
-                    "high_24h": float(data["highPrice"]),
-                    "low_24h": float(data["lowPrice"]),
-                    "volume_24h": float(data["volume"]),
-                    "timestamp": datetime.now().isoformat()
-                }
+            response = await scheduler.get(
+                "binance", "ticker/24hr",
+                f"{self.binance_url}/ticker/24hr",
+                params={"symbol": resolved.binance}
+            )
+            data = response.json()
+            price_book.update(normalized, float(data["lastPrice"]))
+            
+            return {
+                "symbol": symbol.upper(),
+                "price": float(data["lastPrice"]),
+                "price_change_24h": float(data["priceChangePercent"]),
+                "high_24h": float(data["highPrice"]),
+                "low_24h": float(data["lowPrice"]),
+                "volume_24h": float(data["volume"]),
+                "timestamp": datetime.now().isoformat()
+            }
         except Exception as e:
             return {"error": str(e)}
     
+    def _replay_price(self, replay: ReplayProvider, symbol: str, pair: str) -> dict:
+        """Live price as of the replay clock"""
+        data = replay.get_24h_ticker(pair)
+        if data is None:
+            return {"error": f"No recorded data for {symbol}"}
+        
+        return {
+            "symbol": symbol.upper(),
+            "price": float(data["lastPrice"]),
+            "price_change_24h": float(data["priceChangePercent"]),
+            "high_24h": float(data["highPrice"]),
+            "low_24h": float(data["lowPrice"]),
+            "volume_24h": float(data["volume"]),
+            "timestamp": datetime.fromtimestamp(replay.now_ms / 1000).isoformat(),
+            "replay": True
+        }
+    
+    def start_replay(self, replay: ReplayProvider):
+        """Play a recording through the price book and live streams"""
+        def on_tick(pair: str, time_ms: int, price: float):
+            if pair.endswith("USDT"):
+                price_book.update(pair[:-len("USDT")], price)
+            trade_streams.notify(pair, time_ms, price)
+        
+        replay.start(on_tick)
+    
     async def stream_prices(self, websocket: WebSocket, symbol: str):
         """
         Stream live prices to a client.
-        Updates every 2 seconds with price + quick signal.
+        Updates every few seconds with price + quick signal.
         """
-        await self.manager.connect(websocket, symbol)
+        resolved = symbol_resolver.lookup(symbol)
+        normalized = resolved.symbol if resolved else symbol.upper()
+        await self.manager.connect(websocket, normalized)
+        self._ensure_producer(normalized)
         
         try:
             while True:
-                # Get live price
-                price_data = await self.get_live_price(symbol)
-                
-                if "error" not in price_data:
-                    # Add quick signal based on 24h change
-                    change = price_data["price_change_24h"]
-                    if change > 2:
-                        signal = "BUY"
-                        signal_emoji = "🟢"
-                    elif change < -2:
-                        signal = "SELL"
-                        signal_emoji = "🔴"
-                    else:
-                        signal = "HOLD"
-                        signal_emoji = "🟡"
-                    
-                    price_data["signal"] = signal
-                    price_data["signal_emoji"] = signal_emoji
-                    price_data["message"] = f"{signal_emoji} {symbol.upper()}: ${price_data['price']:,.2f} ({change:+.2f}%)"
-                
-                await websocket.send_json(price_data)
-                await asyncio.sleep(2)  # Update every 2 seconds
-                
+                # Clients only listen; reading notices when they go away
+                await websocket.receive_text()
         except WebSocketDisconnect:
-            self.manager.disconnect(websocket, symbol)
+            pass
         except Exception as e:
             print(f"Stream error: {e}")
-            self.manager.disconnect(websocket, symbol)
+        finally:
+            await self.manager.disconnect(websocket, normalized)
+    
+    async def stream_rule_alerts(self, websocket: WebSocket, owner: str):
+        """Push an owner's triggered price rules as they fire (from any worker)"""
+        key = rules_engine.stream_key(owner)
+        await self.manager.connect(websocket, key)
+        
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            print(f"Rule stream error: {e}")
+        finally:
+            await self.manager.disconnect(websocket, key)
+    
+    def _ensure_producer(self, symbol: str):
+        task = self._running_streams.get(symbol)
+        if task is None or task.done():
+            self._running_streams[symbol] = asyncio.create_task(self._produce(symbol))
+    
+    async def _produce(self, symbol: str):
+        """
+        While this worker has clients for a symbol, contend for its lease.
+        Only the holder builds updates (and watches for anomalies);
+        the rest just relay what it publishes.
+        """
+        lease = f"ws-lease:{symbol}"
+        resolved = symbol_resolver.lookup(symbol)
+        watch_alerts = resolved is not None and resolved.binance is not None
+        
+        try:
+            while symbol in self.manager.active_connections:
+                try:
+                    if not await self.manager.broker.acquire_lease(lease, self.worker_id, self.lease_seconds):
+                        await asyncio.sleep(self.push_seconds)
+                        continue
+                    
+                    # Keep the live candle feed (and its anomaly alerts) running
+                    if watch_alerts:
+                        try:
+                            await anomaly_monitor.watch(symbol)
+                        except Exception as e:
+                            print(f"Anomaly watch error for {symbol}: {e}")
+                            watch_alerts = False
+                    
+                    await self.manager.publish(symbol, await self._price_update(symbol, resolved.binance if watch_alerts else None))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Stream producer error for {symbol}: {e}")
+                await asyncio.sleep(self.push_seconds)
+        finally:
+            try:
+                await self.manager.broker.release_lease(lease, self.worker_id)
+            except Exception as e:
+                print(f"Lease release error for {symbol}: {e}")
+            if self._running_streams.get(symbol) is asyncio.current_task():
+                del self._running_streams[symbol]
+    
+    async def _price_update(self, symbol: str, pair: Optional[str]) -> dict:
+        """Live price + quick signal based on 24h change"""
+        price_data = await self.get_live_price(symbol)
+        
+        if "error" not in price_data:
+            change = price_data["price_change_24h"]
+            if change > 2:
+                signal = "BUY"
+                signal_emoji = "🟢"
+            elif change < -2:
+                signal = "SELL"
+                signal_emoji = "🔴"
+            else:
+                signal = "HOLD"
+                signal_emoji = "🟡"
+            
+            price_data["signal"] = signal
+            price_data["signal_emoji"] = signal_emoji
+            price_data["message"] = f"{signal_emoji} {symbol.upper()}: ${price_data['price']:,.2f} ({change:+.2f}%)"
+            
+            if pair:
+                trade_flow = await trade_streams.flow(pair, wait=False)
+                if trade_flow:
+                    price_data["trade_flow"] = trade_flow
+        
+        return price_data
+    
+    async def stop(self):
+        """Stop producers and close the pub/sub connection"""
+        for task in list(self._running_streams.values()):
+            task.cancel()
+        await asyncio.gather(*self._running_streams.values(), return_exceptions=True)
+        self._running_streams.clear()
+        await self.manager.broker.close()
 
 
 # Global instance
@@ -0,0 +1,37 @@
+"""
+Gunicorn config for multi-worker deployments
+Starts ONE price board collector for all workers
+
+Run with: gunicorn app.main:app -c gunicorn.conf.py
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+_collector = None
+
+
+def on_starting(server):
+    """Start the shared-memory price board collector before forking workers"""
+    global _collector
+    from app.config import get_settings
+    
+    if not get_settings().PRICE_BOARD_ENABLED:
+        return
+    
+    from app.services.priceboard import run_collector
+    
+    _collector = multiprocessing.get_context("spawn").Process(
+        target=run_collector, name="price-board-collector", daemon=True
+    )
+    _collector.start()
+
+
+def on_exit(server):
+    """Stop the collector (it unlinks the shared region)"""
+    if _collector is not None and _collector.is_alive():
+        _collector.terminate()
+        _collector.join(timeout=5)
@@ -0,0 +1,4 @@
+"""
+Offline load-test harness
+See runner.py; run with:  python -m loadtest --help
+"""
@@ -0,0 +1,372 @@
+"""
+Fake upstream APIs for offline load tests
+Serves deterministic Binance, CoinCap, blockchain.info and EVM JSON-RPC
+responses from a synthetic market, so no request leaves the machine.
+
+Run standalone with:  uvicorn loadtest.fake_upstream:app --port 9000
+"""
+import asyncio
+import json
+import os
+import time
+import zlib
+from typing import List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+
+COINCAP_INTERVALS = {"m1": "1m", "m5": "5m", "m15": "15m", "h1": "1h", "d1": "1d"}
+
+LISTED = [
+    ("bitcoin", "BTC", 65000), ("ethereum", "ETH", 3200), ("binance-coin", "BNB", 580),
+    ("xrp", "XRP", 0.55), ("cardano", "ADA", 0.45), ("solana", "SOL", 150),
+    ("dogecoin", "DOGE", 0.15), ("polkadot", "DOT", 7), ("shiba-inu", "SHIB", 0.00002),
+    ("litecoin", "LTC", 80), ("avalanche", "AVAX", 35), ("chainlink", "LINK", 15),
+    ("polygon", "MATIC", 0.7), ("uniswap", "UNI", 9), ("stellar", "XLM", 0.11),
+    ("tron", "TRX", 0.12), ("bitcoin-cash", "BCH", 450), ("near-protocol", "NEAR", 6),
+    ("cosmos", "ATOM", 8), ("algorand", "ALGO", 0.18),
+]
+
+# Simulated upstream response time (e.g. LOADTEST_UPSTREAM_LATENCY_MS=80)
+LATENCY_SECONDS = float(os.environ.get("LOADTEST_UPSTREAM_LATENCY_MS", "0")) / 1000
+
+
+class SyntheticMarket:
+    """
+    Deterministic prices: every symbol follows a sum of sines plus hashed
+    noise, so any time range can be computed independently and repeat
+    requests agree with each other.
+    """
+
+    def __init__(self, extra_symbols: int = 0):
+        self.assets = list(LISTED)
+        for i in range(extra_symbols):
+            self.assets.append((f"synthetic-{i}", f"SYN{i}", 1 + i % 50))
+        self.by_ticker = {ticker: (asset_id, ticker, base) for asset_id, ticker, base in self.assets}
+        self.by_id = {asset_id: (asset_id, ticker, base) for asset_id, ticker, base in self.assets}
+
+    @staticmethod
+    def _seed(ticker: str) -> float:
+        return (zlib.crc32(ticker.encode()) % 10_000) / 10_000 * 2 * np.pi
+
+    def prices(self, ticker: str, times_ms: np.ndarray) -> np.ndarray:
+        """Price at each timestamp (vectorized)"""
+        _, _, base = self.by_ticker[ticker]
+        phase = self._seed(ticker)
+        t = times_ms / 60_000  # Minutes
+        noise = np.sin(t * 12.9898 + phase * 78.233) * 0.002
+        wave = (
+            0.08 * np.sin(t / (60 * 24 * 9) + phase)
+            + 0.03 * np.sin(t / (60 * 17) + 2 * phase)
+            + 0.01 * np.sin(t / 23 + 3 * phase)
+        )
+        return base * (1 + wave + noise)
+
+    def volumes(self, ticker: str, times_ms: np.ndarray, interval_ms: int) -> np.ndarray:
+        phase = self._seed(ticker)
+        t = times_ms / 60_000
+        return (interval_ms / 60_000) * 100 * (1.5 + np.sin(t / 97 + phase))
+
+    def klines(self, ticker: str, interval: str, limit: int, start_ms: Optional[int]) -> List[list]:
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        current = now - now % step
+        if start_ms is None:
+            first = current - (limit - 1) * step
+        else:
+            first = start_ms - start_ms % step
+        opens = np.arange(first, current + 1, step, dtype=np.int64)[:limit]
+        if len(opens) == 0:
+            return []
+
+        closes_at = np.minimum(opens + step, now)
+        open_px = self.prices(ticker, opens)
+        close_px = self.prices(ticker, closes_at)
+        high = np.maximum(open_px, close_px) * 1.002
+        low = np.minimum(open_px, close_px) * 0.998
+        volume = self.volumes(ticker, opens, step)
+        return [
+            [int(o), f"{op:.8f}", f"{h:.8f}", f"{lo:.8f}", f"{c:.8f}", f"{v:.4f}",
+             int(o + step - 1), f"{v * c:.4f}", 100, f"{v / 2:.4f}", f"{v * c / 2:.4f}", "0"]
+            for o, op, h, lo, c, v in zip(opens, open_px, high, low, close_px, volume)
+        ]
+
+    def ticker_24h(self, ticker: str) -> dict:
+        now = int(time.time() * 1000)
+        day = INTERVAL_MS["1d"]
+        samples = self.prices(ticker, np.linspace(now - day, now, 97))
+        volume = float(self.volumes(ticker, np.array([now]), day)[0])
+        last, first = samples[-1], samples[0]
+        return {
+            "symbol": f"{ticker}USDT",
+            "lastPrice": f"{last:.8f}",
+            "openPrice": f"{first:.8f}",
+            "highPrice": f"{samples.max():.8f}",
+            "lowPrice": f"{samples.min():.8f}",
+            "volume": f"{volume:.4f}",
+            "quoteVolume": f"{volume * last:.4f}",
+            "priceChange": f"{last - first:.8f}",
+            "priceChangePercent": f"{(last - first) / first * 100:.3f}",
+        }
+
+    def price_now(self, ticker: str) -> float:
+        return float(self.prices(ticker, np.array([time.time() * 1000]))[0])
+
+    def coincap_asset(self, asset_id: str, rank: int) -> dict:
+        _, ticker, _ = self.by_id[asset_id]
+        t = self.ticker_24h(ticker)
+        return {
+            "id": asset_id,
+            "rank": str(rank),
+            "symbol": ticker,
+            "name": asset_id.replace("-", " ").title(),
+            "priceUsd": t["lastPrice"],
+            "changePercent24Hr": t["priceChangePercent"],
+            "volumeUsd24Hr": t["quoteVolume"],
+            "marketCapUsd": str(float(t["lastPrice"]) * 1e7),
+        }
+
+
+def _pair_ticker(pair: str) -> Optional[str]:
+    pair = pair.upper()
+    if not pair.endswith("USDT"):
+        return None
+    ticker = pair[:-len("USDT")]
+    return ticker if ticker in market.by_ticker else None
+
+
+def _binance_error(message: str) -> JSONResponse:
+    return JSONResponse({"code": -1121, "msg": message}, status_code=400)
+
+
+market = SyntheticMarket(int(os.environ.get("LOADTEST_EXTRA_SYMBOLS", "0")))
+app = FastAPI(title="Fake upstream")
+
+
+@app.middleware("http")
+async def simulated_latency(request: Request, call_next):
+    if LATENCY_SECONDS:
+        await asyncio.sleep(LATENCY_SECONDS)
+    response = await call_next(request)
+    response.headers["x-mbx-used-weight-1m"] = "1"
+    return response
+
+
+# --- Binance --------------------------------------------------------------
+
+@app.get("/binance/api/v3/ping")
+async def binance_ping():
+    return {}
+
+
+@app.get("/binance/api/v3/exchangeInfo")
+async def binance_exchange_info():
+    return {
+        "symbols": [
+            {"symbol": f"{ticker}USDT", "baseAsset": ticker, "quoteAsset": "USDT", "status": "TRADING"}
+            for _, ticker, _ in market.assets
+        ]
+    }
+
+
+@app.get("/binance/api/v3/klines")
+async def binance_klines(
+    symbol: str,
+    interval: str = "1d",
+    limit: int = Query(default=500, le=1000),
+    startTime: Optional[int] = None
+):
+    ticker = _pair_ticker(symbol)
+    if ticker is None:
+        return _binance_error("Invalid symbol.")
+    if interval not in INTERVAL_MS:
+        return _binance_error("Invalid interval.")
+    return market.klines(ticker, interval, limit, startTime)
+
+
+def _selected(symbol: Optional[str], symbols: Optional[str]) -> Optional[List[str]]:
+    """Tickers named by ?symbol= / ?symbols=[...] (None = all)"""
+    if symbol:
+        return [_pair_ticker(symbol)]
+    if symbols:
+        return [_pair_ticker(s) for s in json.loads(symbols)]
+    return None
+
+
+@app.get("/binance/api/v3/ticker/price")
+async def binance_ticker_price(symbol: Optional[str] = None, symbols: Optional[str] = None):
+    tickers = _selected(symbol, symbols)
+    if tickers is not None and None in tickers:
+        return _binance_error("Invalid symbol.")
+    rows = [
+        {"symbol": f"{t}USDT", "price": f"{market.price_now(t):.8f}"}
+        for t in (tickers if tickers is not None else market.by_ticker)
+    ]
+    return rows[0] if symbol else rows
+
+
+@app.get("/binance/api/v3/ticker/24hr")
+async def binance_ticker_24h(symbol: Optional[str] = None, symbols: Optional[str] = None):
+    tickers = _selected(symbol, symbols)
+    if tickers is not None and None in tickers:
+        return _binance_error("Invalid symbol.")
+    rows = [market.ticker_24h(t) for t in (tickers if tickers is not None else market.by_ticker)]
+    return rows[0] if symbol else rows
+
+
+@app.get("/binance/api/v3/depth")
+async def binance_depth(symbol: str, limit: int = Query(default=100, le=5000)):
+    ticker = _pair_ticker(symbol)
+    if ticker is None:
+        return _binance_error("Invalid symbol.")
+    mid = market.price_now(ticker)
+    steps = np.arange(1, limit + 1)
+    qty = 0.5 + (np.sin(steps * 0.37 + market._seed(ticker)) + 1) * 2
+    return {
+        "lastUpdateId": int(time.time() * 1000),
+        "bids": [[f"{mid * (1 - s * 0.0001):.8f}", f"{q:.6f}"] for s, q in zip(steps, qty)],
+        "asks": [[f"{mid * (1 + s * 0.0001):.8f}", f"{q:.6f}"] for s, q in zip(steps, qty)],
+    }
+
+
+@app.get("/binance/api/v3/aggTrades")
+async def binance_agg_trades(symbol: str, fromId: Optional[int] = None, limit: int = Query(default=500, le=1000)):
+    ticker = _pair_ticker(symbol)
+    if ticker is None:
+        return _binance_error("Invalid symbol.")
+    # One trade every 250ms; the id is the trade's slot since the epoch
+    latest = int(time.time() * 1000) // 250
+    first = max(fromId, latest - limit + 1) if fromId is not None else latest - limit + 1
+    ids = np.arange(first, latest + 1)[:limit]
+    prices = market.prices(ticker, ids * 250)
+    qty = 0.01 + (np.sin(ids * 0.91 + market._seed(ticker)) + 1) * 0.5
+    return [
+        {"a": int(i), "p": f"{p:.8f}", "q": f"{q:.6f}", "T": int(i) * 250, "m": bool(i % 3 == 0)}
+        for i, p, q in zip(ids, prices, qty)
+    ]
+
+
+@app.websocket("/binance/ws/!miniTicker@arr")
+async def binance_mini_tickers(websocket: WebSocket):
+    await websocket.accept()
+    try:
+        while True:
+            await websocket.send_text(json.dumps([
+                {
+                    "e": "24hrMiniTicker", "s": t["symbol"], "c": t["lastPrice"],
+                    "o": t["openPrice"], "h": t["highPrice"], "l": t["lowPrice"],
+                    "v": t["volume"], "q": t["quoteVolume"]
+                }
+                for t in (market.ticker_24h(ticker) for ticker in market.by_ticker)
+            ]))
+            await asyncio.sleep(1)
+    except WebSocketDisconnect:
+        pass
+
+
+# --- CoinCap --------------------------------------------------------------
+
+@app.get("/coincap/v2/assets")
+async def coincap_assets(limit: int = 100):
+    return {"data": [market.coincap_asset(a[0], i + 1) for i, a in enumerate(market.assets[:limit])]}
+
+
+@app.get("/coincap/v2/assets/{asset_id}")
+async def coincap_asset(asset_id: str):
+    if asset_id not in market.by_id:
+        return JSONResponse({"error": f"{asset_id} not found"}, status_code=404)
+    rank = list(market.by_id).index(asset_id) + 1
+    return {"data": market.coincap_asset(asset_id, rank)}
+
+
+@app.get("/coincap/v2/assets/{asset_id}/history")
+async def coincap_history(asset_id: str, interval: str = "d1", start: int = 0, end: int = 0):
+    if asset_id not in market.by_id or interval not in COINCAP_INTERVALS:
+        return JSONResponse({"error": "bad request"}, status_code=400)
+    step = INTERVAL_MS[COINCAP_INTERVALS[interval]]
+    end = end or int(time.time() * 1000)
+    times = np.arange(start - start % step, end, step, dtype=np.int64)[-2000:]
+    prices = market.prices(market.by_id[asset_id][1], times)
+    return {"data": [{"priceUsd": f"{p:.8f}", "time": int(t)} for t, p in zip(times, prices)]}
+
+
+# --- Blockchains ----------------------------------------------------------
+
+def _height(block_seconds: int) -> int:
+    return int(time.time()) // block_seconds
+
+
+def _fake_transfers(height: int, count: int = 20) -> List[dict]:
+    """A few large transfers per block, one of them whale-sized"""
+    rng = np.random.default_rng(height)
+    amounts = rng.lognormal(mean=1.0, sigma=1.5, size=count)
+    amounts[0] = 500 + height % 1000
+    return [
+        {"hash": f"{height:x}{i:04x}", "from": f"0x{rng.integers(1 << 60):015x}",
+         "to": f"0x{rng.integers(1 << 60):015x}", "amount": float(a)}
+        for i, a in enumerate(amounts)
+    ]
+
+
+@app.get("/blockchain/latestblock")
+async def btc_latest_block():
+    return {"height": _height(600)}
+
+
+@app.get("/blockchain/block-height/{height}")
+async def btc_block(height: int):
+    return {"blocks": [{
+        "time": height * 600,
+        "tx": [
+            {
+                "hash": t["hash"],
+                "inputs": [{"prev_out": {"addr": t["from"]}}],
+                "out": [{"addr": t["to"], "value": int(t["amount"] * 100_000_000)}]
+            }
+            for t in _fake_transfers(height)
+        ]
+    }]}
+
+
+@app.get("/blockchain/unconfirmed-transactions")
+async def btc_mempool():
+    return {"txs": [
+        {"hash": t["hash"], "out": [{"addr": t["to"], "value": int(t["amount"] * 100_000_000)}]}
+        for t in _fake_transfers(int(time.time()), count=50)
+    ]}
+
+
+@app.post("/rpc/{chain}")
+async def evm_rpc(chain: str, request: Request):
+    payload = await request.json()
+    block_seconds = 12 if chain == "eth" else 3
+    method, params = payload.get("method"), payload.get("params", [])
+
+    if method == "eth_blockNumber":
+        result = hex(_height(block_seconds))
+    elif method == "eth_getBlockByNumber":
+        height = int(params[0], 16)
+        result = {
+            "number": params[0],
+            "timestamp": hex(height * block_seconds),
+            "transactions": [
+                {"hash": t["hash"], "from": t["from"], "to": t["to"], "value": hex(int(t["amount"] * 10**18))}
+                for t in _fake_transfers(height)
+            ]
+        }
+    else:
+        return {"jsonrpc": "2.0", "id": payload.get("id"), "error": {"code": -32601, "message": "Method not found"}}
+
+    return {"jsonrpc": "2.0", "id": payload.get("id"), "result": result}
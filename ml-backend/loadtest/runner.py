@@ -0,0 +1,465 @@
+"""
+Load Test Runner
+Starts the fake upstream and the app as subprocesses, drives a mix of
+WebSocket subscribers and REST traffic, and reports throughput, latency
+percentiles, broadcast delivery lag and server memory growth.
+
+Run from ml-backend/ with:  python -m loadtest --ws-clients 200 --rps 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+
+DEFAULT_SYMBOLS = "btc,eth,bnb,sol,xrp,ada,doge,dot,ltc,link"
+
+# name -> (method, path template); {symbol} is filled per request
+REST_ENDPOINTS = {
+    "health": ("GET", "/health"),
+    "coins": ("GET", "/api/v1/coins"),
+    "price": ("GET", "/api/v1/price/{symbol}"),
+    "signals": ("GET", "/api/v1/signals/{symbol}"),
+    "predict": ("GET", "/api/v1/predict/{symbol}?days=7"),
+    "alerts": ("GET", "/api/v1/alerts/{symbol}"),
+    "validate": ("POST", "/api/v1/validate-trade"),
+    "scanner": ("GET", "/api/v1/scanner"),
+    "whales": ("GET", "/api/v1/whales/{symbol}"),
+}
+
+DEFAULT_MIX = "price=4,signals=2,predict=1,alerts=1,validate=1,coins=1"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """"price=4,signals=2" -> {"price": 4.0, "signals": 2.0}"""
+    weights = {}
+    for part in mix.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in REST_ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(REST_ENDPOINTS)})")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process (Linux /proc; None elsewhere)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process, from every thread's children list"""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        pass
+    return children
+
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    """
+    Resident memory of a process and all its descendants, so a supervisor
+    running --workers > 1 reports its workers' memory, not just its own
+    """
+    total = rss_mb(pid)
+    if total is None:
+        return None
+    for child in child_pids(pid):
+        total += tree_rss_mb(child) or 0.0
+    return total
+
+
+def percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "max": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "p50": round(float(p50), 1),
+        "p95": round(float(p95), 1),
+        "p99": round(float(p99), 1),
+        "max": round(float(max(values)), 1),
+    }
+
+
+class ServerProcess:
+    """A uvicorn subprocess that is torn down with the run"""
+
+    def __init__(self, name: str, target: str, port: int, env: Dict[str, str], workers: int = 1):
+        self.name = name
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        command = [
+            sys.executable, "-m", "uvicorn", target,
+            "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning",
+        ]
+        if workers > 1:
+            command += ["--workers", str(workers)]
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            command, env={**os.environ, **env}, stdout=self.log, stderr=subprocess.STDOUT
+        )
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    async def wait_ready(self, path: str = "/health", timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    break
+                try:
+                    response = await client.get(f"{self.url}{path}", timeout=2)
+                    if response.status_code < 500:
+                        return
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"{self.name} did not start:\n{self.output()}")
+
+    def output(self) -> str:
+        self.log.seek(0)
+        return self.log.read().decode(errors="replace")[-4000:]
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.log.close()
+
+
+class LoadTest:
+    """One load-test run against a running app"""
+
+    def __init__(self, base_url: str, args: argparse.Namespace, server_pid: Optional[int] = None):
+        self.base_url = base_url
+        self.ws_url = base_url.replace("http://", "ws://", 1)
+        self.args = args
+        self.server_pid = server_pid
+        self.symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+        self.mix = parse_mix(args.mix)
+        self.rest_latency: Dict[str, List[float]] = {name: [] for name in self.mix}
+        self.rest_status: Dict[str, Dict[str, int]] = {name: {} for name in self.mix}
+        self.ws_connect_ms: List[float] = []
+        self.ws_lag_ms: List[float] = []
+        self.ws_messages = 0
+        self.ws_errors = 0
+        self.ws_connected = 0
+        self.memory: List[tuple] = []
+        self._measure_from = float("inf")
+        self._stop = asyncio.Event()
+
+    # --- WebSocket subscribers --------------------------------------------
+
+    async def subscriber(self, symbol: str, delay: float):
+        import websockets
+
+        await asyncio.sleep(delay)
+        started = time.perf_counter()
+        try:
+            async with websockets.connect(f"{self.ws_url}/ws/{symbol}", open_timeout=30) as ws:
+                self.ws_connect_ms.append((time.perf_counter() - started) * 1000)
+                self.ws_connected += 1
+                while not self._stop.is_set():
+                    try:
+                        message = await asyncio.wait_for(ws.recv(), timeout=1)
+                    except asyncio.TimeoutError:
+                        continue
+                    received = time.time()
+                    self.ws_messages += 1
+                    payload = json.loads(message)
+                    stamp = payload.get("timestamp")
+                    if stamp and not self._stop.is_set():
+                        # Payload timestamps are local time, same clock as ours
+                        sent = datetime.fromisoformat(stamp).timestamp()
+                        self.ws_lag_ms.append(max(0.0, received - sent) * 1000)
+        except Exception:
+            self.ws_errors += 1
+
+    # --- REST traffic -----------------------------------------------------
+
+    def _request(self, name: str) -> tuple:
+        method, path = REST_ENDPOINTS[name]
+        symbol = random.choice(self.symbols)
+        body = None
+        if name == "validate":
+            body = {"action": random.choice(["BUY", "SELL"]), "symbol": symbol}
+        return method, path.format(symbol=symbol), body
+
+    async def _one_request(self, client: httpx.AsyncClient, name: str, in_flight: asyncio.Semaphore):
+        method, path, body = self._request(name)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        finally:
+            in_flight.release()
+        # Only count requests issued inside the measured window
+        if self._measure_from <= started and not self._stop.is_set():
+            self.rest_latency[name].append((time.perf_counter() - started) * 1000)
+            counts = self.rest_status[name]
+            counts[status] = counts.get(status, 0) + 1
+
+    async def rest_traffic(self):
+        """Open-loop arrivals at the target rate (no coordinated omission)"""
+        if self.args.rps <= 0 or not self.mix:
+            return
+        names, weights = list(self.mix), list(self.mix.values())
+        in_flight = asyncio.Semaphore(self.args.max_in_flight)
+        interval = 1 / self.args.rps
+        tasks = set()
+
+        limits = httpx.Limits(max_connections=self.args.max_in_flight)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=30, limits=limits) as client:
+            next_at = time.perf_counter()
+            while not self._stop.is_set():
+                next_at += interval
+                if in_flight.locked():
+                    self.rest_status.setdefault("_dropped", {})
+                    self.rest_status["_dropped"]["client_saturated"] = (
+                        self.rest_status["_dropped"].get("client_saturated", 0) + 1
+                    )
+                else:
+                    await in_flight.acquire()
+                    name = random.choices(names, weights)[0]
+                    task = asyncio.create_task(self._one_request(client, name, in_flight))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+            if tasks:
+                await asyncio.wait(tasks, timeout=30)
+
+    # --- Memory sampling --------------------------------------------------
+
+    async def sample_memory(self):
+        if self.server_pid is None:
+            return
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            rss = tree_rss_mb(self.server_pid)
+            if rss is not None:
+                self.memory.append((round(time.perf_counter() - started, 1), rss))
+            await asyncio.sleep(1)
+
+    # --- Run --------------------------------------------------------------
+
+    async def run(self) -> Dict[str, Any]:
+        args = self.args
+        ramp = max(args.ramp, 0.0)
+        subscribers = [
+            asyncio.create_task(self.subscriber(
+                self.symbols[i % len(self.symbols)],
+                ramp * i / max(args.ws_clients, 1)
+            ))
+            for i in range(args.ws_clients)
+        ]
+        background = [
+            asyncio.create_task(self.rest_traffic()),
+            asyncio.create_task(self.sample_memory()),
+        ]
+
+        # Warm-up: let connections ramp and caches fill before measuring
+        await asyncio.sleep(ramp + args.warmup)
+        self._reset_measurements()
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        self._stop.set()
+        elapsed = time.perf_counter() - started
+
+        await asyncio.gather(*subscribers, *background, return_exceptions=True)
+        return self.report(elapsed)
+
+    def _reset_measurements(self):
+        for name in self.rest_latency:
+            self.rest_latency[name] = []
+            self.rest_status[name] = {}
+        self.rest_status.pop("_dropped", None)
+        self.ws_lag_ms = []
+        self.ws_messages = 0
+        self._measure_from = time.perf_counter()
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        all_latency = [v for values in self.rest_latency.values() for v in values]
+        ok = sum(
+            count for counts in self.rest_status.values()
+            for status, count in counts.items() if status.startswith("2")
+        )
+        memory = [rss for _, rss in self.memory]
+        return {
+            "config": {
+                "ws_clients": self.args.ws_clients,
+                "target_rps": self.args.rps,
+                "duration_seconds": self.args.duration,
+                "mix": self.mix,
+                "symbols": self.symbols,
+            },
+            "rest": {
+                "requests": len(all_latency),
+                "ok": ok,
+                "throughput_rps": round(len(all_latency) / elapsed, 1),
+                "latency_ms": percentiles(all_latency),
+                "by_endpoint": {
+                    name: {
+                        "requests": len(values),
+                        "status": self.rest_status[name],
+                        "latency_ms": percentiles(values),
+                    }
+                    for name, values in self.rest_latency.items()
+                },
+                "dropped": self.rest_status.get("_dropped", {}),
+            },
+            "websocket": {
+                "connected": self.ws_connected,
+                "errors": self.ws_errors,
+                "messages": self.ws_messages,
+                "messages_per_second": round(self.ws_messages / elapsed, 1),
+                "connect_ms": percentiles(self.ws_connect_ms),
+                "delivery_lag_ms": percentiles(self.ws_lag_ms),
+            },
+            "memory_mb": {
+                "start": round(memory[0], 1) if memory else None,
+                "peak": round(max(memory), 1) if memory else None,
+                "end": round(memory[-1], 1) if memory else None,
+                "growth": round(memory[-1] - memory[0], 1) if memory else None,
+                "samples": self.memory,
+            },
+        }
+
+
+def print_report(report: Dict[str, Any]):
+    rest, ws, memory = report["rest"], report["websocket"], report["memory_mb"]
+
+    def fmt(p: Dict[str, Optional[float]]) -> str:
+        if p["p50"] is None:
+            return "n/a"
+        return f"p50 {p['p50']}ms  p95 {p['p95']}ms  p99 {p['p99']}ms  max {p['max']}ms"
+
+    print("\n📈 Load test results")
+    print(f"  REST       {rest['requests']} requests, {rest['ok']} ok, {rest['throughput_rps']} req/s")
+    print(f"             {fmt(rest['latency_ms'])}")
+    for name, stats in rest["by_endpoint"].items():
+        print(f"    {name:<9}{stats['requests']:>6}  {fmt(stats['latency_ms'])}  {stats['status']}")
+    if rest["dropped"]:
+        print(f"  ⚠️  Client saturated, arrivals dropped: {rest['dropped']}")
+    print(f"  WebSocket  {ws['connected']} connected, {ws['errors']} errors, "
+          f"{ws['messages']} messages ({ws['messages_per_second']}/s)")
+    print(f"             connect {fmt(ws['connect_ms'])}")
+    print(f"             delivery lag {fmt(ws['delivery_lag_ms'])}")
+    if memory["start"] is not None:
+        print(f"  Memory     {memory['start']} MB -> {memory['end']} MB "
+              f"(peak {memory['peak']} MB, growth {memory['growth']:+} MB)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m loadtest",
+        description="Offline load test: fake upstream + app + simulated clients"
+    )
+    parser.add_argument("--ws-clients", type=int, default=100, help="WebSocket subscribers")
+    parser.add_argument("--rps", type=float, default=20, help="Target REST requests per second")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"REST endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--symbols", default=DEFAULT_SYMBOLS, help="Symbols to spread traffic over")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds after ramp-up")
+    parser.add_argument("--ramp", type=float, default=5, help="Seconds to open all WebSockets over")
+    parser.add_argument("--max-in-flight", type=int, default=200, help="Concurrent REST requests cap")
+    parser.add_argument("--workers", type=int, default=1, help="App worker processes")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0, help="Simulated upstream latency")
+    parser.add_argument("--extra-symbols", type=int, default=0, help="Extra synthetic listed pairs")
+    parser.add_argument("--keep-budgets", action="store_true",
+                        help="Keep real upstream rate-limit budgets (default: lift them)")
+    parser.add_argument("--target", help="Test an already running app at this URL instead")
+    parser.add_argument("--json", dest="json_path", help="Also write the report as JSON")
+    return parser
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.target:
+        return await LoadTest(args.target.rstrip("/"), args).run()
+
+    upstream = ServerProcess(
+        "fake upstream", "loadtest.fake_upstream:app", free_port(),
+        {
+            "LOADTEST_UPSTREAM_LATENCY_MS": str(args.upstream_latency_ms),
+            "LOADTEST_EXTRA_SYMBOLS": str(args.extra_symbols),
+        }
+    )
+    servers = [upstream]
+    try:
+        await upstream.wait_ready("/binance/api/v3/ping")
+        fake = upstream.url
+        env = {
+            "BINANCE_BASE_URL": f"{fake}/binance/api/v3",
+            "BINANCE_WS_URL": f"{fake.replace('http://', 'ws://')}/binance/ws",
+            "COINCAP_BASE_URL": f"{fake}/coincap/v2",
+            "BLOCKCHAIN_INFO_URL": f"{fake}/blockchain",
+            "ETH_RPC_URL": f"{fake}/rpc/eth",
+            "BSC_RPC_URL": f"{fake}/rpc/bsc",
+            "SYMBOLS_SNAPSHOT_PATH": os.path.join(tempfile.mkdtemp(), "symbols.json"),
+        }
+        if not args.keep_budgets:
+            env["BINANCE_WEIGHT_PER_MINUTE"] = str(10**9)
+            env["COINCAP_REQUESTS_PER_MINUTE"] = str(10**9)
+
+        app = ServerProcess("app", "app.main:app", free_port(), env, workers=args.workers)
+        servers.append(app)
+        await app.wait_ready()
+        print(f"🧪 Fake upstream at {upstream.url}, app at {app.url}")
+        return await LoadTest(app.url, args, server_pid=app.pid).run()
+    finally:
+        for server in reversed(servers):
+            server.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    try:
+        parse_mix(args.mix)
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
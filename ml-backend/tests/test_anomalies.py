@@ -0,0 +1,88 @@
+"""
+Live anomaly checks on closed and in-progress bars
+"""
+from datetime import datetime
+
+from app.providers.base import PriceData
+from app.services.anomalies import AnomalyMonitor, AnomalyState
+
+HOUR_MS = 3_600_000
+START_MS = 1_700_000_000_000 - 1_700_000_000_000 % HOUR_MS
+
+
+def candle(i: int, close: float = 100.0, volume: float = 10.0) -> PriceData:
+    return PriceData(
+        timestamp=datetime.fromtimestamp((START_MS + i * HOUR_MS) / 1000),
+        open=close, high=close, low=close, close=close, volume=volume
+    )
+
+
+def primed(bars: int = 25) -> AnomalyState:
+    state = AnomalyState()
+    for i in range(bars):
+        state.update(candle(i))
+    return state
+
+
+def types(alerts) -> list:
+    return [(a.type, a.should_pause) for a in alerts]
+
+
+def test_spike_is_raised_while_the_bar_is_in_progress():
+    state = primed()
+    bar_ms = START_MS + 25 * HOUR_MS
+
+    assert state.check(bar_ms, 103.0) == []
+    assert types(state.check(bar_ms, 106.0)) == [("VOLATILITY", False)]
+
+
+def test_each_alert_once_per_bar():
+    state = primed()
+    bar_ms = START_MS + 25 * HOUR_MS
+
+    assert types(state.check(bar_ms, 106.0)) == [("VOLATILITY", False)]
+    assert state.check(bar_ms, 107.0) == []
+    # Crossing the pause threshold is news
+    assert types(state.check(bar_ms, 111.0)) == [("VOLATILITY", True)]
+    assert state.check(bar_ms, 112.0) == []
+    # Nor again when the bar closes
+    assert state.update(candle(25, close=112.0)) == []
+    # The next bar starts afresh
+    assert types(state.check(bar_ms + HOUR_MS, 106.0)) == [("VOLATILITY", False)]
+
+
+def test_volume_spike_uses_the_closing_baseline():
+    state = primed()
+    bar_ms = START_MS + 25 * HOUR_MS
+
+    assert state.check(bar_ms, 100.0, volume=30.0) == []
+    assert types(state.check(bar_ms, 100.0, volume=40.0)) == [("WHALE", True)]
+    assert [a.type for a in state.update(candle(25, volume=40.0))] == []
+
+
+def test_closed_bar_alerts_match_without_live_checks():
+    state = primed()
+    alerts = state.update(candle(25, close=111.0, volume=40.0))
+    assert types(alerts) == [("VOLATILITY", True), ("WHALE", True)]
+
+
+def test_closed_bars_are_not_rechecked():
+    state = primed()
+    assert state.check(START_MS + 24 * HOUR_MS, 150.0) == []
+
+
+def test_ticks_push_alerts_for_the_current_bar():
+    monitor = AnomalyMonitor()
+    monitor._states["BTC"] = primed()
+    now_ms = START_MS + 25 * HOUR_MS + 60_000
+
+    monitor.on_tick("BTCUSDT", now_ms, 104.0)
+    monitor.on_tick("BTCUSDT", now_ms + 1000, 106.0)
+    monitor.on_tick("BTCUSDT", now_ms + 2000, 107.0)
+    # A bar whose predecessor hasn't been rolled up yet is skipped
+    monitor.on_tick("BTCUSDT", now_ms + HOUR_MS, 130.0)
+
+    alerts = monitor.recent("BTC")
+    assert len(alerts) == 1
+    assert alerts[0]["alert"]["type"] == "VOLATILITY"
+    assert alerts[0]["bar_closed"] is False
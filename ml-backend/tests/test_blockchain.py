@@ -0,0 +1,113 @@
+"""
+Whale scanners against the fake chain nodes from the load-test upstream
+"""
+import functools
+
+import httpx
+import pytest
+
+from app.blockchain import tracker as tracker_module
+from app.blockchain.tracker import BitcoinAdapter, BlockchainTracker, EvmRpcAdapter
+from app.services.prices import price_book
+from loadtest import fake_upstream
+
+MIN_USD = 1_000_000
+
+
+class Chain:
+    """Controls the fake nodes' tip"""
+
+    def __init__(self, height: int):
+        self.height = height
+
+    def __call__(self, block_seconds: int) -> int:
+        return self.height
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    tip = Chain(1000)
+    monkeypatch.setattr(fake_upstream, "_height", tip)
+    return tip
+
+
+@pytest.fixture
+async def client():
+    transport = httpx.ASGITransport(app=fake_upstream.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://fake") as c:
+        yield c
+
+
+def expected_whales(heights, price: float) -> set:
+    return {
+        t["hash"] for h in heights for t in fake_upstream._fake_transfers(h)
+        if t["amount"] * price >= MIN_USD
+    }
+
+
+@pytest.mark.parametrize("adapter", [
+    EvmRpcAdapter("ethereum", "ETH", "http://fake/rpc/eth"),
+    BitcoinAdapter("http://fake/blockchain"),
+], ids=["evm", "bitcoin"])
+async def test_scans_only_process_new_blocks(adapter, chain, client):
+    price = 3000.0
+
+    first = await adapter.scan(client, price, MIN_USD, 5, set())
+    assert (first["cursor"], first["new_blocks"]) == (1000, 5)
+    assert {w.tx_hash for w in adapter.recent} == expected_whales(range(996, 1001), price)
+
+    again = await adapter.scan(client, price, MIN_USD, 5, set())
+    assert (again["cursor"], again["new_blocks"], again["new_whales"]) == (1000, 0, 0)
+
+    chain.height = 1002
+    later = await adapter.scan(client, price, MIN_USD, 5, set())
+    assert (later["cursor"], later["new_blocks"]) == (1002, 2)
+    hashes = [w.tx_hash for w in adapter.recent]
+    assert len(hashes) == len(set(hashes))
+    assert set(hashes) == expected_whales(range(996, 1003), price)
+
+
+async def test_cursor_falls_back_to_max_blocks_after_a_long_gap(chain, client):
+    adapter = EvmRpcAdapter("bsc", "BNB", "http://fake/rpc/bsc")
+    await adapter.scan(client, 600.0, MIN_USD, 5, set())
+
+    chain.height = 2000
+    result = await adapter.scan(client, 600.0, MIN_USD, 5, set())
+    assert (result["cursor"], result["new_blocks"]) == (2000, 5)
+
+
+async def test_usd_values_use_the_price_book(chain, monkeypatch):
+    transport = httpx.ASGITransport(app=fake_upstream.app)
+    monkeypatch.setattr(tracker_module.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+    tracker = BlockchainTracker()
+    tracker.max_blocks_per_scan = 3
+    tracker.adapters["BTC"].base_url = "http://fake/blockchain"
+    tracker.adapters["ETH"].rpc_url = "http://fake/rpc/eth"
+    price_book.update("BTC", 60_000.0)
+    price_book.update("ETH", 2_500.0)
+
+    result = await tracker.scan_whales(["BTC", "ETH"], min_usd=MIN_USD)
+
+    for symbol, price in (("BTC", 60_000.0), ("ETH", 2_500.0)):
+        chain_out = result["chains"][symbol]
+        assert chain_out["price_usd"] == price
+        assert chain_out["whale_count"] == len(expected_whales(range(998, 1001), price))
+        for whale in chain_out["transactions"]:
+            assert whale["usd_value"] == pytest.approx(whale["amount"] * price)
+
+
+async def test_a_high_threshold_does_not_hide_smaller_whales(chain, monkeypatch):
+    transport = httpx.ASGITransport(app=fake_upstream.app)
+    monkeypatch.setattr(tracker_module.httpx, "AsyncClient", functools.partial(httpx.AsyncClient, transport=transport))
+    tracker = BlockchainTracker()
+    tracker.min_usd = MIN_USD
+    tracker.max_blocks_per_scan = 3
+    tracker.adapters["ETH"].rpc_url = "http://fake/rpc/eth"
+    price_book.update("ETH", 2_500.0)
+
+    high = await tracker.scan_whales(["ETH"], min_usd=5 * MIN_USD)
+    low = await tracker.scan_whales(["ETH"], min_usd=MIN_USD)
+
+    assert high["chains"]["ETH"]["whale_count"] < low["chains"]["ETH"]["whale_count"]
+    assert low["chains"]["ETH"]["whale_count"] == len(expected_whales(range(998, 1001), 2_500.0))
+    assert low["chains"]["ETH"]["new_blocks"] == 0
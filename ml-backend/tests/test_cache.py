@@ -0,0 +1,76 @@
+"""
+Memory-budgeted caches
+"""
+from app.cache import BudgetedCache, MemoryBudget, estimate_size
+
+
+def candles(n: int = 1000) -> list:
+    return [{"t": i, "o": 1.0, "h": 2.0, "l": 0.5, "c": 1.5, "v": 10.0} for i in range(n)]
+
+
+def test_entry_cap_evicts_oldest_write():
+    budget = MemoryBudget(1024 * 1024)
+    cache = BudgetedCache("negative", max_entries=3, budget=budget)
+    for key in "abcd":
+        cache[key] = True
+
+    assert len(cache) == 3
+    assert "a" not in cache
+    assert all(key in cache for key in "bcd")
+    assert cache.evictions == 1
+    assert budget.used == cache.bytes
+
+
+def test_junk_entries_cannot_flush_a_hot_entry():
+    history = candles()
+    budget = MemoryBudget(estimate_size(history) * 5)
+    provider = BudgetedCache("binance", budget=budget)
+    negative = BudgetedCache("symbols_negative", max_entries=1000, budget=budget)
+
+    provider["BTCUSDT:1h"] = history
+    for _ in range(50):
+        assert provider.get("BTCUSDT:1h") is history
+    provider["ETHUSDT:1h"] = candles()
+    provider["SOLUSDT:1h"] = candles()
+    # Uncapped, ~20k of these would flush the hot history (tiny entries outrank it)
+    for i in range(40_000):
+        negative[f"junk{i}"] = True
+
+    assert "BTCUSDT:1h" in provider
+    assert len(negative) == 1000
+
+
+def test_budget_evicts_cold_large_entries_first():
+    history = candles()
+    budget = MemoryBudget(estimate_size(history) * 8)
+    cache = BudgetedCache("binance", budget=budget)
+
+    cache["hot"] = candles()
+    for _ in range(10):
+        cache.get("hot")
+    for i in range(12):
+        cache[f"cold{i}"] = candles()
+
+    assert "hot" in cache
+    assert cache.evictions > 0
+    assert budget.used <= budget.max_bytes
+    assert budget.used == cache.bytes
+
+
+def test_expired_entries_stay_readable_with_keep_stale():
+    budget = MemoryBudget(1024 * 1024)
+    cache = BudgetedCache("binance", ttl=0, keep_stale=True, budget=budget)
+    cache["price"] = 1.0
+
+    assert cache.get("price") is None
+    assert cache.get_stale("price") == 1.0
+
+
+def test_oversized_entries_are_rejected():
+    budget = MemoryBudget(10_000)
+    cache = BudgetedCache("forecasts", budget=budget)
+    cache["big"] = candles()
+
+    assert "big" not in cache
+    assert cache.rejected == 1
+    assert budget.used == 0
@@ -0,0 +1,106 @@
+"""
+Rolling return correlations
+"""
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.correlations import CorrelationEngine, ReturnWindow
+
+HOUR_MS = 3_600_000
+
+
+def returns(bars: int, symbols: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    common = rng.normal(size=(bars, 1))
+    return 0.01 * (common * rng.uniform(0, 1, size=symbols) + rng.normal(size=(bars, symbols)))
+
+
+def test_pushes_match_corrcoef_once_the_ring_wraps():
+    data = returns(500, 6)
+    window = ReturnWindow([f"S{i}" for i in range(6)], window=120)
+    for i, row in enumerate(data):
+        window.push(row)
+        if i >= 1 and i % 37 == 0:
+            expected = np.corrcoef(data[max(0, i - 119):i + 1].T)
+            assert np.allclose(window.correlation(), expected, atol=1e-9)
+
+    assert window.bars == 120
+    assert np.allclose(window.correlation(), np.corrcoef(data[-120:].T), atol=1e-9)
+
+
+def test_load_then_push_matches_corrcoef():
+    data = returns(300, 4, seed=1)
+    window = ReturnWindow(list("ABCD"), window=100)
+    window.load(data[:250])
+    for row in data[250:]:
+        window.push(row)
+    assert np.allclose(window.correlation(), np.corrcoef(data[-100:].T), atol=1e-9)
+
+
+def test_covariance_matches_numpy():
+    data = returns(50, 3, seed=2)
+    window = ReturnWindow(list("ABC"), window=50)
+    window.load(data)
+    assert np.allclose(window.covariance(), np.cov(data.T))
+
+
+@pytest.mark.parametrize("flat", [0.0, 0.0013])
+def test_flat_symbol_has_no_correlation(flat):
+    data = returns(80, 3, seed=3)
+    data[:, 1] = flat
+    window = ReturnWindow(list("ABC"), window=60)
+    for row in data:
+        window.push(row)
+
+    corr = window.correlation()
+    assert np.isnan(corr[1]).all() and np.isnan(corr[:, 1]).all()
+    assert corr[0, 2] == pytest.approx(np.corrcoef(data[-60:, 0], data[-60:, 2])[0, 1])
+
+
+def test_too_few_bars_is_nan():
+    window = ReturnWindow(list("AB"), window=10)
+    window.push(np.array([0.01, 0.02]))
+    assert np.isnan(window.correlation()).all()
+
+
+class Market:
+    """Hourly closes for a few pairs whose volume ranking can be reshuffled"""
+
+    def __init__(self, pairs):
+        self.volumes = {p: float(v) for v, p in enumerate(reversed(pairs), 1)}
+        self.now_ms = 1_700_000_000_000 // HOUR_MS * HOUR_MS + 60_000
+
+    async def get_24h_tickers(self):
+        return [{"symbol": p, "lastPrice": "1", "quoteVolume": str(v)} for p, v in self.volumes.items()]
+
+    async def get_klines(self, pair, interval, limit):
+        rng = np.random.default_rng(sum(map(ord, pair)))
+        last = self.now_ms // HOUR_MS * HOUR_MS
+        opens = last - HOUR_MS * np.arange(limit - 1, -1, -1)
+        return [
+            SimpleNamespace(timestamp=datetime.fromtimestamp(t / 1000), close=100 + rng.normal() + t / HOUR_MS % 7)
+            for t in opens
+        ]
+
+
+async def test_volume_reshuffles_keep_the_incremental_path():
+    market = Market(["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+    engine = CorrelationEngine(market)
+    engine.window_size = 24
+    await engine.refresh()
+    window = engine.window
+    assert window.symbols == ["BTC", "ETH", "SOL"]
+
+    market.volumes["SOLUSDT"] = 1e9
+    market.now_ms += HOUR_MS
+    await engine.refresh()
+    assert engine.window is window
+
+    market.volumes["ADAUSDT"] = 2e9
+    market.now_ms += HOUR_MS
+    await engine.refresh()
+    assert engine.window is not window
+    assert engine.window.symbols == ["ADA", "BTC", "ETH", "SOL"]
@@ -0,0 +1,141 @@
+"""
+Request deadlines: 504s, cancellation, client disconnects and streaming
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.api.middleware import DeadlineMiddleware, deadline_stats
+from app.providers.scheduler import request_deadline
+
+DEADLINE = 0.2
+
+
+class Handler:
+    """Records how the slow endpoint ended"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.deadline = None
+
+
+@pytest.fixture
+def handler():
+    return Handler()
+
+
+@pytest.fixture
+def app(handler):
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, default_seconds=DEADLINE, overrides={"/patient": 5.0})
+
+    @app.get("/fast")
+    async def fast():
+        handler.deadline = request_deadline.get()
+        return {"ok": True}
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            handler.cancelled = True
+            raise
+        return {"ok": True}
+
+    @app.get("/patient")
+    async def patient():
+        await asyncio.sleep(2 * DEADLINE)
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(4):
+                await asyncio.sleep(DEADLINE / 2)
+                yield f"{i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+
+async def test_fast_requests_see_their_deadline(client, handler):
+    before = time.monotonic()
+    response = await client.get("/fast")
+
+    assert response.status_code == 200
+    assert before < handler.deadline <= time.monotonic() + DEADLINE
+    assert request_deadline.get() is None
+
+
+async def test_deadline_before_the_response_is_a_504(client, handler):
+    timed_out = deadline_stats["timed_out"]
+    started = time.monotonic()
+    response = await client.get("/slow")
+
+    assert response.status_code == 504
+    assert "deadline" in response.json()["detail"]
+    assert time.monotonic() - started < 2
+    assert handler.cancelled
+    assert deadline_stats["timed_out"] == timed_out + 1
+
+
+async def test_overrides_extend_the_budget(client):
+    response = await client.get("/patient")
+    assert response.status_code == 200
+
+
+async def test_streaming_response_outlives_the_deadline(client):
+    timed_out = deadline_stats["timed_out"]
+    response = await client.get("/stream")
+
+    assert response.status_code == 200
+    assert response.text == "0\n1\n2\n3\n"
+    assert deadline_stats["timed_out"] == timed_out
+
+
+async def test_client_disconnect_cancels_the_handler():
+    cancelled = asyncio.Event()
+    sent = []
+
+    async def inner(scope, receive, send):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    gone = asyncio.Event()
+    request = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if request:
+            return request.pop()
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = DeadlineMiddleware(inner, default_seconds=5.0)
+    scope = {"type": "http", "path": "/slow", "method": "GET", "headers": []}
+    disconnected = deadline_stats["client_disconnected"]
+
+    call = asyncio.create_task(middleware(scope, receive, send))
+    await asyncio.sleep(0.05)
+    gone.set()
+    await asyncio.wait_for(call, 1)
+
+    assert cancelled.is_set()
+    assert sent == []  # No 504 to a client that has left
+    assert deadline_stats["client_disconnected"] == disconnected + 1
@@ -0,0 +1,60 @@
+"""
+Order book maintenance: failed syncs, LRU cap
+"""
+import asyncio
+
+from app.services.orderbook import OrderBookMaintainer
+
+
+class Provider:
+    """Depth snapshots that fail, hang or succeed"""
+
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.fail = fail
+        self.delay = delay
+
+    async def get_order_book(self, symbol, limit=1000):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return {"lastUpdateId": 1, "bids": [["99.0", "1.0"]], "asks": [["101.0", "1.0"]]}
+
+
+def maintainer(provider: Provider) -> OrderBookMaintainer:
+    books = OrderBookMaintainer(provider)
+    books.ws_url = "ws://127.0.0.1:9"  # Nothing listens: snapshots only
+    return books
+
+
+async def test_failed_sync_does_not_hold_waiters_for_the_timeout():
+    books = maintainer(Provider(fail=True))
+    try:
+        started = asyncio.get_running_loop().time()
+        assert await books.track("BTCUSDT", timeout=5.0) is None
+        assert asyncio.get_running_loop().time() - started < 2.0
+    finally:
+        await books.stop()
+
+
+async def test_snapshot_sync_returns_the_book():
+    books = maintainer(Provider())
+    try:
+        book = await books.track("BTCUSDT", timeout=5.0)
+        assert book is not None and book.synced
+    finally:
+        await books.stop()
+
+
+async def test_least_recently_used_book_is_dropped():
+    books = maintainer(Provider(delay=10))
+    books.max_symbols = 2
+    try:
+        waiters = [asyncio.create_task(books.track(s, timeout=5.0)) for s in ("BTCUSDT", "ETHUSDT")]
+        await asyncio.sleep(0)
+        await books.track("SOLUSDT", timeout=0.01)
+
+        assert sorted(books._tasks) == ["ETHUSDT", "SOLUSDT"]
+        # The evicted book's waiter is released, not left hanging
+        assert await asyncio.wait_for(waiters[0], 1.0) is None
+    finally:
+        await books.stop()
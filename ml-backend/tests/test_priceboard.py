@@ -0,0 +1,107 @@
+"""
+Shared-memory price board: seqlock reads and collector restarts
+"""
+import time
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import priceboard
+from app.services.priceboard import PriceBoard, PriceBoardWriter
+
+
+@pytest.fixture(autouse=True)
+def same_process(monkeypatch):
+    # Readers drop the region from the resource tracker so they never unlink it;
+    # here the writer shares their process and still has to unlink it itself
+    monkeypatch.setattr(priceboard, "resource_tracker", SimpleNamespace(unregister=lambda *args: None))
+
+
+@pytest.fixture
+def name():
+    return f"pbtest_{uuid.uuid4().hex[:8]}"
+
+
+def quote(price: float, updated_at: float = None) -> dict:
+    return {"price": price, "open_24h": price, "updated_at": time.time() if updated_at is None else updated_at}
+
+
+def test_reader_sees_what_the_writer_wrote(name):
+    writer = PriceBoardWriter(name, capacity=4)
+    reader = PriceBoard(name, max_age_seconds=60)
+    try:
+        assert reader.read("BTCUSDT") is None
+        writer.write("BTCUSDT", **quote(65_000.0))
+        writer.write("ETHUSDT", **quote(3_200.0))
+
+        assert reader.read("btcusdt")["price"] == 65_000.0
+        assert reader.read("ETHUSDT")["price"] == 3_200.0
+        assert sorted(reader.symbols()) == ["BTCUSDT", "ETHUSDT"]
+
+        writer.write("BTCUSDT", **quote(66_000.0))
+        assert reader.read("BTCUSDT")["price"] == 66_000.0
+    finally:
+        reader._detach()
+        writer.close()
+
+
+def test_full_board_rejects_new_symbols(name):
+    writer = PriceBoardWriter(name, capacity=1)
+    try:
+        assert writer.write("BTCUSDT", **quote(1.0))
+        assert not writer.write("ETHUSDT", **quote(1.0))
+    finally:
+        writer.close()
+
+
+def test_reads_skip_records_mid_write_and_stale_ones(name):
+    writer = PriceBoardWriter(name, capacity=2)
+    reader = PriceBoard(name, max_age_seconds=60)
+    try:
+        writer.write("BTCUSDT", **quote(1.0))
+        writer.write("ETHUSDT", **quote(1.0, updated_at=time.time() - 120))
+        writer.records["seq"][0] += 1  # Writer "crashed" mid-update
+
+        assert reader.read("BTCUSDT") is None
+        assert reader.read("ETHUSDT") is None
+    finally:
+        reader._detach()
+        writer.close()
+
+
+def test_reader_follows_a_restarted_collector(name):
+    first = PriceBoardWriter(name, capacity=4)
+    reader = PriceBoard(name, max_age_seconds=60)
+    first.write("BTCUSDT", **quote(65_000.0))
+    assert reader.read("BTCUSDT")["price"] == 65_000.0
+    first.close()
+
+    second = PriceBoardWriter(name, capacity=4)
+    try:
+        second.write("ETHUSDT", **quote(3_200.0))
+        second.write("BTCUSDT", **quote(70_000.0))
+        assert reader.read("BTCUSDT")["price"] == 70_000.0
+        assert reader.read("ETHUSDT")["price"] == 3_200.0
+    finally:
+        reader._detach()
+        second.close()
+
+
+def test_reader_follows_a_collector_that_replaced_a_crashed_one(name):
+    crashed = PriceBoardWriter(name, capacity=4)
+    reader = PriceBoard(name, max_age_seconds=60)
+    crashed.write("BTCUSDT", **quote(65_000.0, updated_at=time.time() - 120))
+    assert reader.read("BTCUSDT") is None
+
+    # No close(): the new collector unlinks the leftover region and creates its own
+    replacement = PriceBoardWriter(name, capacity=4)
+    try:
+        replacement.write("BTCUSDT", **quote(70_000.0))
+        reader._next_check = 0.0
+        assert reader.read("BTCUSDT")["price"] == 70_000.0
+    finally:
+        reader._detach()
+        replacement.close()
+        del crashed.header, crashed.names, crashed.records
+        crashed.shm.close()
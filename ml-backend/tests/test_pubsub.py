@@ -0,0 +1,168 @@
+"""
+WebSocket fan-out over the in-process broker
+"""
+import asyncio
+
+from app.services.pubsub import LocalBroker
+from app.services.websocket import ConnectionManager
+
+
+class FakeWebSocket:
+    """Records what it is sent; optionally slow or broken"""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False, on_send=None):
+        self.sent = []
+        self.closed = False
+        self.delay = delay
+        self.fail = fail
+        self.on_send = on_send
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data: dict):
+        if self.on_send is not None:
+            await self.on_send()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000):
+        self.closed = True
+
+
+def make_manager() -> ConnectionManager:
+    manager = ConnectionManager(LocalBroker())
+    manager.send_timeout = 0.1
+    return manager
+
+
+async def test_publish_fans_out_to_every_client():
+    manager = make_manager()
+    clients = [FakeWebSocket() for _ in range(3)]
+    for client in clients:
+        await manager.connect(client, "BTC")
+    other = FakeWebSocket()
+    await manager.connect(other, "ETH")
+
+    await manager.publish("BTC", {"price": 100.0})
+
+    assert all(client.sent == [{"price": 100.0}] for client in clients)
+    assert other.sent == []
+
+
+async def test_new_client_gets_last_update():
+    manager = make_manager()
+    await manager.connect(FakeWebSocket(), "BTC")
+    await manager.publish("BTC", {"price": 100.0})
+
+    late = FakeWebSocket()
+    await manager.connect(late, "BTC")
+
+    assert late.sent == [{"price": 100.0}]
+
+
+async def test_relay_continues_after_disconnect():
+    manager = make_manager()
+    staying, leaving = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(staying, "BTC")
+    await manager.connect(leaving, "BTC")
+
+    await manager.disconnect(leaving, "BTC")
+    await manager.publish("BTC", {"price": 1.0})
+
+    assert staying.sent == [{"price": 1.0}]
+    assert leaving.sent == []
+
+
+async def test_last_disconnect_unsubscribes():
+    manager = make_manager()
+    client = FakeWebSocket()
+    await manager.connect(client, "BTC")
+    await manager.disconnect(client, "BTC")
+
+    assert "BTC" not in manager.active_connections
+    assert manager.channel("BTC") not in manager.broker._handlers
+    await manager.publish("BTC", {"price": 1.0})
+    assert client.sent == []
+
+
+async def test_slow_and_dead_clients_are_dropped():
+    manager = make_manager()
+    healthy = FakeWebSocket()
+    slow = FakeWebSocket(delay=1.0)
+    dead = FakeWebSocket(fail=True)
+    for client in (healthy, slow, dead):
+        await manager.connect(client, "BTC")
+
+    started = asyncio.get_running_loop().time()
+    await manager.publish("BTC", {"price": 1.0})
+
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert healthy.sent == [{"price": 1.0}]
+    assert manager.active_connections["BTC"] == {healthy}
+    assert slow.closed and dead.closed
+
+
+async def test_dropping_the_last_client_unsubscribes():
+    manager = make_manager()
+    await manager.connect(FakeWebSocket(fail=True), "BTC")
+
+    await manager.publish("BTC", {"price": 1.0})
+
+    assert "BTC" not in manager.active_connections
+    assert manager.channel("BTC") not in manager.broker._handlers
+
+
+async def test_clients_joining_during_a_broadcast():
+    manager = make_manager()
+    joiner = FakeWebSocket()
+
+    async def join():
+        if joiner not in manager.active_connections["BTC"]:
+            await manager.connect(joiner, "BTC")
+
+    first, second = FakeWebSocket(on_send=join), FakeWebSocket()
+    await manager.connect(first, "BTC")
+    await manager.connect(second, "BTC")
+
+    await manager.publish("BTC", {"price": 1.0})
+
+    assert first.sent == [{"price": 1.0}]
+    assert second.sent == [{"price": 1.0}]
+    assert joiner in manager.active_connections["BTC"]
+
+
+async def test_lease_is_exclusive_until_released():
+    broker = LocalBroker()
+
+    assert await broker.acquire_lease("ws-lease:BTC", "a", 10)
+    assert not await broker.acquire_lease("ws-lease:BTC", "b", 10)
+    assert await broker.acquire_lease("ws-lease:BTC", "a", 10)  # Renewal
+
+    await broker.release_lease("ws-lease:BTC", "b")  # Not the owner: no effect
+    assert not await broker.acquire_lease("ws-lease:BTC", "b", 10)
+
+    await broker.release_lease("ws-lease:BTC", "a")
+    assert await broker.acquire_lease("ws-lease:BTC", "b", 10)
+    assert not await broker.acquire_lease("ws-lease:BTC", "a", 10)
+
+
+async def test_expired_lease_is_taken_over():
+    broker = LocalBroker()
+
+    assert await broker.acquire_lease("ws-lease:BTC", "a", 0.05)
+    assert not await broker.acquire_lease("ws-lease:BTC", "b", 0.05)
+    await asyncio.sleep(0.06)
+
+    assert await broker.acquire_lease("ws-lease:BTC", "b", 10)
+    assert not await broker.acquire_lease("ws-lease:BTC", "a", 10)
+
+
+async def test_leases_are_per_key():
+    broker = LocalBroker()
+
+    assert await broker.acquire_lease("ws-lease:BTC", "a", 10)
+    assert await broker.acquire_lease("ws-lease:ETH", "b", 10)
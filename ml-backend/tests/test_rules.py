@@ -0,0 +1,189 @@
+"""
+Price alert rules: crossing indexes, change windows and sharing across workers
+"""
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services import rules as rules_module
+from app.services.pubsub import LocalBroker
+from app.services.rules import ChangeTracker, CrossingIndex, RulesEngine
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    async def resolve(query):
+        return SimpleNamespace(symbol=query.upper(), binance=f"{query.upper()}USDT")
+
+    async def keep_feed(self, pair):
+        pass
+
+    monkeypatch.setattr(rules_module.symbol_resolver, "resolve", resolve)
+    monkeypatch.setattr(RulesEngine, "_keep_feed", keep_feed)
+
+
+async def workers(count: int = 2):
+    broker = LocalBroker()
+    engines = [RulesEngine(broker) for _ in range(count)]
+    for engine in engines:
+        await engine._load()
+    return engines
+
+
+async def settle():
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+async def test_rules_are_visible_on_every_worker():
+    first, second = await workers()
+    added = await first.add("alice", [{"symbol": "btc", "condition": "crosses_above", "value": 70_000}])
+
+    assert [r["id"] for r in second.rules("alice")] == [added[0].id]
+    assert await second.remove(added[0].id, "alice")
+    assert first.rules("alice") == []
+    assert not await first.remove(added[0].id, "alice")
+
+
+async def test_only_the_owner_can_remove():
+    first, second = await workers()
+    added = await first.add("alice", [{"symbol": "btc", "condition": "crosses_above", "value": 70_000}])
+
+    assert not await second.remove(added[0].id, "bob")
+    assert len(first.rules("alice")) == 1
+
+
+async def test_rule_symbols_stay_within_the_trade_stream_cap(monkeypatch):
+    monkeypatch.setattr(rules_module.trade_streams, "max_symbols", 2)
+    first, = await workers(1)
+    await first.add("alice", [
+        {"symbol": "btc", "condition": "crosses_above", "value": 1},
+        {"symbol": "eth", "condition": "crosses_above", "value": 1},
+    ])
+
+    with pytest.raises(ValueError):
+        await first.add("bob", [{"symbol": "sol", "condition": "crosses_above", "value": 1}])
+    # Symbols that already have rules take more
+    await first.add("bob", [{"symbol": "btc", "condition": "crosses_below", "value": 1}])
+    assert len(first.rules("bob")) == 1
+
+
+async def test_late_worker_loads_stored_rules():
+    broker = LocalBroker()
+    first = RulesEngine(broker)
+    await first._load()
+    await first.add("alice", [{"symbol": "eth", "condition": "crosses_below", "value": 3000}])
+
+    late = RulesEngine(broker)
+    await late._load()
+    assert [r["symbol"] for r in late.rules("alice")] == ["ETH"]
+
+
+async def test_only_the_evaluator_triggers():
+    first, second = await workers()
+    sent = []
+
+    async def broadcast(key, data):
+        sent.append((key, data))
+
+    first.set_broadcaster(broadcast)
+    second.set_broadcaster(broadcast)
+    await first.add("alice", [{"symbol": "btc", "condition": "crosses_above", "value": 100}])
+    first.evaluating = True
+
+    for engine in (first, second):
+        engine.on_tick("BTCUSDT", 1_000, 99.0)
+        engine.on_tick("BTCUSDT", 2_000, 101.0)
+    await settle()
+
+    assert [key for key, _ in sent] == ["rules:alice"]
+    # A one-shot rule is gone everywhere once it fires
+    assert first.rules("alice") == second.rules("alice") == []
+    history = await second.recent("alice")
+    assert history[0]["trigger_price"] == 101.0
+
+
+async def test_repeat_rules_keep_their_trigger_count():
+    first, second = await workers()
+    await first.add("alice", [{"symbol": "btc", "condition": "crosses_above", "value": 100, "repeat": True}])
+    first.evaluating = True
+
+    for price in (99.0, 101.0, 99.0, 101.0):
+        first.on_tick("BTCUSDT", 1_000, price)
+    await settle()
+
+    assert second.rules("alice")[0]["triggered"] == 2
+    late = RulesEngine(first.broker)
+    await late._load()
+    assert late.rules("alice")[0]["triggered"] == 2
+    assert len(await late.recent("alice")) == 2
+
+
+def brute_crossed(levels, previous: float, current: float) -> list:
+    """Reference: every (level, id, upward) the move passes through"""
+    if current > previous:
+        return sorted(i for level, i, up in levels if up and previous < level <= current)
+    if current < previous:
+        return sorted(i for level, i, up in levels if not up and current <= level < previous)
+    return []
+
+
+def test_crossing_index_matches_brute_force():
+    rng = np.random.default_rng(7)
+    index = CrossingIndex()
+    levels = []
+    for rule_id in range(300):
+        level = float(rng.choice([100.0, 101.0, 102.5])) if rule_id % 5 == 0 else float(rng.uniform(90, 110))
+        upward = bool(rng.integers(2))
+        index.add(level, rule_id, upward)
+        levels.append((level, rule_id, upward))
+    for level, rule_id, upward in levels[::3]:
+        index.remove(level, rule_id, upward)
+    levels = [entry for n, entry in enumerate(levels) if n % 3]
+
+    assert len(index) == len(levels)
+    prices = np.concatenate([rng.uniform(88, 112, size=500), [100.0, 101.0, 101.0, 100.0, 102.5]])
+    for previous, current in zip(prices[:-1], prices[1:]):
+        assert sorted(index.crossed(previous, current)) == brute_crossed(levels, previous, current)
+
+
+def test_crossing_index_boundaries():
+    index = CrossingIndex()
+    index.add(100.0, 1, upward=True)
+    index.add(100.0, 2, upward=False)
+
+    # Touching the level from below fires the upward rule; leaving it upward doesn't re-fire
+    assert index.crossed(99.0, 100.0) == [1]
+    assert index.crossed(100.0, 101.0) == []
+    assert index.crossed(101.0, 100.0) == [2]
+    assert index.crossed(100.0, 99.0) == []
+    assert index.crossed(100.0, 100.0) == []
+
+
+def test_change_tracker_needs_a_full_window():
+    tracker = ChangeTracker(60)
+    assert tracker.update(1000.0, 100.0) is None
+    assert tracker.update(1030.0, 105.0) is None
+    assert tracker.update(1060.0, 110.0) == pytest.approx(10.0)
+    # The reference moves forward with time
+    assert tracker.update(1090.0, 110.0) == pytest.approx(110 / 105 * 100 - 100)
+
+
+def test_change_tracker_keeps_one_tick_per_second():
+    tracker = ChangeTracker(10)
+    for i in range(100):
+        tracker.update(1000.0 + i / 10, 100.0 + i)
+    assert len(tracker.ticks) == 10
+    assert tracker.ticks[-1][1] == 199.0
+
+
+def test_change_tracker_seed_fills_older_history():
+    tracker = ChangeTracker(3600)
+    tracker.update(10_000.0, 100.0)
+    tracker.seed([(10_000.0 - 3600 - 60 * i, 80.0) for i in range(3, -1, -1)] + [(10_000.0, 1.0)])
+
+    # The seed never overwrites live ticks
+    assert tracker.ticks[-1] == (10_000.0, 100.0)
+    assert tracker.update(10_001.0, 100.0) == pytest.approx(25.0)
@@ -0,0 +1,61 @@
+"""
+Market scanner with configurable strategies
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.signals import SignalGenerator
+from app.models.strategy import IndicatorSpec, RiskSpec, StrategySpec
+from app.providers.base import PriceData
+from app.services.scanner import MarketScanner
+
+
+class Market:
+    """Tickers and daily klines for a few pairs"""
+
+    def __init__(self, pairs=("BTCUSDT", "ETHUSDT", "SOLUSDT"), days: int = 120):
+        rng = np.random.default_rng(1)
+        self.closes = {p: 100 * np.exp(np.cumsum(rng.normal(0, 0.03, size=days))) for p in pairs}
+        self.limits = []
+
+    async def get_24h_tickers(self):
+        return [
+            {"symbol": p, "lastPrice": str(c[-1]), "quoteVolume": str(1e6 * (i + 1)), "priceChangePercent": "1.0"}
+            for i, (p, c) in enumerate(self.closes.items())
+        ]
+
+    async def get_klines(self, pair, interval="1d", limit=500):
+        self.limits.append(limit)
+        start = datetime(2024, 1, 1)
+        return [
+            PriceData(timestamp=start + timedelta(days=i), open=c, high=c, low=c, close=c, volume=10.0)
+            for i, c in enumerate(self.closes[pair][-limit:])
+        ]
+
+
+async def test_default_scan_scores_every_pair():
+    market = Market()
+    scanner = MarketScanner(market, SignalGenerator())
+    stats = await scanner.scan_once()
+
+    assert stats["symbols_scanned"] == 3
+    assert set(market.limits) == {30}
+
+
+async def test_long_windows_and_another_risk_indicator():
+    strategy = StrategySpec(
+        min_periods=90,
+        indicators=[
+            IndicatorSpec(type="trend", params={"short": 20, "long": 80}, weight=0.5),
+            IndicatorSpec(type="momentum", params={"lookback": 60}, weight=0.5),
+        ],
+        risk=RiskSpec(indicator="momentum", high=0.8, medium=0.4),
+    )
+    market = Market()
+    scanner = MarketScanner(market, SignalGenerator(strategy))
+    stats = await scanner.scan_once()
+
+    assert stats["symbols_scanned"] == 3
+    assert set(market.limits) == {90}
+    assert all(r["risk_level"] in ("LOW", "MEDIUM", "HIGH") for r in scanner.results)
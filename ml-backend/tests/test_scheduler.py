@@ -0,0 +1,198 @@
+"""
+Upstream budgets: token buckets, priority admission and deadlines, on a fake clock
+"""
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.providers import scheduler as scheduler_module
+from app.providers.scheduler import (
+    BudgetExceeded, DeadlineExceeded, Priority, TokenBucket, UpstreamScheduler,
+    deadline_share, hop_timeout, request_deadline, request_priority, time_left
+)
+
+
+class Clock:
+    """Monotonic time that only moves when told to"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Only the scheduler's clock: the event loop keeps real time
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+@pytest.fixture
+def deadline(clock):
+    """Give the test an interactive request deadline `seconds` from now"""
+    tokens = []
+
+    def set_deadline(seconds: float):
+        tokens.append(request_deadline.set(clock() + seconds))
+
+    yield set_deadline
+    for token in reversed(tokens):
+        request_deadline.reset(token)
+
+
+def binance(scheduler: UpstreamScheduler) -> TokenBucket:
+    return scheduler._buckets["binance"]
+
+
+async def wake(scheduler: UpstreamScheduler, provider: str = "binance"):
+    """Let queued requests re-check their buckets after the clock moved"""
+    condition = scheduler._conditions[provider]
+    async with condition:
+        condition.notify_all()
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_bucket_refills_continuously_up_to_capacity(clock):
+    bucket = TokenBucket(60, per_seconds=60)
+    bucket.take(60)
+    assert bucket.available() == 0
+    assert bucket.time_until(10) == pytest.approx(10)
+
+    clock.advance(30)
+    assert bucket.available() == pytest.approx(30)
+    clock.advance(1000)
+    assert bucket.available() == 60
+
+
+def test_block_holds_the_bucket_until_it_expires(clock):
+    bucket = TokenBucket(60, per_seconds=60)
+    bucket.block(30)
+    assert bucket.available() <= 0
+    assert bucket.time_until(1) == pytest.approx(30)
+
+    clock.advance(30)
+    assert bucket.time_until(1) == 0
+
+
+def test_observe_syncs_with_reported_weight(clock):
+    scheduler = UpstreamScheduler()
+    bucket = binance(scheduler)
+    scheduler.observe("binance", httpx.Response(200, headers={"x-mbx-used-weight-1m": "5000"}))
+    assert bucket.available() == pytest.approx(bucket.capacity - 5000)
+
+    # Lower reported usage never hands out extra tokens
+    scheduler.observe("binance", httpx.Response(200, headers={"x-mbx-used-weight-1m": "10"}))
+    assert bucket.available() == pytest.approx(bucket.capacity - 5000)
+    scheduler.observe("binance", httpx.Response(200, headers={"x-mbx-used-weight-1m": "lots"}))
+    assert bucket.available() == pytest.approx(bucket.capacity - 5000)
+
+
+@pytest.mark.parametrize("status,retry_after,blocked", [
+    (429, "30", 30),
+    (418, "120", 120),
+    (418, None, 60),
+    (429, "soon", 60),
+])
+def test_rate_limit_responses_back_off(clock, status, retry_after, blocked):
+    scheduler = UpstreamScheduler()
+    headers = {"retry-after": retry_after} if retry_after else {}
+    scheduler.observe("binance", httpx.Response(status, headers=headers))
+
+    assert binance(scheduler).time_until(1) == pytest.approx(blocked)
+    assert scheduler.stats()["binance"][f"http_{status}"] == 1
+    assert scheduler.stats()["binance"]["blocked_for_seconds"] == blocked
+
+
+async def test_background_requests_leave_the_interactive_reserve(clock):
+    scheduler = UpstreamScheduler()
+    bucket = binance(scheduler)
+    bucket.take(bucket.capacity * (1 - scheduler.reserve))
+
+    with pytest.raises(BudgetExceeded):
+        await scheduler.acquire("binance", "klines", priority=Priority.BACKGROUND)
+    await scheduler.acquire("binance", "klines", priority=Priority.INTERACTIVE)
+    assert scheduler.stats()["binance"]["shed"] == 1
+    assert scheduler.stats()["binance"]["admitted"] == 1
+
+
+async def test_interactive_requests_are_served_first(clock):
+    scheduler = UpstreamScheduler()
+    binance(scheduler).blocked_until = clock() + 1  # Budget left, but nothing admitted yet
+    admitted = []
+
+    def request(priority: Priority) -> asyncio.Task:
+        task = asyncio.create_task(scheduler.acquire("binance", "ping", priority=priority))
+        task.add_done_callback(lambda t: admitted.append(priority))
+        return task
+
+    tasks = [request(Priority.BACKGROUND), request(Priority.INTERACTIVE)]
+    await asyncio.sleep(0)
+    assert admitted == []
+
+    clock.advance(1)
+    await wake(scheduler)
+    assert admitted == [Priority.INTERACTIVE, Priority.BACKGROUND]
+    await asyncio.gather(*tasks)
+
+
+async def test_endpoint_buckets_count_requests(clock):
+    scheduler = UpstreamScheduler()
+    scheduler.max_wait[Priority.INTERACTIVE] = 0
+    for _ in range(6):
+        await scheduler.acquire("binance", "exchangeInfo")
+
+    with pytest.raises(BudgetExceeded):
+        await scheduler.acquire("binance", "exchangeInfo")
+    await scheduler.acquire("binance", "klines")
+
+
+async def test_waiting_past_the_request_deadline_is_a_deadline_error(clock):
+    scheduler = UpstreamScheduler()
+    bucket = binance(scheduler)
+    bucket.take(bucket.capacity)
+    request_deadline.set(clock() + 0.001)  # The test's task context ends with it
+
+    with pytest.raises(DeadlineExceeded):
+        await scheduler.acquire("binance", "klines")
+
+
+def test_hop_timeout_is_capped_by_the_deadline(clock, deadline):
+    assert hop_timeout(10) == 10  # No deadline
+    deadline(5)
+    assert hop_timeout(10) == pytest.approx(5)
+    assert hop_timeout(2) == 2
+
+    token = request_priority.set(Priority.BACKGROUND)
+    try:
+        assert hop_timeout(10) == 10  # Background work has no deadline
+    finally:
+        request_priority.reset(token)
+
+    clock.advance(5)
+    with pytest.raises(DeadlineExceeded):
+        hop_timeout(10)
+
+
+def test_deadline_share_leaves_the_rest_for_a_fallback(clock, deadline):
+    deadline(8)
+    with deadline_share(0.25):
+        assert time_left() == pytest.approx(2)
+        clock.advance(2)
+        with pytest.raises(DeadlineExceeded):
+            hop_timeout(10)
+    assert time_left() == pytest.approx(6)
+    assert hop_timeout(10) == pytest.approx(6)
+
+
+def test_deadline_share_without_a_deadline_is_a_no_op(clock):
+    with deadline_share(0.5):
+        assert time_left() is None
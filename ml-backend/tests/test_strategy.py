@@ -0,0 +1,124 @@
+"""
+StrategySpec validation
+"""
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.models.signals import SignalGenerator
+from app.models.strategy import DEFAULT_STRATEGY, IndicatorSpec, StrategySpec, compile_strategy
+from app.providers.base import PriceData
+
+
+def spec(*indicators: IndicatorSpec, **fields) -> StrategySpec:
+    return StrategySpec(indicators=[*indicators, IndicatorSpec(type="volatility")], **fields)
+
+
+@pytest.mark.parametrize("lookback", [0, -1, 2.5, 31, 100])
+def test_momentum_lookback_must_fit(lookback):
+    with pytest.raises(ValidationError, match="momentum.lookback"):
+        spec(IndicatorSpec(type="momentum", params={"lookback": lookback}))
+
+
+def test_rsi_period_needs_one_more_close():
+    spec(IndicatorSpec(type="rsi", params={"period": 29}))
+    with pytest.raises(ValidationError, match="rsi.period"):
+        spec(IndicatorSpec(type="rsi", params={"period": 30}))
+
+
+def test_defaults_are_checked_against_min_periods():
+    with pytest.raises(ValidationError, match="trend.long"):
+        spec(IndicatorSpec(type="trend"), min_periods=10)
+
+
+def test_unknown_parameters_are_rejected():
+    with pytest.raises(ValidationError, match="Unknown parameters"):
+        spec(IndicatorSpec(type="momentum", params={"lookbak": 5}))
+
+
+@pytest.mark.parametrize("thresholds", [
+    {"buy": 0.7, "strong_buy": 0.7},
+    {"sell": -0.8, "strong_sell": -0.7},
+])
+def test_thresholds_must_be_ordered(thresholds):
+    with pytest.raises(ValidationError, match="thresholds"):
+        spec(thresholds=thresholds)
+
+
+def test_widest_valid_windows_evaluate():
+    strategy = spec(
+        IndicatorSpec(type="momentum", params={"lookback": 30}, weight=0.5),
+        IndicatorSpec(type="rsi", params={"period": 29}, weight=0.5),
+    )
+    closes = np.linspace(100, 130, 30)
+    result = compile_strategy(strategy).evaluate(closes)
+    assert np.isfinite(result["score"]).all()
+
+
+def test_default_strategy_is_valid():
+    StrategySpec.model_validate(DEFAULT_STRATEGY.model_dump())
+
+
+def legacy_signals(closes: list) -> dict:
+    """The hand-written blend the default strategy replaced (7/20 MA, RSI 14, 10-bar momentum)"""
+    trend = max(-1, min(1, (np.mean(closes[-7:]) - np.mean(closes[-20:])) / np.mean(closes[-20:]) * 10))
+
+    deltas = np.diff(closes[-15:])
+    avg_gain = np.mean(np.where(deltas > 0, deltas, 0))
+    avg_loss = np.mean(np.where(deltas < 0, -deltas, 0))
+    rsi = 100 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    rsi_signal = (30 - rsi) / 30 if rsi < 30 else -(rsi - 70) / 30 if rsi > 70 else 0
+
+    momentum = max(-1, min(1, (closes[-1] - closes[-10]) / closes[-10] * 5))
+    volatility = float(np.std(np.diff(closes) / closes[:-1]) * 100)
+
+    score = trend * 0.4 + rsi_signal * 0.3 + momentum * 0.3
+    if score > 0.5:
+        signal, strength = "BUY", "STRONG" if score > 0.7 else "MODERATE"
+    elif score < -0.5:
+        signal, strength = "SELL", "STRONG" if score < -0.7 else "MODERATE"
+    else:
+        signal, strength = "HOLD", "NEUTRAL"
+    return {
+        "signal": signal,
+        "strength": strength,
+        "score": round(score, 2),
+        "indicators": {
+            "trend": round(trend, 2),
+            "rsi": round(rsi_signal, 2),
+            "momentum": round(momentum, 2),
+            "volatility": round(volatility, 2)
+        },
+        "risk_level": "HIGH" if volatility > 5 else "MEDIUM" if volatility > 2 else "LOW"
+    }
+
+
+def random_series(rng, length: int) -> np.ndarray:
+    drift = rng.normal(0, 0.02)
+    noise = rng.choice([0.005, 0.03, 0.08])
+    return 100 * np.exp(np.cumsum(rng.normal(drift, noise, size=length)))
+
+
+def test_default_strategy_reproduces_the_legacy_signals():
+    rng = np.random.default_rng(44)
+    generator = SignalGenerator(DEFAULT_STRATEGY)
+    for _ in range(300):
+        closes = random_series(rng, int(rng.integers(30, 60)))
+        prices = [PriceData(timestamp=datetime(2024, 1, 1), open=c, high=c, low=c, close=c, volume=1.0) for c in closes]
+        assert generator.generate_signals(prices) == legacy_signals(closes.tolist())
+
+
+def test_batch_matches_single_symbol_signals():
+    rng = np.random.default_rng(7)
+    closes = np.array([random_series(rng, 30) for _ in range(50)])
+    generator = SignalGenerator(DEFAULT_STRATEGY)
+    batch = generator.generate_signals_batch(closes)
+
+    for i, row in enumerate(closes):
+        expected = legacy_signals(row.tolist())
+        assert (batch["signal"][i], batch["strength"][i], batch["risk_level"][i]) == (
+            expected["signal"], expected["strength"], expected["risk_level"]
+        )
+        assert round(float(batch["score"][i]), 2) == expected["score"]
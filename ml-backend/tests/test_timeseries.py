@@ -0,0 +1,129 @@
+"""
+Compressed series codecs and chunk bookkeeping
+"""
+import numpy as np
+import pytest
+
+from app.services.timeseries import (
+    CompressedSeries, decode_floats, decode_times, encode_floats, encode_times
+)
+
+MINUTE_MS = 60_000
+START_MS = 1_700_000_000_000
+
+
+def rows(count: int, start_ms: int = START_MS, step_ms: int = MINUTE_MS) -> np.ndarray:
+    times = start_ms + step_ms * np.arange(count)
+    closes = 100 + np.cumsum(np.random.default_rng(count).normal(size=count))
+    return np.column_stack([times, closes, closes + 1, closes - 1, closes, np.full(count, 5.0)])
+
+
+@pytest.mark.parametrize("times", [
+    [START_MS],
+    [START_MS, START_MS + MINUTE_MS],
+    list(START_MS + MINUTE_MS * np.arange(500)),
+    [START_MS, START_MS + 5, START_MS + 90_000, START_MS + 90_001, START_MS + 10**9],
+    [START_MS, START_MS - 1_000, START_MS + 2**40],  # Out of order, huge jump
+], ids=["one", "two", "regular", "irregular", "wild"])
+def test_times_round_trip(times):
+    times = np.array(times, dtype=np.int64)
+    assert np.array_equal(decode_times(encode_times(times), len(times)), times)
+
+
+def test_regular_times_cost_only_the_header():
+    times = START_MS + MINUTE_MS * np.arange(1000, dtype=np.int64)
+    assert len(encode_times(times)) == 17
+
+
+def test_floats_round_trip_bit_for_bit():
+    values = np.array([1.5, np.nan, -0.0, 0.0, np.inf, -np.inf, 1e-310, 1.5, -2.25, np.nan])
+    decoded = decode_floats(encode_floats(values), len(values))
+    assert np.array_equal(decoded.view(np.uint64), values.view(np.uint64))
+
+
+def test_single_value_floats_round_trip():
+    values = np.array([-0.0])
+    assert decode_floats(encode_floats(values), 1).view(np.uint64)[0] == values.view(np.uint64)[0]
+
+
+def test_series_matches_what_was_appended():
+    data = rows(1000)
+    series = CompressedSeries(chunk_size=64)
+    series.extend(data.tolist())
+
+    assert len(series) == 1000
+    assert np.array_equal(series.tail(), data)
+    assert series.stats()["chunks"] == 15
+
+
+def test_single_row_chunks():
+    data = rows(10)
+    series = CompressedSeries(chunk_size=1)
+    series.extend(data.tolist())
+
+    assert series.stats()["chunks"] == 9
+    assert np.array_equal(series.tail(), data)
+    assert np.array_equal(series.between(int(data[3, 0]), int(data[5, 0])), data[3:6])
+
+
+def test_last_row_stays_mutable():
+    series = CompressedSeries(chunk_size=4)
+    series.extend(rows(8).tolist())
+    updated = rows(8)[-1].tolist()
+    updated[4] = 123.0
+    series.replace_last(updated)
+
+    assert series.last()[4] == 123.0
+    assert series.tail(1)[0, 4] == 123.0
+
+
+def test_max_rows_evicts_whole_chunks():
+    data = rows(1000)
+    series = CompressedSeries(chunk_size=64, max_rows=300)
+    series.extend(data.tolist())
+
+    assert 300 <= len(series) < 300 + 64
+    assert np.array_equal(series.tail(), data[-len(series):])
+    assert series.start_ms == int(data[-len(series), 0])
+
+
+@pytest.mark.parametrize("n", [0, 1, 10, 64, 65, 200, 5000])
+def test_tail_across_chunk_boundaries(n):
+    data = rows(300)
+    series = CompressedSeries(chunk_size=64)
+    series.extend(data.tolist())
+    assert np.array_equal(series.tail(n), data[len(data) - min(n, 300):])
+
+
+@pytest.mark.parametrize("first,last", [(0, 299), (10, 20), (60, 70), (63, 64), (64, 127), (250, 299), (299, 299)])
+def test_between_across_chunk_boundaries(first, last):
+    data = rows(300)
+    series = CompressedSeries(chunk_size=64)
+    series.extend(data.tolist())
+    start_ms, end_ms = int(data[first, 0]), int(data[last, 0])
+
+    expected = data[first:last + 1]
+    assert np.array_equal(series.between(start_ms, end_ms), expected)
+    assert np.array_equal(np.concatenate(list(series.iter_between(start_ms, end_ms))), expected)
+    # Bounds that fall between bars
+    assert np.array_equal(series.between(start_ms - 1, end_ms + 1), expected)
+
+
+def test_between_outside_the_range_is_empty():
+    data = rows(100)
+    series = CompressedSeries(chunk_size=16)
+    series.extend(data.tolist())
+
+    assert len(series.between(START_MS - 10 * MINUTE_MS, START_MS - MINUTE_MS)) == 0
+    assert sum(len(r) for r in series.iter_between(START_MS + 10**9, START_MS + 2 * 10**9)) == 0
+
+
+def test_irregular_rows_round_trip_through_chunks():
+    data = rows(200)
+    gaps = np.random.default_rng(0).integers(1, 10, size=200) * MINUTE_MS
+    data[:, 0] = START_MS + np.cumsum(gaps)
+    series = CompressedSeries(chunk_size=32)
+    series.extend(data.tolist())
+
+    assert np.array_equal(series.tail(), data)
+    assert np.array_equal(series.between(int(data[30, 0]), int(data[70, 0])), data[30:71])
@@ -0,0 +1,77 @@
+"""
+Trade stream bookkeeping: LRU cap and optional backfill waits
+"""
+import asyncio
+
+from app.services.trades import TradeStreamAggregator
+
+
+class SlowProvider:
+    """aggTrades that take a while to arrive"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def get_agg_trades(self, symbol, from_id=None):
+        await asyncio.sleep(self.delay)
+        return [{"a": 1, "T": 1_700_000_000_000, "p": "100.0", "q": "1.0", "m": False}]
+
+
+async def test_flow_without_wait_returns_at_once():
+    streams = TradeStreamAggregator(SlowProvider(delay=10))
+    try:
+        started = asyncio.get_running_loop().time()
+        assert await streams.flow("BTCUSDT", wait=False) is None
+        assert asyncio.get_running_loop().time() - started < 0.5
+        assert streams.tracked_symbols() == ["BTCUSDT"]
+    finally:
+        await streams.stop()
+
+
+async def test_least_recently_used_symbol_is_dropped():
+    streams = TradeStreamAggregator(SlowProvider(delay=10))
+    streams.max_symbols = 2
+    try:
+        await streams.track("BTCUSDT", wait=False)
+        await streams.track("ETHUSDT", wait=False)
+        await streams.track("BTCUSDT", wait=False)
+        await streams.track("SOLUSDT", wait=False)
+        await asyncio.sleep(0)
+
+        assert sorted(streams.tracked_symbols()) == ["BTCUSDT", "SOLUSDT"]
+        assert len(streams._tasks) == 2
+    finally:
+        await streams.stop()
+
+
+async def test_retracking_an_evicted_symbol_starts_fresh():
+    streams = TradeStreamAggregator(SlowProvider(delay=0))
+    streams.max_symbols = 1
+    try:
+        await streams.track("BTCUSDT", wait=False)
+        await streams.track("ETHUSDT", wait=False)
+        state = await streams.track("BTCUSDT", timeout=1.0)
+
+        assert state is not None and state.last_price == 100.0
+        assert streams.tracked_symbols() == ["BTCUSDT"]
+    finally:
+        await streams.stop()
+
+
+async def test_pinned_symbols_are_never_evicted():
+    streams = TradeStreamAggregator(SlowProvider(delay=10))
+    streams.max_symbols = 2
+    try:
+        streams.pin("btcusdt")
+        await streams.track("BTCUSDT", wait=False)
+        await streams.track("ETHUSDT", wait=False)
+        await streams.track("SOLUSDT", wait=False)
+        await asyncio.sleep(0)
+        assert sorted(streams.tracked_symbols()) == ["BTCUSDT", "SOLUSDT"]
+
+        streams.unpin("BTCUSDT")
+        await streams.track("ADAUSDT", wait=False)
+        await asyncio.sleep(0)
+        assert sorted(streams.tracked_symbols()) == ["ADAUSDT", "SOLUSDT"]
+    finally:
+        await streams.stop()
@@ -0,0 +1,88 @@
+"""
+Basket trade validation
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.api import routes
+from app.api.routes import BatchTradeValidationRequest
+from app.providers.base import PriceData
+
+ALIASES = {"btc": "BTC", "bitcoin": "BTC", "xbt": "BTC", "eth": "ETH"}
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    calls = []
+
+    async def resolve(query):
+        symbol = ALIASES.get(query)
+        return SimpleNamespace(symbol=symbol, binance=f"{symbol}USDT", coincap=None) if symbol else None
+
+    async def get_history(resolved, days, interval="1d"):
+        calls.append(resolved.symbol)
+        closes = 100 * np.exp(np.cumsum(np.full(days, 0.01)))
+        start = datetime(2024, 1, 1)
+        return [
+            PriceData(timestamp=start + timedelta(days=i), open=c, high=c, low=c, close=c, volume=1.0)
+            for i, c in enumerate(closes)
+        ], "binance"
+
+    monkeypatch.setattr(routes.symbol_resolver, "resolve", resolve)
+    monkeypatch.setattr(routes, "get_history", get_history)
+    return calls
+
+
+async def test_aliases_share_one_history_and_score(fetched):
+    request = BatchTradeValidationRequest(orders=[
+        {"action": "buy", "symbol": "btc"},
+        {"action": "sell", "symbol": "Bitcoin"},
+        {"action": "buy", "symbol": "xbt"},
+        {"action": "buy", "symbol": "eth"},
+        {"action": "buy", "symbol": "nope"},
+    ])
+    response = await routes.validate_trades(request)
+
+    assert sorted(fetched) == ["BTC", "ETH"]
+    results = response["results"]
+    assert [r["symbol"] for r in results] == ["BTC", "BTC", "BTC", "ETH", "NOPE"]
+    assert results[0]["signal"] == results[1]["signal"] == results[2]["signal"] is not None
+    assert results[4]["signal"] is None
+    assert results[4]["warning"] == "Unknown symbol: nope"
+
+
+class Book:
+    """Fills up to `depth_usd` with 10 bps of slippage per $10k"""
+
+    def __init__(self, depth_usd: float):
+        self.depth_usd = depth_usd
+
+    def liquidity(self, action, notional_usd, depth_bps):
+        fill = min(1.0, self.depth_usd / notional_usd)
+        return {"fillable": fill == 1.0, "fill_ratio": fill, "slippage_bps": notional_usd / 10_000 * 10}
+
+
+async def test_sized_orders_are_checked_against_one_book_per_symbol(fetched, monkeypatch):
+    tracked = []
+
+    async def track(pair, timeout=5.0, wait=True):
+        tracked.append(pair)
+        return Book(depth_usd=200_000)
+
+    monkeypatch.setattr(routes.order_books, "track", track)
+    request = BatchTradeValidationRequest(orders=[
+        {"action": "buy", "symbol": "btc", "amount": 1_000},
+        {"action": "buy", "symbol": "bitcoin", "amount": 80_000},
+        {"action": "buy", "symbol": "xbt", "amount": 500_000},
+        {"action": "buy", "symbol": "eth"},
+    ])
+    results = (await routes.validate_trades(request))["results"]
+
+    assert tracked == ["BTCUSDT"]
+    assert results[0]["liquidity"]["slippage_bps"] == 1.0
+    assert "slippage" in results[1]["warning"]
+    assert results[2]["is_good_trade"] is False and "TOO LARGE" in results[2]["warning"]
+    assert results[3]["liquidity"] is None
@@ -0,0 +1,41 @@
+"""
+Startup warm-up: dependencies, failures and the overall timeout
+"""
+import asyncio
+
+from app.services.warmup import Warmup
+
+
+def warmup(timeout: float) -> Warmup:
+    w = Warmup()
+    w.enabled = True
+    w.timeout = timeout
+    return w
+
+
+async def test_steps_that_outlast_the_timeout_are_reported():
+    w = warmup(timeout=0.1)
+
+    async def quick():
+        return "ok"
+
+    async def broken():
+        raise RuntimeError("upstream down")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    w.add_step("quick", quick)
+    w.add_step("broken", broken)
+    w.add_step("slow", slow)
+    w.add_step("after_slow", quick, after=["slow"])
+    w.start()
+    await asyncio.wait_for(w._task, 2)
+
+    steps = w.status()["steps"]
+    assert w.ready and w.timed_out
+    assert {name: s["status"] for name, s in steps.items()} == {
+        "quick": "done", "broken": "failed", "slow": "timed_out", "after_slow": "timed_out"
+    }
+    assert steps["slow"]["duration_ms"] >= 100
+    assert steps["after_slow"]["duration_ms"] is None  # Never started